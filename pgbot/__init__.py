@@ -8,7 +8,6 @@ This file is the main file of pgbot subdir
 
 import asyncio
 import datetime
-import io
 import logging
 import os
 import re
@@ -16,20 +15,39 @@ import random
 import signal
 import sys
 import time
-from typing import Optional, Union
+from typing import Any, Iterable, Optional, Union
 
 import discord
 import pygame
 import snakecore
 
 import pgbot
-from pgbot import common, exceptions, event_listeners, routine, utils
+from pgbot import (
+    audit_logs,
+    common,
+    exceptions,
+    event_listeners,
+    help_thread_titles,
+    help_threads,
+    polls,
+    reminders,
+    routine,
+    utils,
+)
 from pgbot.utils import (
     get_primary_guild_perms,
     message_delete_reaction_listener,
-    parse_text_to_mapping,
 )
-from pgbot.utils import help_thread_deletion_checks
+from pgbot.exts.core_commands.utils.help import build_help_catalog
+from pgbot.storage import (
+    StorageTable,
+    init_storage_backend,
+    purge_members,
+    quit_storage_backend,
+    read_table,
+    reindex_member_table,
+    update_table,
+)
 
 
 def setup_logging():
@@ -45,7 +63,7 @@ async def _init():
     if not common.TEST_MODE:
         # when we are not in test mode, we want stout/stderr to appear on a console
         # in a discord channel
-        common.stdout = io.StringIO()
+        common.stdout = pgbot.utils.RingBufferTextIO(common.CONSOLE_BUFFER_SIZE)
         sys.stdout = pgbot.utils.RedirectTextIOWrapper(
             sys.stdout.buffer, (common.stdout,)
         )
@@ -94,17 +112,20 @@ async def _init():
                 if channel.id == value:
                     common.entry_channels[key] = channel
 
+    await init_storage_backend()
+
     await common.bot.load_extension("pgbot.exts.core_commands.help")
     await common.bot.load_extension("pgbot.exts.core_commands.admin")
     await common.bot.load_extension("pgbot.exts.core_commands.user")
 
-    async with snakecore.storage.DiscordStorage(
-        "blacklist", list
-    ) as storage_obj:  # disable blacklisted commands
-        for cmd_qualname in storage_obj.obj:
-            cmd = common.bot.get_command(cmd_qualname)
-            if cmd is not None:
-                cmd.enabled = False
+    for cmd_qualname in await read_table("blacklist", list):
+        # disable blacklisted commands
+        cmd = common.bot.get_command(cmd_qualname)
+        if cmd is not None:
+            cmd.enabled = False
+
+    # parse all command docs once, so that pg!help only needs to do lookups
+    build_help_catalog(common.bot)
 
 
 async def init():
@@ -125,10 +146,33 @@ async def init():
 
     routine.handle_console.start()
     routine.routine.start()
+    command_log_batcher.start()
+    routine.expire_pending_member_joins.start()
+    if common.METRICS_DUMP_PATH:
+        routine.dump_metrics.start()
+
+    await reminders.load_reminders()
+    reminders.reminder_scheduler.start()
+
+    if common.guild is not None:
+        # reactions are only matched to registered polls
+        common.hold_task(
+            asyncio.create_task(
+                polls.scan_unregistered_polls(
+                    (
+                        channel
+                        for channel in common.guild.text_channels
+                        if channel.permissions_for(common.guild.me).read_message_history
+                    ),
+                    common.bot.user.id,
+                )
+            )
+        )
 
     if not common.TEST_MODE:
-        routine.inactive_help_thread_alert.start()
-        routine.force_help_thread_archive_after_timeout.start()
+        await help_threads.load_help_thread_states()
+        help_threads.help_thread_scheduler.start()
+        routine.reconcile_help_thread_deadlines.start()
         routine.delete_help_threads_without_starter_message.start()
 
     if common.guild is None:
@@ -140,6 +184,7 @@ async def init():
     setup_logging()
     common.pgbot_initialized = True
     await load_help_thread_data()
+    routine.help_thread_data_flusher.start()
 
 
 def format_entries_message(
@@ -175,6 +220,80 @@ def format_entries_message(
     return title, fields
 
 
+# entry message id -> id of its repost in the entries discussion channel
+SHOWCASE_REPOSTS_TABLE = "showcase_reposts"
+# reposts of older entries are forgotten, and looked up in the channel history
+SHOWCASE_REPOST_INDEX_TTL = datetime.timedelta(days=180)
+
+
+async def record_showcase_repost(entry_id: int, repost_id: int):
+    """Remember the repost of a showcase entry, and forget the reposts of entries
+    older than `SHOWCASE_REPOST_INDEX_TTL`.
+    """
+    oldest_id = discord.utils.time_snowflake(
+        datetime.datetime.now(datetime.timezone.utc) - SHOWCASE_REPOST_INDEX_TTL
+    )
+    reposts = await read_table(SHOWCASE_REPOSTS_TABLE, dict)
+    await update_table(
+        SHOWCASE_REPOSTS_TABLE,
+        {entry_id: repost_id},
+        [old_entry_id for old_entry_id in reposts if old_entry_id < oldest_id],
+    )
+
+
+async def forget_showcase_repost(entry_id: int):
+    """Forget the repost of a deleted showcase entry."""
+    if entry_id in await read_table(SHOWCASE_REPOSTS_TABLE, dict):
+        await update_table(SHOWCASE_REPOSTS_TABLE, {}, (entry_id,))
+
+
+async def get_showcase_repost(
+    entry: discord.Message,
+) -> Optional[Union[discord.Message, discord.PartialMessage]]:
+    """Get the repost of a showcase entry in the entries discussion channel. Entries
+    whose repost was not recorded are looked up in the channel history.
+
+    Args:
+        entry (discord.Message): The entry message.
+
+    Returns:
+        Optional[Union[discord.Message, discord.PartialMessage]]: The repost, if
+        it was found.
+    """
+    repost_id = (await read_table(SHOWCASE_REPOSTS_TABLE, dict)).get(entry.id)
+    if repost_id is not None:
+        return common.entries_discussion_channel.get_partial_message(repost_id)
+
+    async for message in common.entries_discussion_channel.history(
+        around=entry.created_at, limit=5
+    ):
+        try:
+            link = message.embeds[0].fields[1].value
+            if not isinstance(link, str):
+                continue
+
+            if int(link.split("/")[6][:-1]) == entry.id:
+                await record_showcase_repost(entry.id, message.id)
+                return message
+
+        except (IndexError, AttributeError, ValueError):
+            pass
+
+    return None
+
+
+async def send_showcase_repost(entry: discord.Message):
+    """Repost a showcase entry in the entries discussion channel."""
+    title, fields = format_entries_message(entry, "showcase")
+    repost = await snakecore.utils.embeds.send_embed(
+        common.entries_discussion_channel,
+        title=title,
+        color=0xFF8800,
+        fields=fields,
+    )
+    await record_showcase_repost(entry.id, repost.id)
+
+
 URL_PATTERN = re.compile(
     r"(http|ftp|https):\/\/([\w_-]+(?:(?:\.[\w_-]+)+))([\w.,@?^=%&:\/~+#-]*[\w@?^=%&\/~+#-])"
 )
@@ -231,6 +350,23 @@ async def delete_bad_entry_and_warning(
                 pass
 
 
+async def greet_member(member: discord.Member):
+    """
+    Send the greet message of a new member that completed the join screening
+    """
+    # Don't use embed here, because pings would not work
+    if member.guild.id == common.GuildConstants.GUILD_ID:
+        greet = random.choice(common.GuildConstants.BOT_WELCOME_MSG["greet"])
+        check = random.choice(common.GuildConstants.BOT_WELCOME_MSG["check"])
+        grab = random.choice(common.GuildConstants.BOT_WELCOME_MSG["grab"])
+        end = random.choice(common.GuildConstants.BOT_WELCOME_MSG["end"])
+        await common.arrivals_channel.send(
+            f"{greet} {member.mention}! {check} "
+            + f"{common.guide_channel.mention}{grab} "
+            + f"{common.roles_channel.mention}{end}"
+        )
+
+
 async def member_join(member: discord.Member):
     """
     This function handles the greet message when a new member joins
@@ -240,51 +376,66 @@ async def member_join(member: discord.Member):
         return
 
     # This function is called right when a member joins, even before the member
-    # finishes the join screening. So we wait for that to happen and then send
-    # the message. Wait for a maximum of six hours.
-    for _ in range(1080):
-        await asyncio.sleep(20)
-
-        if not member.pending:
-            # Don't use embed here, because pings would not work
-            if member.guild.id == common.GuildConstants.GUILD_ID:
-                greet = random.choice(common.GuildConstants.BOT_WELCOME_MSG["greet"])
-                check = random.choice(common.GuildConstants.BOT_WELCOME_MSG["check"])
-                grab = random.choice(common.GuildConstants.BOT_WELCOME_MSG["grab"])
-                end = random.choice(common.GuildConstants.BOT_WELCOME_MSG["end"])
-                await common.arrivals_channel.send(
-                    f"{greet} {member.mention}! {check} "
-                    + f"{common.guide_channel.mention}{grab} "
-                    + f"{common.roles_channel.mention}{end}"
-                )
-            return
+    # finishes the join screening. Such members are greeted by `member_update`
+    # once they do, if that happens within `common.PENDING_MEMBER_TTL` seconds.
+    if member.pending:
+        # entries are kept in order of expiry, so a member that joins again is
+        # moved to the end
+        common.pending_member_joins.pop(member.id, None)
+        common.pending_member_joins[member.id] = (
+            time.monotonic() + common.PENDING_MEMBER_TTL
+        )
+        return
+
+    await greet_member(member)
+
+
+async def member_update(before: discord.Member, after: discord.Member):
+    """
+    This function is called when a member changes, and greets members that
+    completed the join screening
+    """
+    if (
+        before.pending
+        and not after.pending
+        and common.pending_member_joins.pop(after.id, None) is not None
+    ):
+        await greet_member(after)
+
+
+async def purge_members_from_storage(
+    member_ids: Iterable[int],
+) -> dict[str, dict[int, Any]]:
+    """
+    Remove members from all storage tables that reference them, and cancel their
+    reminders. Returns the removed data per table, like `purge_members`.
+    """
+    removed = await purge_members(member_ids)
+    for mem_id, member_reminders in removed.get("reminders", {}).items():
+        for on in member_reminders:
+            reminders.unschedule_reminder(mem_id, on)
+
+    return removed
 
 
 async def clean_storage_member(member: discord.Member):
     """
     This function silently removes users from storage messages
     """
-    for table_name in ("stream", "reminders", "clock"):
-        async with snakecore.storage.DiscordStorage(table_name) as storage_obj:
-            data = storage_obj.obj
-            if member.id in data:
-                data.pop(member)
-                storage_obj.obj = data
+    common.pending_member_joins.pop(member.id, None)
+    await purge_members_from_storage((member.id,))
 
 
 async def message_delete(msg: discord.Message):
     """
     This function is called for every message deleted by user.
     """
-    if msg.id in common.cmd_logs.keys():
-        del common.cmd_logs[msg.id]
+    if msg.id in common.recent_response_messages:
+        del common.recent_response_messages[msg.id]
 
     elif msg.author.id == common.bot.user.id:
-        for log in common.cmd_logs.keys():
-            if common.cmd_logs[log].id is not None:
-                if common.cmd_logs[log].id == msg.id:
-                    del common.cmd_logs[log]
-                    return
+        if common.recent_response_messages.pop_response(msg.id) is not None:
+            return
 
     if common.GENERIC or common.TEST_MODE:
         return
@@ -308,20 +459,12 @@ async def message_delete(msg: discord.Message):
 
             del common.entry_message_deletion_dict[msg.id]
 
-        async for message in common.entries_discussion_channel.history(
-            around=msg.created_at, limit=5
-        ):
+        if (repost := await get_showcase_repost(msg)) is not None:
             try:
-                link = message.embeds[0].fields[1].value
-                if not isinstance(link, str):
-                    continue
-
-                if int(link.split("/")[6][:-1]) == msg.id:
-                    await message.delete()
-                    break
-
-            except (IndexError, AttributeError):
+                await repost.delete()
+            except discord.NotFound:
                 pass
+            await forget_showcase_repost(msg.id)
 
     if (
         isinstance(msg.channel, discord.Thread)
@@ -329,7 +472,33 @@ async def message_delete(msg: discord.Message):
         in common.GuildConstants.HELP_FORUM_CHANNEL_IDS.values()
         and msg.id == msg.channel.id  # OP deleted starter message
     ):
-        await help_thread_deletion_checks(msg.channel)
+        await help_threads.help_thread_deletion_checks(msg.channel)
+
+
+async def raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    """
+    This function is called for every message deleted, even if it is not cached.
+    """
+    help_threads.track_message_delete(
+        payload.channel_id, payload.message_id, payload.cached_message
+    )
+    reaction_message_cache.discard(payload.message_id)
+    await polls.unregister_poll(payload.message_id)
+
+
+async def raw_bulk_message_delete(payload: discord.RawBulkMessageDeleteEvent):
+    """
+    This function is called for every bulk message deletion, even if the messages
+    are not cached.
+    """
+    cached_messages = {msg.id: msg for msg in payload.cached_messages}
+    for message_id in payload.message_ids:
+        help_threads.track_message_delete(
+            payload.channel_id, message_id, cached_messages.get(message_id)
+        )
+        reaction_message_cache.discard(message_id)
+
+    await polls.unregister_polls(payload.message_ids)
 
 
 async def message_edit(old: discord.Message, new: discord.Message):
@@ -339,8 +508,8 @@ async def message_edit(old: discord.Message, new: discord.Message):
     bot_id = common.bot.user.id
     if new.content.startswith((common.COMMAND_PREFIX, f"<@{bot_id}>", f"<@!{bot_id}>")):
         try:
-            if new.id in common.cmd_logs.keys():
-                await handle_command(new, common.cmd_logs[new.id])
+            if response_message := common.recent_response_messages.get(new.id):
+                await handle_command(new, response_message)
         except discord.HTTPException:
             pass
 
@@ -419,23 +588,18 @@ async def message_edit(old: discord.Message, new: discord.Message):
                     pass
             del common.entry_message_deletion_dict[new.id]
 
-        async for message in common.entries_discussion_channel.history(  # attempt to find and edit repost
-            around=old.created_at, limit=5
-        ):
+        if (repost := await get_showcase_repost(new)) is not None:
+            # attempt to edit the repost
+            title, fields = format_entries_message(new, "showcase")
             try:
-                embed = message.embeds[0]
-                link = embed.fields[1].value
-                if not isinstance(link, str):
-                    continue
-
-                if int(link.split("/")[6][:-1]) == new.id:
-                    _, fields = format_entries_message(new, "")
-                    await snakecore.utils.embeds.edit_embed_at(message, fields=fields)
-                    embed_repost_edited = True
-                    break
-
-            except (IndexError, AttributeError):
-                pass
+                await repost.edit(
+                    embed=snakecore.utils.embeds.create_embed(
+                        title=title, color=0xFF8800, fields=fields
+                    )
+                )
+                embed_repost_edited = True
+            except discord.NotFound:
+                await forget_showcase_repost(new.id)
 
         if not embed_repost_edited:
             if (
@@ -443,50 +607,18 @@ async def message_edit(old: discord.Message, new: discord.Message):
             ) < datetime.timedelta(
                 minutes=5
             ):  # for new, recently corrected entry messages
-                entry_type = "showcase"
-                color = 0xFF8800
-
-                title, fields = format_entries_message(new, entry_type)
-                await snakecore.utils.embeds.send_embed(
-                    common.entries_discussion_channel,
-                    title=title,
-                    color=color,
-                    fields=fields,
-                )
+                await send_showcase_repost(new)
 
 
 def validate_help_forum_channel_thread_name(thread: discord.Thread) -> bool:
-    return any(
-        (
-            common.GuildConstants.INVALID_HELP_THREAD_TITLE_SCANNING_ENABLED[
-                caution_type
-            ]
-            and common.GuildConstants.INVALID_HELP_THREAD_TITLE_REGEX_PATTERNS[
-                caution_type
-            ].search(thread.name.replace(f" | {thread.owner_id}", ""))
-            is not None
-            for caution_type in common.GuildConstants.INVALID_HELP_THREAD_TITLE_TYPES
-        )
-    )
+    return bool(get_help_forum_channel_thread_name_cautions(thread))
 
 
 def get_help_forum_channel_thread_name_cautions(
     thread: discord.Thread,
 ) -> tuple[str, ...]:
-    return tuple(
-        (
-            caution_type
-            for caution_type in common.GuildConstants.INVALID_HELP_THREAD_TITLE_TYPES
-            if common.GuildConstants.INVALID_HELP_THREAD_TITLE_SCANNING_ENABLED[
-                caution_type
-            ]
-            and common.GuildConstants.INVALID_HELP_THREAD_TITLE_REGEX_PATTERNS[
-                caution_type
-            ].search(
-                " ".join(thread.name.replace(f" | {thread.owner_id}", "").split())
-            )  # normalize whitespace
-            is not None
-        )
+    return help_thread_titles.get_title_cautions(
+        thread.id, thread.name, thread.owner_id
     )
 
 
@@ -557,6 +689,7 @@ async def caution_about_regulars_help_forum_channel_thread_tags(
 
 
 async def thread_create(thread: discord.Thread):
+    help_threads.track_new_thread(thread)
     if (
         thread.guild.id == common.GuildConstants.GUILD_ID
         and thread.parent_id in common.GuildConstants.HELP_FORUM_CHANNEL_IDS.values()
@@ -668,6 +801,7 @@ async def send_help_thread_solved_alert(thread: discord.Thread):
 
 
 async def thread_update(before: discord.Thread, after: discord.Thread):
+    help_threads.track_thread(after)
     if after.parent_id in common.GuildConstants.HELP_FORUM_CHANNEL_IDS.values():
         try:
             owner_id_suffix = f" | {after.owner_id}"
@@ -678,14 +812,14 @@ async def thread_update(before: discord.Thread, after: discord.Thread):
                 bad_thread_tags = False
 
                 updater_id = None
-
-                async for action in after.guild.audit_logs(
-                    limit=20, action=discord.AuditLogAction.thread_update
-                ):
-                    if (target := action.target) and target.id == after.id:
-                        if action.user:
-                            updater_id = action.user.id
-                            break
+                audit_log_entry = await audit_logs.fetch_audit_log_entry(
+                    after.guild,
+                    discord.AuditLogAction.thread_update,
+                    after.id,
+                    after=discord.utils.utcnow() - datetime.timedelta(seconds=10),
+                )
+                if audit_log_entry is not None:
+                    updater_id = audit_log_entry.user_id
 
                 if before.name != after.name and updater_id != common.bot.user.id:
                     if caution_types := get_help_forum_channel_thread_name_cautions(
@@ -757,8 +891,12 @@ async def thread_update(before: discord.Thread, after: discord.Thread):
                     common.bad_help_thread_data[after.id]["alert_message_ids"].update(
                         (msg.id for msg in caution_messages)
                     )
+                    common.bad_help_thread_data.mark_dirty(after.id)
                 else:
-                    if after.id in common.bad_help_thread_data and updater_id != common.bot.user.id:
+                    if (
+                        after.id in common.bad_help_thread_data
+                        and updater_id != common.bot.user.id
+                    ):
                         if (
                             after.slowmode_delay
                             == common.THREAD_TITLE_TOO_SHORT_SLOWMODE_DELAY
@@ -898,14 +1036,44 @@ async def thread_update(before: discord.Thread, after: discord.Thread):
 
 
 async def raw_thread_delete(payload: discord.RawThreadDeleteEvent):
+    help_threads.untrack_thread(payload.thread_id)
     if payload.thread_id in common.inactive_help_thread_data:
         del common.inactive_help_thread_data[payload.thread_id]
 
 
+# messages fetched for poll reactions. Only the poll configuration and options
+# of these are used, which do not change while the poll is ongoing.
+reaction_message_cache = utils.MessageCache(512)
+
+
+def is_help_thread_channel_id(channel_id: int) -> bool:
+    """Check whether a channel id belongs to a help thread, without making any
+    HTTP requests.
+    """
+    return help_threads.get_help_thread_state(
+        channel_id
+    ) is not None or help_threads.is_help_thread(common.bot.get_channel(channel_id))
+
+
 async def raw_reaction_add(payload: discord.RawReactionActionEvent):
     """
     Helper to handle a raw reaction added on discord
     """
+    if payload.user_id == common.bot.user.id or (
+        payload.member is not None and payload.member.bot
+    ):
+        return
+
+    # decide from the payload alone whether any handler cares about the reaction
+    is_help_thread_reaction = snakecore.utils.is_emoji_equal(
+        payload.emoji, "✅"
+    ) and is_help_thread_channel_id(payload.channel_id)
+
+    poll_data = await polls.get_poll(payload.message_id)
+    is_poll_reaction = poll_data is not None
+
+    if not (is_help_thread_reaction or is_poll_reaction):
+        return
 
     # Try to fetch channel without API call first
 
@@ -926,45 +1094,53 @@ async def raw_reaction_add(payload: discord.RawReactionActionEvent):
         return
 
     try:
-        user = common.bot.get_user(payload.user_id) or await common.bot.fetch_user(
-            payload.user_id
+        user = (
+            payload.member
+            or common.bot.get_user(payload.user_id)
+            or await common.bot.fetch_user(payload.user_id)
         )
-        msg: discord.Message = await channel.fetch_message(payload.message_id)
     except discord.HTTPException:
         return
 
     if user.bot:
         return
 
-    if (
-        msg.author.id == common.bot.user.id
-        and msg.embeds
-        and (footer_text := msg.embeds[0].footer.text)
-    ):
-        split_footer = footer_text.split("___\n")  # separator used by poll embeds
-
-        if len(split_footer) == 1:
-            return
-
-        try:
-            poll_config_map = parse_text_to_mapping(
-                split_footer[1], delimiter=":", separator=" | "
-            )
-        except (SyntaxError, ValueError):
-            raise
+    if is_poll_reaction:
+        emoji = str(payload.emoji)
+        poll_votes = polls.get_poll_votes(payload.message_id)
+        if poll_votes is None:  # load the voters once, after a restart
+            try:
+                poll_msg = await reaction_message_cache.fetch(
+                    channel, payload.message_id
+                )
+            except discord.HTTPException:
+                return
 
-        if (
-            "by" in poll_config_map
-            and "voting-mode" in poll_config_map
-            and poll_config_map["voting-mode"] == "single"
-        ):
-            for reaction in msg.reactions:
-                if not snakecore.utils.is_emoji_equal(payload.emoji, reaction.emoji):
+            poll_votes = await polls.load_poll_votes(poll_msg)
+        else:
+            polls.add_vote(payload.message_id, emoji, user.id)
+
+        if poll_data["voting_mode"] == "single":
+            # only the other votes of the member need to be removed
+            partial_poll_msg = channel.get_partial_message(payload.message_id)
+            for other_emoji, voters in poll_votes.items():
+                if other_emoji != emoji and user.id in voters:
+                    voters.discard(user.id)
                     try:
-                        await reaction.remove(user)
+                        await partial_poll_msg.remove_reaction(
+                            discord.PartialEmoji.from_str(other_emoji), user
+                        )
                     except discord.HTTPException:
                         pass
-                    await asyncio.sleep(0.1)
+
+    if not is_help_thread_reaction:
+        return
+
+    try:
+        msg: discord.Message = await channel.fetch_message(payload.message_id)
+    except discord.HTTPException:
+        return
+
     try:
         if (
             isinstance(msg.channel, discord.Thread)
@@ -1052,8 +1228,16 @@ async def raw_reaction_add(payload: discord.RawReactionActionEvent):
 
 
 async def raw_reaction_remove(payload: discord.RawReactionActionEvent):
+    polls.remove_vote(payload.message_id, str(payload.emoji), payload.user_id)
+
+    if not (
+        snakecore.utils.is_emoji_equal(payload.emoji, "✅")
+        and is_help_thread_channel_id(payload.channel_id)
+    ):
+        return
+
     channel = common.bot.get_channel(payload.channel_id)
-    if channel is not None:
+    if channel is None:
         try:
             channel = await common.bot.fetch_channel(payload.channel_id)
         except discord.HTTPException:
@@ -1173,12 +1357,7 @@ async def handle_message(msg: discord.Message):
             )
             return
         else:
-            ret = await handle_command(msg)
-        if ret is not None:
-            common.cmd_logs[msg.id] = ret
-
-        if len(common.cmd_logs) > 100:
-            del common.cmd_logs[next(iter(common.cmd_logs.keys()))]
+            await handle_command(msg)
 
     elif not common.TEST_MODE:
 
@@ -1207,15 +1386,7 @@ async def handle_message(msg: discord.Message):
                     ]
                     return
 
-                entry_type = "showcase"
-                color = 0xFF8800
-                title, fields = format_entries_message(msg, entry_type)
-                await snakecore.utils.embeds.send_embed(
-                    common.entries_discussion_channel,
-                    title=title,
-                    color=color,
-                    fields=fields,
-                )
+                await send_showcase_repost(msg)
 
     if msg.channel.id in common.UPVOTE_THREADS:
         try:
@@ -1224,6 +1395,49 @@ async def handle_message(msg: discord.Message):
             pass
 
 
+# command invocations are logged in the background, several per message, so
+# that logging does not delay commands
+command_log_batcher = utils.batching.EmbedBatcher(
+    lambda: common.log_channel, "command_log", flush_interval=2.0
+)
+
+
+def log_command(invoke_message: discord.Message):
+    """
+    Queue a command invocation to be logged in the log channel
+    """
+    log_txt_file = None
+    log_field_value = (
+        f"by {invoke_message.author.mention}\n"
+        f"**[View Original]({invoke_message.jump_url})**"
+    )
+    escaped_cmd_text = discord.utils.escape_markdown(invoke_message.content)
+    if len(escaped_cmd_text) > 2047:
+        # several logs can share a message, so each file is named after its
+        # invocation
+        log_txt_filename = f"command_{invoke_message.id}.txt"
+        log_txt_file = (log_txt_filename, invoke_message.content)
+        log_field_value += f"\nFull command in `{log_txt_filename}`"
+
+    command_log_batcher.put(
+        snakecore.utils.embeds.create_embed(
+            title=f"Command invoked by {invoke_message.author} / {invoke_message.author.id}",
+            description=escaped_cmd_text
+            if len(escaped_cmd_text) <= 2047
+            else escaped_cmd_text[:2044] + "...",
+            color=common.DEFAULT_EMBED_COLOR,
+            fields=[
+                dict(
+                    name="\u200b",
+                    value=log_field_value,
+                    inline=False,
+                ),
+            ],
+        ),
+        log_txt_file,
+    )
+
+
 async def handle_command(
     invoke_message: discord.Message, response_message: Optional[discord.Message] = None
 ):
@@ -1319,29 +1533,7 @@ async def handle_command(
     common.recent_response_messages[invoke_message.id] = response_message
 
     if not common.TEST_MODE and not common.GENERIC:
-        log_txt_file = None
-        escaped_cmd_text = discord.utils.escape_markdown(invoke_message.content)
-        if len(escaped_cmd_text) > 2047:
-            with io.StringIO(invoke_message.content) as log_buffer:
-                log_txt_file = discord.File(log_buffer, filename="command.txt")
-
-        await common.log_channel.send(
-            embed=snakecore.utils.embeds.create_embed(
-                title=f"Command invoked by {invoke_message.author} / {invoke_message.author.id}",
-                description=escaped_cmd_text
-                if len(escaped_cmd_text) <= 2047
-                else escaped_cmd_text[:2044] + "...",
-                color=common.DEFAULT_EMBED_COLOR,
-                fields=[
-                    dict(
-                        name="\u200b",
-                        value=f"by {invoke_message.author.mention}\n**[View Original]({invoke_message.jump_url})**",
-                        inline=False,
-                    ),
-                ],
-            ),
-            file=log_txt_file,
-        )
+        log_command(invoke_message)
 
     common.hold_task(
         asyncio.create_task(
@@ -1356,34 +1548,51 @@ async def handle_command(
         )
     )
 
-    await common.bot.invoke(ctx)
+    with common.recent_response_messages.running(invoke_message.id):
+        await common.bot.invoke(ctx)
     return response_message
 
 
-async def load_help_thread_data():
-    async with snakecore.storage.DiscordStorage(
-        "inactive_help_thread_data", dict
-    ) as storage_obj:
-        common.inactive_help_thread_data = storage_obj.obj
+async def load_help_thread_data(replaced_table_names: Iterable[str] = ()):
+    """
+    Load the help thread data from storage. The data of the tables with the
+    given names is replaced, as they were overwritten directly
+    """
+    replaced_table_names = set(replaced_table_names)
+    for table_name, data in (
+        ("inactive_help_thread_data", common.inactive_help_thread_data),
+        ("bad_help_thread_data", common.bad_help_thread_data),
+    ):
+        async with StorageTable(table_name, dict) as storage_obj:
+            if table_name in replaced_table_names:
+                data.replace_loaded(storage_obj.obj)
+            else:
+                # changes made before loading stay dirty, and are persisted later
+                data.merge_loaded(storage_obj.obj)
+
+
+async def reload_storage_tables(table_names: Iterable[str]):
+    """
+    Rebuild the state that was loaded from storage tables into memory, after the
+    tables were overwritten or deleted directly
+    """
+    table_names = set(table_names)
+    if "reminders" in table_names:
+        await reminders.load_reminders()
 
-    async with snakecore.storage.DiscordStorage(
-        "bad_help_thread_data", dict
-    ) as storage_obj:
-        bad_help_thread_data = storage_obj.obj
-        for thread_id, thread_data in bad_help_thread_data.items():
-            common.bad_help_thread_data[thread_id] = thread_data
+    if {"inactive_help_thread_data", "bad_help_thread_data"} & table_names:
+        await load_help_thread_data(table_names)
+        help_threads.reschedule_help_thread_deadlines()
 
+    if polls.POLLS_TABLE in table_names:
+        await polls.forget_unregistered_poll_votes()
 
-async def dump_help_thread_data():
-    async with snakecore.storage.DiscordStorage(
-        "inactive_help_thread_data", dict
-    ) as storage_obj:
-        storage_obj.obj = common.inactive_help_thread_data
+    for table_name in table_names:
+        reindex_member_table(table_name)
 
-    async with snakecore.storage.DiscordStorage(
-        "bad_help_thread_data", dict
-    ) as storage_obj:
-        storage_obj.obj = common.bad_help_thread_data
+
+async def dump_help_thread_data():
+    await routine.flush_help_thread_data()
 
 
 def cleanup(*_):
@@ -1391,7 +1600,9 @@ def cleanup(*_):
     Call cleanup functions
     """
     loop = asyncio.get_event_loop()
+    loop.run_until_complete(command_log_batcher.flush())
     loop.run_until_complete(dump_help_thread_data())
+    loop.run_until_complete(quit_storage_backend())
     loop.run_until_complete(snakecore.storage.quit_discord_storage())
     loop.run_until_complete(common.bot.close())
     loop.close()
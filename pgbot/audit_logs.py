@@ -0,0 +1,177 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines a short-lived cache of audit log entries, which is fed by the
+gateway, so that the member responsible for a change can usually be found
+without fetching the audit log.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import datetime
+import time
+from typing import Optional
+
+import discord
+
+from pgbot import metrics
+
+# cached entries expire after this many seconds
+AUDIT_LOG_ENTRY_TTL = 120.0
+
+# how long to wait for an entry to arrive from the gateway before fetching the
+# audit log, in seconds. Entries can arrive after the event they are about.
+AUDIT_LOG_ENTRY_WAIT_TIMEOUT = 2.0
+
+AuditLogKey = tuple[discord.AuditLogAction, int]  # (action, target id)
+
+# ordered by insertion, so that the oldest entries come first
+_entries: collections.OrderedDict[
+    AuditLogKey, tuple[discord.AuditLogEntry, float]
+] = collections.OrderedDict()
+_waiters: dict[AuditLogKey, list[asyncio.Future[discord.AuditLogEntry]]] = {}
+# the id of the last entry returned by `fetch_audit_log_entry` for every key,
+# ordered by insertion like `_entries`
+_consumed_ids: collections.OrderedDict[
+    AuditLogKey, tuple[int, float]
+] = collections.OrderedDict()
+
+cache_hits = metrics.counter("audit_logs.cache_hits")
+cache_misses = metrics.counter(
+    "audit_logs.cache_misses", "Number of audit log lookups that needed a fetch"
+)
+
+
+def _expire():
+    now = time.monotonic()
+    for expiring in (_entries, _consumed_ids):
+        while expiring:
+            key, (_, expires_at) = next(iter(expiring.items()))
+            if expires_at > now:
+                break
+            del expiring[key]
+
+
+def _consume(key: AuditLogKey, entry: discord.AuditLogEntry) -> bool:
+    # entries are only returned once, so that an event is never matched to the
+    # entry of an earlier change of the same target. Entry ids are snowflakes,
+    # which increase over time.
+    consumed = _consumed_ids.pop(key, None)
+    if consumed is not None and entry.id <= consumed[0]:
+        _consumed_ids[key] = consumed
+        return False
+
+    _consumed_ids[key] = (entry.id, time.monotonic() + AUDIT_LOG_ENTRY_TTL)
+    return True
+
+
+def record_audit_log_entry(entry: discord.AuditLogEntry):
+    """Add an audit log entry to the cache. This should be called for every entry
+    received from the gateway.
+    """
+    if entry.target is None:
+        return
+
+    key = (entry.action, entry.target.id)
+    cached = _entries.pop(key, None)
+    if cached is None or cached[0].id <= entry.id:  # only keep the newest entry
+        _entries[key] = (entry, time.monotonic() + AUDIT_LOG_ENTRY_TTL)
+    else:
+        _entries[key] = cached
+
+    for waiter in _waiters.pop(key, ()):
+        if not waiter.done():
+            waiter.set_result(entry)
+
+    _expire()
+
+
+def get_cached_audit_log_entry(
+    action: discord.AuditLogAction,
+    target_id: int,
+    after: Optional[datetime.datetime] = None,
+) -> Optional[discord.AuditLogEntry]:
+    """Get the newest cached audit log entry for an action on a target.
+
+    Args:
+        action (discord.AuditLogAction): The action.
+        target_id (int): The id of the target.
+        after (Optional[datetime.datetime], optional): Ignore entries created
+          before this time. Defaults to None.
+
+    Returns:
+        Optional[discord.AuditLogEntry]: The entry, if it is cached.
+    """
+    _expire()
+    cached = _entries.get((action, target_id))
+    if cached is None or (after is not None and cached[0].created_at < after):
+        return None
+    return cached[0]
+
+
+async def fetch_audit_log_entry(
+    guild: discord.Guild,
+    action: discord.AuditLogAction,
+    target_id: int,
+    after: Optional[datetime.datetime] = None,
+    limit: int = 20,
+) -> Optional[discord.AuditLogEntry]:
+    """Get the newest audit log entry for an action on a target. The cache is
+    checked first, then entries arriving from the gateway are waited for for a
+    short time, and only then is the audit log fetched.
+
+    Every entry is only returned once per target, so entries that are not newer
+    than the last one returned are ignored.
+
+    Args:
+        guild (discord.Guild): The guild of the audit log.
+        action (discord.AuditLogAction): The action.
+        target_id (int): The id of the target.
+        after (Optional[datetime.datetime], optional): Ignore entries created
+          before this time. Defaults to None.
+        limit (int, optional): The number of audit log entries to fetch on a
+          cache miss. Defaults to 20.
+
+    Returns:
+        Optional[discord.AuditLogEntry]: The entry, if it was found.
+    """
+    key = (action, target_id)
+    entry = get_cached_audit_log_entry(action, target_id, after)
+    if entry is not None and _consume(key, entry):
+        cache_hits.inc()
+        return entry
+    waiter: asyncio.Future[
+        discord.AuditLogEntry
+    ] = asyncio.get_running_loop().create_future()
+    _waiters.setdefault(key, []).append(waiter)
+    try:
+        entry = await asyncio.wait_for(waiter, AUDIT_LOG_ENTRY_WAIT_TIMEOUT)
+    except asyncio.TimeoutError:
+        entry = None
+    finally:
+        if key in _waiters and waiter in _waiters[key]:
+            _waiters[key].remove(waiter)
+            if not _waiters[key]:
+                del _waiters[key]
+
+    if (
+        entry is not None
+        and (after is None or entry.created_at >= after)
+        and _consume(key, entry)
+    ):
+        cache_hits.inc()
+        return entry
+
+    cache_misses.inc()
+    async for entry in guild.audit_logs(limit=limit, action=action):
+        if (target := entry.target) and target.id == target_id:
+            record_audit_log_entry(entry)
+            if (after is None or entry.created_at >= after) and _consume(key, entry):
+                return entry
+            break
+
+    return None
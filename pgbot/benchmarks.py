@@ -0,0 +1,360 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines benchmarks for internal subsystems of the bot, to be run
+through admin commands.
+"""
+
+from __future__ import annotations
+
+import datetime
+import functools
+import os
+import pickle
+import random
+import re
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Iterable, Optional
+
+from pgbot import help_thread_titles
+from pgbot.storage import (
+    SQLiteStorageBackend,
+    StorageBackend,
+    StorageTable,
+    decode_table,
+    encode_table,
+    get_storage_backend,
+    invalidate_table,
+    serialization,
+)
+
+BENCHMARK_TABLE_NAME = "__benchmark__"
+
+
+def make_reminders_table(
+    count: int, seed: int = 0
+) -> dict[int, dict[datetime.datetime, tuple[str, int, int]]]:
+    """Create a synthetic reminders table, shaped like the real one.
+
+    Args:
+        count (int): The total number of reminders.
+        seed (int, optional): The seed of the random number generator, for
+          reproducible tables. Defaults to 0.
+
+    Returns:
+        dict[int, dict[datetime.datetime, tuple[str, int, int]]]: The table.
+    """
+    rng = random.Random(seed)
+    now = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    words = ("do", "the", "thing", "pygame", "jam", "submit", "fix", "bug", "read")
+
+    table: dict[int, dict[datetime.datetime, tuple[str, int, int]]] = {}
+    member_ids = [rng.getrandbits(60) for _ in range(max(count // 5, 1))]
+    for _ in range(count):
+        member_reminders = table.setdefault(rng.choice(member_ids), {})
+        on = now + datetime.timedelta(seconds=rng.randrange(60, 86400 * 365))
+        member_reminders[on] = (
+            " ".join(rng.choice(words) for _ in range(rng.randrange(2, 20))),
+            rng.getrandbits(60),
+            rng.getrandbits(60),
+        )
+
+    return table
+
+
+def _summarize(times: list[float]) -> dict[str, float]:
+    return {
+        "mean": statistics.fmean(times),
+        "median": statistics.median(times),
+        "max": max(times),
+    }
+
+
+async def benchmark_storage_backend(
+    backend: StorageBackend, obj: Any, rounds: int = 10
+) -> dict[str, dict[str, float]]:
+    """Measure how long a storage backend takes to store and load a table. A
+    scratch table is used, which is deleted afterwards.
+
+    Args:
+        backend (StorageBackend): The initialized backend.
+        obj (Any): The table contents to store and load.
+        rounds (int, optional): How many times to store and load the table.
+          Defaults to 10.
+
+    Returns:
+        dict[str, dict[str, float]]: The mean, median and maximum durations in
+        seconds, for both "write" and "read".
+    """
+    write_times = []
+    read_times = []
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            await backend.store(BENCHMARK_TABLE_NAME, obj)
+            write_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await backend.load(BENCHMARK_TABLE_NAME, type(obj))
+            read_times.append(time.perf_counter() - start)
+    finally:
+        await backend.delete(BENCHMARK_TABLE_NAME)
+
+    return {"write": _summarize(write_times), "read": _summarize(read_times)}
+
+
+class _MemoryStorageBackend(StorageBackend):
+    # keeps encoded tables in memory, as a baseline without any IO
+
+    name = "memory"
+
+    def __init__(self):
+        self._tables: dict[str, bytes] = {}
+
+    async def load(self, table_name: str, dtype: type = dict) -> Any:
+        if table_name not in self._tables:
+            return dtype()
+        return decode_table(self._tables[table_name])
+
+    async def store(self, table_name: str, obj: Any) -> Optional[int]:
+        data = self._tables[table_name] = encode_table(obj)
+        return len(data)
+
+    async def delete(self, table_name: str) -> bool:
+        return self._tables.pop(table_name, None) is not None
+
+    async def table_names(self) -> list[str]:
+        return list(self._tables)
+
+
+async def benchmark_storage_backends(
+    reminder_count: int = 1000, rounds: int = 10, include_configured: bool = False
+) -> dict[str, dict[str, dict[str, float]]]:
+    """Compare the read and write latency of storage backends, on a synthetic
+    reminders table. By default, only isolated backends are measured: one that
+    keeps tables in memory, and the SQLite backend on a temporary database.
+
+    Args:
+        reminder_count (int, optional): The number of reminders in the table.
+          Defaults to 1000.
+        rounds (int, optional): How many times to store and load the table per
+          backend. Defaults to 10.
+        include_configured (bool, optional): Whether to also measure the storage
+          backend used by the bot, on a scratch table that is locked like other
+          tables while the benchmark runs. For the Discord backend, this writes
+          to the storage channel. Defaults to False.
+
+    Returns:
+        dict[str, dict[str, dict[str, float]]]: The results of
+        `benchmark_storage_backend` for every backend name.
+    """
+    table = make_reminders_table(reminder_count)
+    results = {}
+
+    results["memory"] = await benchmark_storage_backend(
+        _MemoryStorageBackend(), table, rounds
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        sqlite_backend = SQLiteStorageBackend(os.path.join(temp_dir, "bench.sqlite3"))
+        await sqlite_backend.init()
+        try:
+            results["sqlite"] = await benchmark_storage_backend(
+                sqlite_backend, table, rounds
+            )
+        finally:
+            await sqlite_backend.quit()
+
+    if include_configured:
+        backend = get_storage_backend()
+        try:
+            async with StorageTable(BENCHMARK_TABLE_NAME):  # only to hold its lock
+                results[
+                    f"{backend.name} (configured)"
+                ] = await benchmark_storage_backend(backend, table, rounds)
+        finally:
+            invalidate_table(BENCHMARK_TABLE_NAME)
+
+    return results
+
+
+def _eval_repr(data: str) -> Any:
+    return eval(data, {"datetime": datetime})  # pylint: disable = eval-used
+
+
+SERIALIZATION_FORMATS = {
+    # the format of pg!storage read and pg!storage write
+    "repr": (repr, _eval_repr),
+    "pickle": (
+        lambda obj: pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL),
+        pickle.loads,
+    ),
+    "binary": (serialization.dumps, serialization.loads),
+}
+
+
+def benchmark_serialization(
+    reminder_count: int = 10000, rounds: int = 3
+) -> dict[str, dict[str, float]]:
+    """Compare the encoding and decoding time and payload size of all storage
+    serialization formats, on a synthetic reminders table. This is CPU bound, so
+    it should be run in an executor.
+
+    Args:
+        reminder_count (int, optional): The number of reminders in the table.
+          Defaults to 10000.
+        rounds (int, optional): How many times to encode and decode the table per
+          format. Defaults to 3.
+
+    Returns:
+        dict[str, dict[str, float]]: The median encoding and decoding durations
+        in seconds ("encode" and "decode") and the payload size in bytes
+        ("size"), for every format name.
+    """
+    table = make_reminders_table(reminder_count)
+    results = {}
+    for format_name, (encode, decode) in SERIALIZATION_FORMATS.items():
+        encode_times = []
+        decode_times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            data = encode(table)
+            encode_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            decode(data)
+            decode_times.append(time.perf_counter() - start)
+
+        results[format_name] = {
+            "encode": statistics.median(encode_times),
+            "decode": statistics.median(decode_times),
+            "size": len(data),
+        }
+
+    return results
+
+
+# help thread titles in the style of the help forums, mixing titles that deserve
+# cautions with ones that don't
+HELP_THREAD_TITLE_SAMPLES = (
+    "help",
+    "Help me please",
+    "my code is not working",
+    "Why is my pygame game not working??",
+    "can someone write a snake game for me",
+    "please help me make a platformer",
+    "what's wrong with my code",
+    "What is the problem with this code",
+    "Can anyone help with my pygame project? It doesn't work",
+    "How do I rotate a sprite around its center",
+    "pygame.display.flip() not updating the screen",
+    "Collision detection between a rect and a mask",
+    "How can I make my character jump smoothly",
+    "Sound plays twice when the button is pressed",
+    "Tilemap renders with gaps between tiles at some zoom levels",
+    "ModuleNotFoundError: No module named 'pygame'",
+    "Best way to structure game states?",
+    "Pixel perfect collision with rotated images",
+    "Game freezes when the window is moved on Windows",
+    "need help with pathfinding",
+)
+
+
+def _classify_title_separately(title: str) -> tuple[str, ...]:
+    # the previous approach, which normalized the title again for every pattern
+    return tuple(
+        caution_type
+        for caution_type, pattern in help_thread_titles.get_title_patterns()
+        if pattern.search(help_thread_titles.normalize_title(title)) is not None
+    )
+
+
+def _make_combined_title_classifier() -> Callable[[str], tuple[str, ...]]:
+    # one alternation with a named group per caution type. An alternation only
+    # reports one caution type per match, so the title is searched again for the
+    # caution types that were not found yet, until none match.
+    title_patterns = help_thread_titles.get_title_patterns()
+
+    @functools.lru_cache(maxsize=None)
+    def get_pattern(caution_types: frozenset[str]) -> re.Pattern[str]:
+        return re.compile(
+            "|".join(
+                f"(?P<{caution_type}>{pattern.pattern})"
+                for caution_type, pattern in title_patterns
+                if caution_type in caution_types
+            ),
+            re.IGNORECASE,
+        )
+
+    def classify(title: str) -> tuple[str, ...]:
+        title = help_thread_titles.normalize_title(title)
+        remaining = frozenset(caution_type for caution_type, _ in title_patterns)
+        while remaining and (match := get_pattern(remaining).search(title)):
+            remaining -= {match.lastgroup}
+
+        return tuple(
+            caution_type
+            for caution_type, _ in title_patterns
+            if caution_type not in remaining
+        )
+
+    return classify
+
+
+def benchmark_help_thread_titles(
+    titles: Iterable[str] = HELP_THREAD_TITLE_SAMPLES, rounds: int = 100
+) -> dict[str, dict[str, float]]:
+    """Compare the time taken to find the cautions of help thread titles with
+    the previous approach, with a combined alternation of all patterns, with
+    `pgbot.help_thread_titles` and with its cache warmed up. This is CPU bound,
+    so it should be run in an executor.
+
+    Args:
+        titles (Iterable[str], optional): The titles to classify. Defaults to
+          HELP_THREAD_TITLE_SAMPLES.
+        rounds (int, optional): How many times to classify every title per
+          approach. Defaults to 100.
+
+    Returns:
+        dict[str, dict[str, float]]: The median duration of classifying all
+        titles once in seconds ("total"), and the number of titles whose result
+        differs from the previous approach ("mismatches"), for every approach
+        name.
+    """
+    titles = tuple(titles)
+    approaches: dict[str, Callable[[str], tuple[str, ...]]] = {
+        "previous": _classify_title_separately,
+        "combined": _make_combined_title_classifier(),
+        "current": lambda title: help_thread_titles.classify_title(
+            help_thread_titles.normalize_title(title)
+        ),
+        "cached": functools.lru_cache(maxsize=None)(
+            lambda title: help_thread_titles.classify_title(
+                help_thread_titles.normalize_title(title)
+            )
+        ),
+    }
+
+    expected = [_classify_title_separately(title) for title in titles]
+    results = {}
+    for approach_name, classify in approaches.items():
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for title in titles:
+                classify(title)
+            times.append(time.perf_counter() - start)
+
+        results[approach_name] = {
+            "total": statistics.median(times),
+            "mismatches": sum(
+                classify(title) != caution_types
+                for title, caution_types in zip(titles, expected)
+            ),
+        }
+
+    return results
@@ -8,13 +8,24 @@ as well as other small helpful constructs.
 """
 
 import asyncio
+import collections
+import contextlib
 import datetime
-import io
+import itertools
 import json
 import os
 import re
 import sys
-from typing import Optional, TypedDict, Union
+import time
+from typing import (
+    TYPE_CHECKING,
+    Iterator,
+    MutableMapping,
+    Optional,
+    TypedDict,
+    TypeVar,
+    Union,
+)
 from typing_extensions import NotRequired
 
 import discord
@@ -24,6 +35,11 @@ import snakecore
 
 from dotenv import load_dotenv
 
+from pgbot import metrics
+
+if TYPE_CHECKING:
+    from pgbot.utils import RingBufferTextIO
+
 if os.path.isfile(".env"):
     load_dotenv()  # take environment variables from .env
 
@@ -31,7 +47,6 @@ if os.path.isfile(".env"):
 Channel = Union[
     discord.TextChannel, discord.DMChannel, discord.Thread, discord.GroupChannel
 ]
-cmd_logs = {}
 _global_task_set: set[
     asyncio.Task
 ] = set()  # prevents asyncio.Task objects from disappearing due
@@ -60,13 +75,13 @@ def _global_task_set_remove_callback(task: asyncio.Task):
     task.remove_done_callback(_global_task_set_remove_callback)
 
 
-recent_response_messages: dict[int, discord.Message] = {}
-
 # pygame community guild, or whichever is the 'primary' guild for the bot
 guild: Optional[discord.Guild] = None
 
-# IO object to redirect output to discord, gets patched later
-stdout: Optional[io.StringIO] = None
+# IO object to redirect output to discord, gets patched later. Once it holds
+# this many characters, the oldest output is dropped
+stdout: Optional["RingBufferTextIO"] = None
+CONSOLE_BUFFER_SIZE = 256 * 1024
 
 old_stdout = sys.stdout
 old_stderr = sys.stderr
@@ -82,6 +97,12 @@ rules_channel: discord.TextChannel
 entry_channels = {}
 entry_message_deletion_dict = {}
 
+# members that joined but have not completed membership screening yet, mapped to
+# the monotonic time after which they are no longer waited for. Since all
+# members are waited for equally long, the earliest deadlines come first.
+pending_member_joins: collections.OrderedDict[int, float] = collections.OrderedDict()
+PENDING_MEMBER_TTL = 3600 * 6
+
 
 class BadHelpThreadData(TypedDict):
     thread_id: int
@@ -95,8 +116,232 @@ class InactiveHelpThreadData(TypedDict):
     alert_message_id: NotRequired[int]
 
 
-bad_help_thread_data: dict[int, BadHelpThreadData] = {}
-inactive_help_thread_data: dict[int, InactiveHelpThreadData] = {}
+_K = TypeVar("_K")
+_V = TypeVar("_V")
+
+
+class DirtyTrackingDict(dict[_K, _V]):
+    """A dictionary that remembers which of its keys were added, replaced or
+    removed since the last call to `take_dirty_keys()`, so that only those
+    entries need to be persisted.
+
+    Changes to mutable values stored in the dictionary cannot be detected, so
+    they have to be reported with `mark_dirty()`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dirty_keys: set[_K] = set()
+
+    def mark_dirty(self, key: _K):
+        """Mark the entry of a key as changed."""
+        self.dirty_keys.add(key)
+
+    def take_dirty_keys(self) -> set[_K]:
+        """Get the keys of all changed entries, and reset the change tracking."""
+        dirty_keys = self.dirty_keys
+        self.dirty_keys = set()
+        return dirty_keys
+
+    def merge_loaded(self, data: dict[_K, _V]):
+        """Add entries loaded from storage without tracking the change. Entries
+        that were changed or removed since the last call to `take_dirty_keys()`
+        are newer than the loaded ones, and are kept.
+        """
+        for key, value in data.items():
+            if key not in self.dirty_keys:
+                super().__setitem__(key, value)
+
+    def replace_loaded(self, data: dict[_K, _V]):
+        """Replace all entries with entries loaded from storage, without tracking
+        the change. Changes that were not persisted yet are discarded.
+        """
+        super().clear()
+        super().update(data)
+        self.dirty_keys = set()
+
+    def __setitem__(self, key: _K, value: _V):
+        super().__setitem__(key, value)
+        self.dirty_keys.add(key)
+
+    def __delitem__(self, key: _K):
+        super().__delitem__(key)
+        self.dirty_keys.add(key)
+
+    def pop(self, key: _K, *default):
+        if key in self:
+            self.dirty_keys.add(key)
+        return super().pop(key, *default)
+
+    def popitem(self) -> tuple[_K, _V]:
+        key, value = super().popitem()
+        self.dirty_keys.add(key)
+        return key, value
+
+    def setdefault(self, key: _K, default: _V = None):  # type: ignore
+        if key not in self:
+            self.dirty_keys.add(key)
+        return super().setdefault(key, default)  # type: ignore
+
+    def update(self, *args, **kwargs):
+        changes = dict(*args, **kwargs)
+        super().update(changes)
+        self.dirty_keys.update(changes)
+
+    def clear(self):
+        self.dirty_keys.update(self)
+        super().clear()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+
+class CommandResponseIndex(MutableMapping[int, discord.Message]):
+    """A mapping of the ids of command invocation messages to the messages that
+    the bot responded with, which can also be looked up by response message id.
+    Entries expire after a time-to-live, and the oldest entries are evicted
+    once the index is full, except for those of invocations whose command is
+    still running (see `running`).
+    """
+
+    def __init__(self, name: str, max_size: int = 1000, ttl: float = 3600.0):
+        """Create a new command response index.
+
+        Args:
+            name (str): The name of the index, used as the prefix of its metrics.
+            max_size (int, optional): The maximum number of entries. Defaults to
+              1000.
+            ttl (float, optional): The number of seconds after which entries
+              expire. Defaults to 3600.0.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        # kept in order of insertion, so that the oldest entries come first
+        self._responses: collections.OrderedDict[
+            int, tuple[discord.Message, float]
+        ] = collections.OrderedDict()
+        self._invocation_ids: dict[int, int] = {}
+        # invocation id -> number of running commands of the invocation
+        self._running: dict[int, int] = {}
+
+        self._size_gauge = metrics.gauge(f"{name}.size", "Number of entries")
+        self._evicted_count = metrics.counter(
+            f"{name}.evicted", "Number of entries evicted because the index was full"
+        )
+        self._expired_count = metrics.counter(
+            f"{name}.expired", "Number of entries that expired"
+        )
+
+    def _remove(self, invocation_id: int) -> discord.Message:
+        response_message, _ = self._responses.pop(invocation_id)
+        if self._invocation_ids.get(response_message.id) == invocation_id:
+            del self._invocation_ids[response_message.id]
+        self._size_gauge.set(len(self._responses))
+        return response_message
+
+    @contextlib.contextmanager
+    def running(self, invocation_id: int):
+        """A context manager that keeps the entry of an invocation from expiring
+        or being evicted while its command runs, so that the command can always
+        look up its response message.
+
+        Args:
+            invocation_id (int): The id of the invocation message.
+        """
+        self._running[invocation_id] = self._running.get(invocation_id, 0) + 1
+        try:
+            yield
+        finally:
+            if self._running[invocation_id] > 1:
+                self._running[invocation_id] -= 1
+            else:
+                del self._running[invocation_id]
+
+    def expire(self):
+        """Remove all expired entries."""
+        now = time.monotonic()
+        expired = []
+        for invocation_id, (_, expires_at) in self._responses.items():
+            if expires_at > now:
+                break
+            if invocation_id not in self._running:
+                expired.append(invocation_id)
+
+        for invocation_id in expired:
+            self._remove(invocation_id)
+            self._expired_count.inc()
+
+    def __getitem__(self, invocation_id: int) -> discord.Message:
+        response_message, expires_at = self._responses[invocation_id]
+        if expires_at <= time.monotonic() and invocation_id not in self._running:
+            self._remove(invocation_id)
+            self._expired_count.inc()
+            raise KeyError(invocation_id)
+        return response_message
+
+    def __setitem__(self, invocation_id: int, response_message: discord.Message):
+        if invocation_id in self._responses:
+            self._remove(invocation_id)
+
+        self.expire()
+        evicted = list(
+            itertools.islice(
+                (
+                    evicted_id
+                    for evicted_id in self._responses
+                    if evicted_id not in self._running
+                ),
+                max(len(self._responses) - self.max_size + 1, 0),
+            )
+        )
+        for evicted_id in evicted:
+            self._remove(evicted_id)
+            self._evicted_count.inc()
+
+        self._responses[invocation_id] = (
+            response_message,
+            time.monotonic() + self.ttl,
+        )
+        self._invocation_ids[response_message.id] = invocation_id
+        self._size_gauge.set(len(self._responses))
+
+    def __delitem__(self, invocation_id: int):
+        self._remove(invocation_id)
+
+    def __iter__(self) -> Iterator[int]:
+        self.expire()
+        return iter(tuple(self._responses))
+
+    def __len__(self) -> int:
+        self.expire()
+        return len(self._responses)
+
+    def pop_response(self, response_id: int) -> Optional[discord.Message]:
+        """Remove the entry of a response message, if it is indexed.
+
+        Args:
+            response_id (int): The id of the response message.
+
+        Returns:
+            Optional[discord.Message]: The response message.
+        """
+        invocation_id = self._invocation_ids.get(response_id)
+        if invocation_id is None or invocation_id not in self._responses:
+            return None
+        return self._remove(invocation_id)
+
+
+# invocation message id -> response message of recent command invocations. The
+# response messages of edited invocations are reused.
+recent_response_messages = CommandResponseIndex("command_responses")
+
+# changes to the values of these must be reported with mark_dirty(), they are
+# persisted periodically by routine.help_thread_data_flusher
+bad_help_thread_data: DirtyTrackingDict[int, BadHelpThreadData] = DirtyTrackingDict()
+inactive_help_thread_data: DirtyTrackingDict[
+    int, InactiveHelpThreadData
+] = DirtyTrackingDict()
 
 
 CAUTION_WHILE_MESSAGING_COOLDOWN: int = 900
@@ -126,6 +371,15 @@ if TEST_USER_ID is not None:
 
 COMMAND_PREFIX = "pd!" if TEST_MODE else "pg!"
 
+# the backend that storage tables are persisted with, either "discord" or "sqlite"
+STORAGE_BACKEND = os.environ.get("PGBOT_STORAGE_BACKEND", "discord")
+SQLITE_STORAGE_PATH = os.environ.get("PGBOT_SQLITE_PATH", "pgbot_storage.sqlite3")
+
+# if set, a snapshot of the metrics of the bot is written to this JSON file
+# every METRICS_DUMP_INTERVAL seconds
+METRICS_DUMP_PATH = os.environ.get("PGBOT_METRICS_DUMP_PATH")
+METRICS_DUMP_INTERVAL = 60
+
 DEFAULT_FILESIZE_LIMIT = 8_000_000  # bytes
 
 DEFAULT_EMBED_COLOR = 0xFFFFAA
@@ -13,13 +13,14 @@ import snakecore
 from snakecore.commands.parser import ArgError, KwargError
 
 import pgbot
-from pgbot import common
+from pgbot import audit_logs, common, help_threads, metrics
 from pgbot.common import bot
 from pgbot.exceptions import AdminOnly, BotException, NoFunAllowed
 from pgbot.utils import message_delete_reaction_listener
 
 
 @bot.event
+@metrics.instrumented("events.on_ready")
 async def on_ready():
     """
     Startup routines when the bot starts
@@ -28,6 +29,7 @@ async def on_ready():
 
 
 @bot.event
+@metrics.instrumented("events.on_member_join")
 async def on_member_join(member: discord.Member):
     """
     This function handles the greet message when a new member joins
@@ -39,6 +41,19 @@ async def on_member_join(member: discord.Member):
 
 
 @bot.event
+@metrics.instrumented("events.on_member_update")
+async def on_member_update(before: discord.Member, after: discord.Member):
+    """
+    This function greets new members once they complete the join screening
+    """
+    if after.bot:
+        return
+
+    await pgbot.member_update(before, after)
+
+
+@bot.event
+@metrics.instrumented("events.on_member_leave")
 async def on_member_leave(member: discord.Member):
     """
     Routines to run when people leave the server
@@ -47,10 +62,12 @@ async def on_member_leave(member: discord.Member):
 
 
 @bot.event
+@metrics.instrumented("events.on_message")
 async def on_message(msg: discord.Message):
     """
     This function is called for every message by user.
     """
+    help_threads.track_message(msg)  # bot messages count as thread activity too
     if msg.author.bot:
         return
 
@@ -58,6 +75,7 @@ async def on_message(msg: discord.Message):
 
 
 @bot.event
+@metrics.instrumented("events.on_message_edit")
 async def on_message_edit(old: discord.Message, new: discord.Message):
     """
     This function is called for every message edited by user.
@@ -69,6 +87,7 @@ async def on_message_edit(old: discord.Message, new: discord.Message):
 
 
 @bot.event
+@metrics.instrumented("events.on_message_delete")
 async def on_message_delete(msg: discord.Message):
     """
     This function is called for every message deleted by user.
@@ -77,31 +96,55 @@ async def on_message_delete(msg: discord.Message):
 
 
 @bot.event
+@metrics.instrumented("events.on_raw_message_delete")
+async def on_raw_message_delete(payload: discord.RawMessageDeleteEvent):
+    await pgbot.raw_message_delete(payload)
+
+
+@bot.event
+@metrics.instrumented("events.on_raw_bulk_message_delete")
+async def on_raw_bulk_message_delete(payload: discord.RawBulkMessageDeleteEvent):
+    await pgbot.raw_bulk_message_delete(payload)
+
+
+@bot.event
+@metrics.instrumented("events.on_thread_create")
 async def on_thread_create(thread: discord.Thread):
     await pgbot.thread_create(thread)
 
 
 @bot.event
+@metrics.instrumented("events.on_thread_update")
 async def on_thread_update(before: discord.Thread, after: discord.Thread):
     await pgbot.thread_update(before, after)
 
 
 @bot.event
+@metrics.instrumented("events.on_raw_thread_delete")
 async def on_raw_thread_delete(payload: discord.RawThreadDeleteEvent):
     await pgbot.raw_thread_delete(payload)
 
 
 @bot.event
+@metrics.instrumented("events.on_audit_log_entry_create")
+async def on_audit_log_entry_create(entry: discord.AuditLogEntry):
+    audit_logs.record_audit_log_entry(entry)
+
+
+@bot.event
+@metrics.instrumented("events.on_raw_reaction_add")
 async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
     await pgbot.raw_reaction_add(payload)
 
 
 @bot.event
+@metrics.instrumented("events.on_raw_reaction_remove")
 async def on_raw_reaction_remove(payload: discord.RawReactionActionEvent):
     await pgbot.raw_reaction_remove(payload)
 
 
 @bot.event
+@metrics.instrumented("events.on_command_error")
 async def on_command_error(ctx: commands.Context, error: commands.CommandError):
 
     title = error.__class__.__name__
@@ -209,17 +252,10 @@ async def on_command_error(ctx: commands.Context, error: commands.CommandError):
         )
     )
 
-    if ctx.message.id in common.recent_response_messages:
-        del common.recent_response_messages[ctx.message.id]
+    # the response is kept, so that edits of the invocation can reuse it
+    common.recent_response_messages[ctx.message.id] = target_message
 
     if raise_error:
         if has_cause:
             raise error.__cause__
         raise error
-
-
-@bot.event
-async def on_command_completion(ctx: commands.Context):
-
-    if ctx.message.id in common.recent_response_messages:
-        del common.recent_response_messages[ctx.message.id]
@@ -11,9 +11,11 @@ from __future__ import annotations
 import asyncio
 import datetime
 import io
+import itertools
 import os
+import tempfile
 import time
-from typing import Optional, Union
+from typing import Any, Optional, TextIO, Union
 
 import black
 import discord
@@ -21,20 +23,80 @@ from discord.ext import commands
 import psutil
 import snakecore
 
-from pgbot import common
+from pgbot import benchmarks, common, help_threads
 import pgbot
 from .emsudo import EmsudoCommandCog
 from .sudo import SudoCommandCog
 from ..utils.checks import admin_only, admin_only_and_custom_parsing
+from ..utils.help import invalidate_help_catalog
 from ..base import CommandMixinCog
 from ..utils.converters import (
     CodeBlock,
     String,
 )
 from pgbot.exceptions import BotException
+from pgbot.metrics import snapshot as get_metrics_snapshot
+from pgbot.storage import (
+    StorageTable,
+    create_storage_backend,
+    estimate_table_size,
+    get_storage_backend,
+    get_stored_member_ids,
+    get_table_stats,
+    read_table,
+)
 
 process = psutil.Process(os.getpid())
 
+STORAGE_READ_PAGE_SIZE = 50  # table items per page of pg!storage read
+
+
+def _format_table_item(item: str, brackets: str) -> str:
+    # format a single item inside of a one-item literal, and unwrap it again
+    formatted = black.format_str(
+        f"{brackets[0]}{item}{brackets[1]}", mode=black.FileMode()
+    ).strip()
+    if formatted.startswith(brackets[0] + "\n"):  # exploded over multiple lines
+        inner = formatted[2:-2]
+        return inner + "\n" if inner.endswith(",") else inner + ",\n"
+
+    return f"    {formatted[1:-1]},\n"
+
+
+def write_formatted_table(
+    obj: Any, fobj: TextIO, start: int = 0, stop: Optional[int] = None
+):
+    """Write the formatted contents of a storage table into a text file, one
+    item at a time, so that large tables never have to be formatted as a whole.
+    The output can be read back with `eval`. This is CPU bound, so it should be
+    run in an executor.
+
+    Args:
+        obj (Any): The table contents.
+        fobj (TextIO): The file to write to.
+        start (int, optional): The index of the first item to write, for
+          dictionaries and lists. Defaults to 0.
+        stop (Optional[int], optional): The index after the last item to write,
+          for dictionaries and lists. Defaults to None.
+    """
+    if isinstance(obj, dict):
+        brackets = "{}"
+        items = (
+            f"{key!r}: {value!r}"
+            for key, value in itertools.islice(obj.items(), start, stop)
+        )
+    elif isinstance(obj, list):
+        brackets = "[]"
+        items = (repr(value) for value in itertools.islice(obj, start, stop))
+    else:
+        fobj.write(black.format_str(repr(obj or None), mode=black.FileMode()))
+        return
+
+    fobj.write(brackets[0] + "\n")
+    for item in items:
+        fobj.write(_format_table_item(item, brackets))
+    fobj.write(brackets[1] + "\n")
+
 
 class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
     """
@@ -110,35 +172,76 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
         await snakecore.utils.embeds.replace_embed_at(
             response_message,
             title="Tables:",
-            description="\n".join(
-                snakecore.storage.DiscordStorage._storage_records.keys()
-            ),
+            description="\n".join(await get_storage_backend().table_names()),
+            footer_text=f"Storage backend: {get_storage_backend().name}",
             color=common.DEFAULT_EMBED_COLOR,
         )
 
     @storage.command(name="read")
     @admin_only_and_custom_parsing(inside_class=True, inject_message_reference=True)
-    async def storage_read(self, ctx: commands.Context, name: str):
+    async def storage_read(self, ctx: commands.Context, name: str, page: int = 0):
         """
         ->type Admin commands
-        ->signature pg!storage read <name>
+        ->signature pg!storage read <name> [page]
         ->description Visualize storage
+        ->extended description
+        Send the contents of a storage table as a file.
+        For large tables, pass `page=N` to only get the N-th page of the items of the table,
+        with 50 items per page.
+        ->example command pg!storage read reminders page=2
         -----
         Implement pg!storage_read, to visualise storage messages
         """
 
         response_message = common.recent_response_messages[ctx.message.id]
 
-        async with snakecore.storage.DiscordStorage(name) as storage_obj:
-            str_obj = black.format_str(
-                repr(storage_obj.obj or None),
-                mode=black.FileMode(),
+        obj = await read_table(name)
+        start, stop = 0, None
+        header = f"Here are the contents of the table `{name}`"
+        if page:
+            if not isinstance(obj, (dict, list)):
+                raise BotException(
+                    "Invalid page!",
+                    f"The table `{name}` is not a dictionary or a list, "
+                    "so it cannot be paginated",
+                )
+
+            page_count = max(-(-len(obj) // STORAGE_READ_PAGE_SIZE), 1)
+            if not 0 < page <= page_count:
+                raise BotException(
+                    "Invalid page!",
+                    f"The page must be between 1 and {page_count}",
+                )
+
+            start = (page - 1) * STORAGE_READ_PAGE_SIZE
+            stop = start + STORAGE_READ_PAGE_SIZE
+            header += (
+                f" (page {page} of {page_count}, "
+                f"items {start + 1}-{min(stop, len(obj))} of {len(obj)})"
             )
 
-        with io.StringIO(str_obj) as fobj:
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as fobj:
+            # formatting large tables takes long, don't block the event loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, write_formatted_table, obj, fobj, start, stop
+            )
+
+            if fobj.tell() > common.DEFAULT_FILESIZE_LIMIT:
+                raise BotException(
+                    "Table too large!",
+                    f"The contents of the table `{name}` are too large to be sent "
+                    "as a file. Use `page=N` to read one page at a time.",
+                )
+
+            fobj.seek(0)
             await ctx.channel.send(
-                f"Here are the contents of the table `{name}`:",
-                file=discord.File(fobj, filename=f"{name}_storage.py"),
+                header + ":",
+                file=discord.File(
+                    fobj,  # type: ignore
+                    filename=f"{name}_storage"
+                    + (f"_page_{page}" if page else "")
+                    + ".py",
+                ),
             )
 
         try:
@@ -187,9 +290,11 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
                 "Failed to overwrite storage", "File attachment was not found"
             )
 
-        async with snakecore.storage.DiscordStorage(name) as storage_obj:
+        async with StorageTable(name) as storage_obj:
             storage_obj.obj = eval(obj_str)  # pylint: disable = eval-used
 
+        await pgbot.reload_storage_tables((name,))
+
         await snakecore.utils.embeds.replace_embed_at(
             response_message,
             title="Storage overwritten!",
@@ -210,13 +315,14 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
 
         response_message = common.recent_response_messages[ctx.message.id]
 
-        async with snakecore.storage.DiscordStorage(name) as storage_obj:
-            try:
-                del storage_obj.obj
-            except AttributeError:
+        async with StorageTable(name) as storage_obj:
+            if name not in await get_storage_backend().table_names():
                 raise BotException(
                     "Could not delete storage", "Deletion has already occured"
                 )
+            del storage_obj.obj
+
+        await pgbot.reload_storage_tables((name,))
 
         await snakecore.utils.embeds.replace_embed_at(
             response_message,
@@ -225,6 +331,356 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
             color=common.DEFAULT_EMBED_COLOR,
         )
 
+    @storage.command(name="migrate")
+    @admin_only_and_custom_parsing(inside_class=True, inject_message_reference=True)
+    async def storage_migrate(self, ctx: commands.Context, source: str, *names: str):
+        """
+        ->type Admin commands
+        ->signature pg!storage migrate <source backend> [*names]
+        ->description Copy storage tables from another storage backend
+        ->extended description
+        Copy all tables, or only the tables with the given names, from the given
+        storage backend (`discord` or `sqlite`) into the storage backend used by the bot.
+        Existing tables with the same names are overwritten.
+        ->example command pg!storage migrate discord
+        -----
+        Implement pg!storage_migrate, to move storage tables between backends
+        """
+
+        response_message = common.recent_response_messages[ctx.message.id]
+
+        target_backend = get_storage_backend()
+        if source == target_backend.name:
+            raise BotException(
+                "Could not migrate storage",
+                f"The bot is already using the `{source}` storage backend",
+            )
+
+        try:
+            source_backend = create_storage_backend(source)
+        except ValueError as e:
+            raise BotException("Could not migrate storage", str(e))
+
+        await source_backend.init()
+        try:
+            names = names or tuple(await source_backend.table_names())
+            for name in names:
+                obj = await source_backend.load(name, dict)
+                async with StorageTable(name, type(obj)) as storage_obj:
+                    storage_obj.obj = obj
+        finally:
+            if source_backend.name != "discord":  # managed by snakecore
+                await source_backend.quit()
+
+        await pgbot.reload_storage_tables(names)
+
+        await snakecore.utils.embeds.replace_embed_at(
+            response_message,
+            title="Storage migrated!",
+            description=f"Copied {len(names)} table(s) from the `{source}` to the "
+            f"`{target_backend.name}` storage backend:\n"
+            + "\n".join(f"`{name}`" for name in names),
+            color=common.DEFAULT_EMBED_COLOR,
+        )
+
+    @storage.command(name="purge_departed")
+    @admin_only()
+    async def storage_purge_departed(self, ctx: commands.Context):
+        """
+        ->type Admin commands
+        ->signature pg!storage purge_departed
+        ->description Remove members who left the server from storage
+        ->extended description
+        Compare the members referenced in storage tables against the member list of the server,
+        and remove all members who are not on the server anymore.
+        -----
+        Implement pg!storage_purge_departed, to clean up storage after missed member leaves
+        """
+
+        response_message = common.recent_response_messages[ctx.message.id]
+
+        if common.guild is None:
+            raise BotException(
+                "Could not purge storage", "The primary guild of the bot was not set"
+            )
+
+        if common.guild.chunked:
+            guild_member_ids = set(member.id for member in common.guild.members)
+        else:
+            guild_member_ids = set(
+                [member.id async for member in common.guild.fetch_members(limit=None)]
+            )
+
+        departed_member_ids = await get_stored_member_ids() - guild_member_ids
+        removed = await pgbot.purge_members_from_storage(departed_member_ids)
+
+        await snakecore.utils.embeds.replace_embed_at(
+            response_message,
+            title="Departed members purged!",
+            description=f"Removed {len(departed_member_ids)} departed member(s) "
+            "from storage"
+            + (
+                ":\n"
+                + "\n".join(
+                    f"`{table_name}`: {len(table_removed)} member(s)"
+                    for table_name, table_removed in removed.items()
+                )
+                if removed
+                else ""
+            ),
+            color=common.DEFAULT_EMBED_COLOR,
+        )
+
+    @storage.command(name="stats")
+    @admin_only()
+    async def storage_stats(self, ctx: commands.Context):
+        """
+        ->type Admin commands
+        ->signature pg!storage stats
+        ->description Show access statistics of storage tables
+        ->extended description
+        Show the cache hit rate, the number of reads and writes, the serialized size
+        and the lock wait and hold times of every storage table that was accessed so far.
+        Sizes that the storage backend does not report are estimated by encoding the
+        cached tables.
+        -----
+        Implement pg!storage_stats, to show how storage tables are accessed
+        """
+
+        response_message = common.recent_response_messages[ctx.message.id]
+
+        def format_ms(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value * 1000:.1f}ms"
+
+        fields = []
+        for name, stats in sorted(get_table_stats().items()):
+            reads = stats["hits"] + stats["misses"]
+            hit_rate = stats["hits"] / reads if reads else 0.0
+            lock_wait = stats["lock_wait"]
+            lock_hold = stats["lock_hold"]
+            size = stats["size"]
+            size_is_estimate = size is None
+            if size_is_estimate:
+                size = await estimate_table_size(name)
+            fields.append(
+                dict(
+                    name=name,
+                    value=(
+                        f"Hit rate: `{hit_rate:.1%}` ({stats['hits']}/{reads})\n"
+                        f"Loads/Writes/Stores: `{stats['misses']}`/"
+                        f"`{stats['writes']}`/`{stats['stores']}`\n"
+                        "Size: "
+                        + (
+                            f"`{snakecore.utils.format_byte(size, 2)}`"
+                            + (" (estimated)" if size_is_estimate else "")
+                            if size is not None
+                            else "`-`"
+                        )
+                        + "\n"
+                        f"Lock wait p50/max: `{format_ms(lock_wait['p50'])}`/"
+                        f"`{format_ms(lock_wait['max'])}`\n"
+                        f"Lock hold p50/max: `{format_ms(lock_hold['p50'])}`/"
+                        f"`{format_ms(lock_hold['max'])}`\n"
+                        f"Version: `{stats['version']}`"
+                    ),
+                    inline=True,
+                )
+            )
+
+        await snakecore.utils.embeds.replace_embed_at(
+            response_message,
+            title="Storage statistics",
+            description=None if fields else "No storage tables were accessed yet",
+            fields=fields[:25],
+            color=common.DEFAULT_EMBED_COLOR,
+        )
+
+    @commands.group(invoke_without_command=True)
+    @admin_only()
+    async def benchmark(self, ctx: commands.Context):
+        """
+        ->type Admin commands
+        ->signature pg!benchmark
+        ->description List the available benchmarks
+        -----
+        Implement pg!benchmark, to list the benchmarks of the bot
+        """
+
+        response_message = common.recent_response_messages[ctx.message.id]
+
+        await snakecore.utils.embeds.replace_embed_at(
+            response_message,
+            title="Benchmarks:",
+            description="\n".join(
+                f"`{common.COMMAND_PREFIX}{cmd.qualified_name}`"
+                for cmd in self.benchmark.commands
+            ),
+            color=common.DEFAULT_EMBED_COLOR,
+        )
+
+    @benchmark.command(name="storage")
+    @admin_only_and_custom_parsing(inside_class=True, inject_message_reference=True)
+    async def benchmark_storage(
+        self,
+        ctx: commands.Context,
+        reminders: int = 1000,
+        rounds: int = 10,
+        configured: bool = False,
+    ):
+        """
+        ->type Admin commands
+        ->signature pg!benchmark storage [reminders] [rounds] [configured]
+        ->description Compare the latency of the storage backends
+        ->extended description
+        Store and load a synthetic reminders table with the given number of reminders
+        the given number of times, and show the timings. Only isolated backends are
+        measured: one that keeps tables in memory, and SQLite on a temporary database.
+        If `configured` is true, the storage backend used by the bot is measured too,
+        on a scratch table. With the Discord backend, this writes to the storage channel,
+        so at most 10000 reminders are allowed then.
+        ->example command pg!benchmark storage reminders=10000 rounds=5
+        -----
+        Implement pg!benchmark_storage, to compare storage backends
+        """
+
+        response_message = common.recent_response_messages[ctx.message.id]
+
+        if not (0 < reminders <= 100_000 and 0 < rounds <= 100):
+            raise BotException(
+                "Invalid arguments!",
+                "`reminders` must be between 1 and 100000, "
+                "and `rounds` between 1 and 100",
+            )
+
+        if configured and reminders > 10_000:
+            raise BotException(
+                "Invalid arguments!",
+                "`reminders` must be at most 10000 when `configured` is true",
+            )
+
+        results = await benchmarks.benchmark_storage_backends(
+            reminders, rounds, include_configured=configured
+        )
+
+        await snakecore.utils.embeds.replace_embed_at(
+            response_message,
+            title="Storage benchmark results",
+            description=f"{reminders} reminders, {rounds} rounds",
+            fields=[
+                dict(
+                    name=f"{backend_name} {op}",
+                    value="\n".join(
+                        f"{stat.title()}: `{value * 1000:.2f}ms`"
+                        for stat, value in timings.items()
+                    ),
+                    inline=True,
+                )
+                for backend_name, backend_results in results.items()
+                for op, timings in backend_results.items()
+            ],
+            color=common.DEFAULT_EMBED_COLOR,
+        )
+
+    @benchmark.command(name="serialization")
+    @admin_only_and_custom_parsing(inside_class=True, inject_message_reference=True)
+    async def benchmark_serialization(
+        self, ctx: commands.Context, reminders: int = 10000, rounds: int = 3
+    ):
+        """
+        ->type Admin commands
+        ->signature pg!benchmark serialization [reminders] [rounds]
+        ->description Compare the storage serialization formats
+        ->extended description
+        Encode and decode a synthetic reminders table with the given number of reminders
+        in every serialization format, and show the timings and payload sizes.
+        ->example command pg!benchmark serialization reminders=10000 rounds=3
+        -----
+        Implement pg!benchmark_serialization, to compare serialization formats
+        """
+
+        response_message = common.recent_response_messages[ctx.message.id]
+
+        if not (0 < reminders <= 100_000 and 0 < rounds <= 10):
+            raise BotException(
+                "Invalid arguments!",
+                "`reminders` must be between 1 and 100000, "
+                "and `rounds` between 1 and 10",
+            )
+
+        results = await asyncio.get_running_loop().run_in_executor(
+            None, benchmarks.benchmark_serialization, reminders, rounds
+        )
+
+        await snakecore.utils.embeds.replace_embed_at(
+            response_message,
+            title="Serialization benchmark results",
+            description=f"{reminders} reminders, {rounds} rounds (median timings)",
+            fields=[
+                dict(
+                    name=format_name,
+                    value=f"Encode: `{format_results['encode'] * 1000:.2f}ms`\n"
+                    f"Decode: `{format_results['decode'] * 1000:.2f}ms`\n"
+                    "Size: "
+                    f"`{snakecore.utils.format_byte(int(format_results['size']), 2)}`",
+                    inline=True,
+                )
+                for format_name, format_results in results.items()
+            ],
+            color=common.DEFAULT_EMBED_COLOR,
+        )
+
+    @benchmark.command(name="titles")
+    @admin_only_and_custom_parsing(inside_class=True, inject_message_reference=True)
+    async def benchmark_titles(self, ctx: commands.Context, rounds: int = 100):
+        """
+        ->type Admin commands
+        ->signature pg!benchmark titles [rounds]
+        ->description Compare the ways of checking help thread titles
+        ->extended description
+        Find the cautions of the titles of all tracked help threads and a set of
+        sample titles in four ways, and show the timings: the previous approach,
+        which normalizes the title again for every pattern, a single combined
+        pattern of all caution types, the current approach with one search per
+        caution type, and the current approach behind a cache.
+        ->example command pg!benchmark titles rounds=100
+        -----
+        Implement pg!benchmark_titles, to compare help thread title classifiers
+        """
+
+        response_message = common.recent_response_messages[ctx.message.id]
+
+        if not 0 < rounds <= 1000:
+            raise BotException(
+                "Invalid arguments!",
+                "`rounds` must be between 1 and 1000",
+            )
+
+        titles = [state.name for state in help_threads.get_help_thread_states()] + list(
+            benchmarks.HELP_THREAD_TITLE_SAMPLES
+        )
+
+        results = await asyncio.get_running_loop().run_in_executor(
+            None, benchmarks.benchmark_help_thread_titles, titles, rounds
+        )
+
+        await snakecore.utils.embeds.replace_embed_at(
+            response_message,
+            title="Help thread title benchmark results",
+            description=f"{len(titles)} titles, {rounds} rounds (median timings)",
+            fields=[
+                dict(
+                    name=approach_name,
+                    value=f"Total: `{approach_results['total'] * 1000:.3f}ms`\n"
+                    "Per title: "
+                    f"`{approach_results['total'] / len(titles) * 1e6:.2f}µs`\n"
+                    f"Mismatches: `{int(approach_results['mismatches'])}`",
+                    inline=True,
+                )
+                for approach_name, approach_results in results.items()
+            ],
+            color=common.DEFAULT_EMBED_COLOR,
+        )
+
     @commands.command()
     @admin_only()
     async def whitelist_cmd(self, ctx: commands.Context, *cmds: str):
@@ -251,7 +707,7 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
                     f"could not find a command named '{cmd_qualname}'",
                 )
 
-        async with snakecore.storage.DiscordStorage("blacklist", list) as storage_obj:
+        async with StorageTable("blacklist", list) as storage_obj:
             commands = storage_obj.obj
             cnt = 0
             for cmd_qualname in cmds:
@@ -265,6 +721,9 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
 
             storage_obj.obj = commands
 
+        if cnt:
+            invalidate_help_catalog()
+
         await snakecore.utils.embeds.replace_embed_at(
             response_message,
             title="Whitelisted!",
@@ -298,7 +757,7 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
                     f"could not find a command named '{cmd_qualname}'",
                 )
 
-        async with snakecore.storage.DiscordStorage("blacklist", list) as storage_obj:
+        async with StorageTable("blacklist", list) as storage_obj:
             commands = storage_obj.obj
             cnt = 0
             for cmd_qualname in cmds:
@@ -312,6 +771,9 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
 
             storage_obj.obj = commands
 
+        if cnt:
+            invalidate_help_catalog()
+
         await snakecore.utils.embeds.replace_embed_at(
             response_message,
             title="Blacklisted!",
@@ -418,6 +880,68 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
             color=common.DEFAULT_EMBED_COLOR,
         )
 
+    @commands.command()
+    @admin_only()
+    async def metrics(self, ctx: commands.Context, prefix: str = ""):
+        """
+        ->type Admin commands
+        ->signature pg!metrics [prefix]
+        ->description Show the metrics recorded by the bot
+        ->extended description
+        Show the values of all counters, gauges and histograms whose names start with the given prefix.
+        Durations are shown in milliseconds, and other values in their own unit. Every gateway event
+        handler records its calls, errors, durations and running calls under `events.<event name>`.
+        ->example command pg!metrics events.on_message
+        -----
+        Implement pg!metrics, for admins to inspect the internal metrics of the bot
+        """
+
+        response_message = common.recent_response_messages[ctx.message.id]
+
+        fields = []
+        for name, values in get_metrics_snapshot(prefix).items():
+            if values["type"] in ("counter", "gauge"):
+                value = f"`{values['value']}`"
+            elif not values["count"]:
+                value = "No values recorded"
+            else:
+                if values["unit"] == "s":  # durations
+                    scale, unit, fmt = 1000, "ms", ".1f"
+                else:
+                    scale, unit, fmt = 1, values["unit"], "g"
+
+                mean, p50, p90, p99, max_value = (
+                    format(v * scale, fmt)
+                    for v in (
+                        values["sum"] / values["count"],
+                        values["p50"],
+                        values["p90"],
+                        values["p99"],
+                        values["max"],
+                    )
+                )
+                value = (
+                    f"Count: `{values['count']}`\n"
+                    f"Mean: `{mean}{unit}`\n"
+                    f"p50/p90/p99: `{p50}`/`{p90}`/`{p99}{unit}`\n"
+                    f"Max: `{max_value}{unit}`"
+                )
+            fields.append(dict(name=name, value=value, inline=True))
+
+        await snakecore.utils.embeds.replace_embed_at(
+            response_message,
+            title="Bot metrics",
+            description=None
+            if fields
+            else "No metrics were recorded yet"
+            + (f" with prefix `{prefix}`" if prefix else ""),
+            fields=fields[:25],
+            footer_text=f"Showing 25 of {len(fields)} metrics"
+            if len(fields) > 25
+            else None,
+            color=common.DEFAULT_EMBED_COLOR,
+        )
+
     @commands.command()
     @admin_only()
     async def stop(self, ctx: commands.Context):
@@ -1840,7 +2364,7 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
             channels = (ctx.channel,)
 
         if enable or disable:
-            async with snakecore.storage.DiscordStorage("feature") as storage_obj:
+            async with StorageTable("feature") as storage_obj:
                 storage_dict = storage_obj.obj
                 if name not in storage_dict:
                     storage_dict[name] = {}
@@ -1901,7 +2425,7 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
 
         response_message = common.recent_response_messages[ctx.message.id]
 
-        async with snakecore.storage.DiscordStorage("wc") as storage_obj:
+        async with StorageTable("wc") as storage_obj:
             wc_dict = storage_obj.obj
             if desc is not None:
                 wc_dict["description"] = desc.string if desc.string else None
@@ -1932,7 +2456,7 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
 
         response_message = common.recent_response_messages[ctx.message.id]
 
-        async with snakecore.storage.DiscordStorage("wc") as storage_obj:
+        async with StorageTable("wc") as storage_obj:
             wc_dict = storage_obj.obj
             if "rounds" not in wc_dict:
                 wc_dict["rounds"] = []
@@ -1966,7 +2490,7 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
 
         response_message = common.recent_response_messages[ctx.message.id]
 
-        async with snakecore.storage.DiscordStorage("wc") as storage_obj:
+        async with StorageTable("wc") as storage_obj:
             wc_dict = storage_obj.obj
             try:
                 round_name = wc_dict["rounds"].pop(round_no - 1)["name"]
@@ -2014,7 +2538,7 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
         response_message = common.recent_response_messages[ctx.message.id]
 
         round_no -= 1
-        async with snakecore.storage.DiscordStorage("wc") as storage_obj:
+        async with StorageTable("wc") as storage_obj:
             wc_dict = storage_obj.obj
             try:
                 if round_name is not None:
@@ -2053,3 +2577,8 @@ class AdminCommandCog(CommandMixinCog, SudoCommandCog, EmsudoCommandCog):
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(AdminCommandCog(bot))
+    invalidate_help_catalog()
+
+
+async def teardown(bot: commands.Bot):
+    invalidate_help_catalog()
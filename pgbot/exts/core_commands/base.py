@@ -20,11 +20,12 @@ import pygame
 import snakecore
 from snakecore.commands.converters import String
 
-from pgbot import common
+from pgbot import common, polls
 import pgbot
 from .utils import clock
 from pgbot.utils import parse_text_to_mapping
 from pgbot.exceptions import BotException
+from pgbot.storage import StorageTable, read_table
 
 
 class BaseCommandCog(commands.Cog):
@@ -115,6 +116,15 @@ class CommandMixinCog(commands.Cog):
 
         final_embed = discord.Embed.from_dict(base_embed_dict)
         poll_msg = await destination.send(embed=final_embed)
+        await polls.register_poll(
+            poll_msg.id,
+            {
+                "channel_id": poll_msg.channel.id,
+                "author_id": ctx.author.id,
+                "voting_mode": "multiple" if multi_votes else "single",
+            },
+        )
+        polls.start_poll_votes(poll_msg.id)
         try:
             await response_message.delete()
         except discord.errors.NotFound:
@@ -231,27 +241,36 @@ class CommandMixinCog(commands.Cog):
 
         title = "Voting has ended"
 
-        msg = await msg.channel.fetch_message(
-            msg.id
-        )  # force population of msg.reactions
+        poll_votes = polls.get_poll_votes(msg.id)
+        if poll_votes is not None:  # tallied from reaction events
+            # options without votes have no voters, but are still shown
+            vote_counts = {
+                field.name: len(poll_votes.get(field.name, ()))  # type: ignore
+                for field in embed.fields
+            }
+        else:
+            msg = await msg.channel.fetch_message(
+                msg.id
+            )  # force population of msg.reactions
 
-        reaction_counts = {
-            str(reaction.emoji): reaction.count for reaction in msg.reactions
-        }
+            # the reaction of the bot itself is not a vote
+            vote_counts = {
+                str(reaction.emoji): reaction.count - 1 for reaction in msg.reactions
+            }
 
         top: list[tuple[int, Any]] = [(0, None)]
-        for reaction_emoji_str, count in reaction_counts.items():
-            if count - 1 > top[0][0]:
-                top = [(count - 1, reaction_emoji_str)]
+        for reaction_emoji_str, count in vote_counts.items():
+            if count > top[0][0]:
+                top = [(count, reaction_emoji_str)]
                 continue
 
-            if count - 1 == top[0][0]:
-                top.append((count - 1, reaction_emoji_str))
+            if count == top[0][0]:
+                top.append((count, reaction_emoji_str))
 
         fields = []
         for field in embed.fields:
             try:
-                r_count = reaction_counts[field.name] - 1  # type: ignore
+                r_count = vote_counts[field.name]  # type: ignore
             except KeyError:
                 continue
 
@@ -283,6 +302,8 @@ class CommandMixinCog(commands.Cog):
                 )
             ),
         )
+        await polls.unregister_poll(msg.id)
+        pgbot.reaction_message_cache.discard(msg.id)
         try:
             await response_message.delete()
         except discord.errors.NotFound:
@@ -292,8 +313,7 @@ class CommandMixinCog(commands.Cog):
 
         response_message = common.recent_response_messages[ctx.message.id]
 
-        async with snakecore.storage.DiscordStorage("stream", list) as storage_obj:
-            data = storage_obj.obj
+        data = await read_table("stream", list)
 
         if not data:
             await snakecore.utils.embeds.replace_embed_at(
@@ -320,7 +340,7 @@ class CommandMixinCog(commands.Cog):
         ctx: commands.Context,
         _members: Optional[tuple[discord.Member, ...]] = None,
     ):
-        async with snakecore.storage.DiscordStorage("stream", list) as ping_storage:
+        async with StorageTable("stream", list) as ping_storage:
             data: list = ping_storage.obj
 
             if _members:
@@ -339,7 +359,7 @@ class CommandMixinCog(commands.Cog):
         ctx: commands.Context,
         _members: Optional[tuple[discord.Member, ...]] = None,
     ):
-        async with snakecore.storage.DiscordStorage("stream", list) as ping_storage:
+        async with StorageTable("stream", list) as ping_storage:
             data: list = ping_storage.obj
 
             try:
@@ -364,8 +384,7 @@ class CommandMixinCog(commands.Cog):
 
         response_message = common.recent_response_messages[ctx.message.id]
 
-        async with snakecore.storage.DiscordStorage("stream", list) as ping_storage:
-            data: list = ping_storage.obj
+        data: list = await read_table("stream", list)
 
         msg = message.string if message else "Enjoy the stream!"
         ping = (
@@ -415,8 +434,7 @@ class CommandMixinCog(commands.Cog):
         """
         response_message = common.recent_response_messages[ctx.message.id]
 
-        async with snakecore.storage.DiscordStorage("wc") as storage_obj:
-            wc_dict: dict[str, Any] = storage_obj.obj
+        wc_dict: dict[str, Any] = await read_table("wc")
 
         if not wc_dict.get("rounds"):
             raise BotException(
@@ -488,7 +506,7 @@ class CommandMixinCog(commands.Cog):
 
         response_message = common.recent_response_messages[ctx.message.id]
 
-        async with snakecore.storage.DiscordStorage("clock") as storage_obj:
+        async with StorageTable("clock") as storage_obj:
             timezones = storage_obj.obj
             if action:
                 if _member is None:
@@ -17,10 +17,15 @@ from snakecore.commands.converters import String
 from snakecore.commands.decorators import custom_parsing
 
 from pgbot import common
-from .utils.help import send_help_message
+from pgbot.exceptions import BotException
+from .utils.help import (
+    invalidate_help_catalog,
+    send_help_message,
+    send_help_search_message,
+)
 
 
-@commands.command()
+@commands.group(invoke_without_command=True)
 @custom_parsing(inject_message_reference=True)
 async def help(
     ctx: commands.Context,
@@ -31,6 +36,8 @@ async def help(
     ->type Get help
     ->signature pg!help [command]
     ->description Ask me for help
+    ->extended description
+    Run `pg!help search <*terms>` to search the documentation of all commands.
     ->example command pg!help help
     -----
     Implement pg!help, to display a help message
@@ -52,5 +59,51 @@ async def help(
     )
 
 
+@help.command(name="search")
+@custom_parsing(inject_message_reference=True)
+async def help_search(
+    ctx: commands.Context,
+    *terms: str,
+    page: int = 1,
+):
+    """
+    ->type Get help
+    ->signature pg!help search <*terms>
+    ->description Search the documentation of all commands
+    ->extended description
+    Search the signatures and descriptions of all commands you can run
+    for the given terms. Results are ranked by how well they match.
+    ->example command pg!help search reminder
+    -----
+    Implement pg!help search, to find commands by their documentation
+    """
+
+    # needed for typecheckers to know that ctx.author is a member
+    if isinstance(ctx.author, discord.User):
+        return
+
+    response_message = common.recent_response_messages[ctx.message.id]
+
+    if not terms:
+        raise BotException(
+            "No search terms given",
+            f"Please specify what to search for, e.g. `{common.COMMAND_PREFIX}help search reminder`",
+        )
+
+    await send_help_search_message(
+        ctx,
+        common.bot,
+        response_message,
+        ctx.author,
+        " ".join(terms),
+        page=page,
+    )
+
+
 async def setup(bot: snakecore.commands.Bot):
     bot.add_command(help)
+    invalidate_help_catalog()
+
+
+async def teardown(bot: snakecore.commands.Bot):
+    invalidate_help_catalog()
@@ -29,7 +29,10 @@ import pgbot
 from pgbot.utils import get_primary_guild_perms
 from ..utils import sandbox
 from ..utils.converters import CodeBlock, String
+from ..utils.help import invalidate_help_catalog
 from pgbot.exceptions import BotException
+from pgbot.reminders import schedule_reminder, unschedule_reminder
+from pgbot.storage import StorageTable, read_table
 from pgbot.utils import message_delete_reaction_listener
 
 from .fun_commands import FunCommandCog
@@ -51,8 +54,7 @@ class UserCommandCog(FunCommandCog, UserHelpCommandCog):
 
         response_message = common.recent_response_messages[ctx.message.id]
 
-        async with snakecore.storage.DiscordStorage("reminders") as storage_obj:
-            storage_data = storage_obj.obj
+        storage_data = await read_table("reminders")
 
         desc = "You have no reminders set"
         if ctx.author.id in storage_data:
@@ -111,15 +113,17 @@ class UserCommandCog(FunCommandCog, UserHelpCommandCog):
         # remove microsecond precision of the 'on' variable
         on -= datetime.timedelta(microseconds=on.microsecond)
 
-        async with snakecore.storage.DiscordStorage("reminders") as storage_obj:
+        async with StorageTable("reminders") as storage_obj:
             storage_data = storage_obj.obj
             if ctx.author.id not in storage_data:
                 storage_data[ctx.author.id] = {}
 
             # user is editing old reminder message, discard the old reminder
+            discarded_keys = []
             for key, (_, chan_id, msg_id) in tuple(storage_data[ctx.author.id].items()):
                 if chan_id == ctx.channel.id and msg_id == ctx.message.id:
                     storage_data[ctx.author.id].pop(key)
+                    discarded_keys.append(key)
 
             limit = 25 if get_primary_guild_perms(ctx.author)[1] else 10
             if len(storage_data[ctx.author.id]) >= limit:
@@ -128,13 +132,14 @@ class UserCommandCog(FunCommandCog, UserHelpCommandCog):
                     f"I cannot set more than {limit} reminders for you",
                 )
 
-            storage_data[ctx.author.id][on] = (
-                msg.string.strip(),
-                ctx.channel.id,
-                ctx.message.id,
-            )
+            reminder = (msg.string.strip(), ctx.channel.id, ctx.message.id)
+            storage_data[ctx.author.id][on] = reminder
             storage_obj.obj = storage_data
 
+        for key in discarded_keys:
+            unschedule_reminder(ctx.author.id, key)
+        schedule_reminder(ctx.author.id, on, reminder)
+
         await snakecore.utils.embeds.replace_embed_at(
             response_message,
             title="Reminder set!",
@@ -265,17 +270,17 @@ class UserCommandCog(FunCommandCog, UserHelpCommandCog):
 
         response_message = common.recent_response_messages[ctx.message.id]
 
-        async with snakecore.storage.DiscordStorage("reminders") as storage_obj:
+        async with StorageTable("reminders") as storage_obj:
             storage_data = storage_obj.obj
             storage_data_copy = copy.deepcopy(storage_data)
-            cnt = 0
+            removed_dts = []
             if reminder_ids:
                 for reminder_id in sorted(set(reminder_ids), reverse=True):
                     if ctx.author.id in storage_data:
                         for i, dt in enumerate(storage_data_copy[ctx.author.id]):
                             if i == reminder_id:
                                 storage_data[ctx.author.id].pop(dt)
-                                cnt += 1
+                                removed_dts.append(dt)
                                 break
                     if (
                         reminder_id >= len(storage_data_copy[ctx.author.id])
@@ -290,14 +295,17 @@ class UserCommandCog(FunCommandCog, UserHelpCommandCog):
                     storage_data.pop(ctx.author.id)
 
             elif ctx.author.id in storage_data:
-                cnt = len(storage_data.pop(ctx.author.id))
+                removed_dts.extend(storage_data.pop(ctx.author.id))
 
             storage_obj.obj = storage_data
 
+        for dt in removed_dts:
+            unschedule_reminder(ctx.author.id, dt)
+
         await snakecore.utils.embeds.replace_embed_at(
             response_message,
             title="Reminders removed!",
-            description=f"Successfully removed {cnt} reminder(s)",
+            description=f"Successfully removed {len(removed_dts)} reminder(s)",
             color=common.DEFAULT_EMBED_COLOR,
         )
 
@@ -642,3 +650,8 @@ class UserCommandCog(FunCommandCog, UserHelpCommandCog):
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(UserCommandCog(bot))
+    invalidate_help_catalog()
+
+
+async def teardown(bot: commands.Bot):
+    invalidate_help_catalog()
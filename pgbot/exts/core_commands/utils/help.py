@@ -8,7 +8,8 @@ This file defines some utility functions for pg!help command
 
 from __future__ import annotations
 import asyncio
-
+import bisect
+import math
 import re
 import typing
 
@@ -31,6 +32,30 @@ regex = re.compile(
     r"\Z)|(((?!->).|\n)*)"
 )
 
+# regex for splitting help text into search terms
+search_term_regex = re.compile(r"[a-z0-9]+")
+
+# weights given to the docstring sections that are indexed for pg!help search
+SEARCH_FIELD_WEIGHTS = {
+    "signature": 3.0,
+    "description": 2.0,
+    "extended description": 1.0,
+}
+
+# terms too common in help text to be useful for ranking search results
+SEARCH_STOP_TERMS = frozenset(("pg", "the", "a", "an", "of", "to", "and", "or", "is"))
+
+
+def tokenize_search_text(text: str) -> list[str]:
+    """
+    Split the given text into lowercase search terms, ignoring stop terms.
+    """
+    return [
+        term
+        for term in search_term_regex.findall(text.lower())
+        if term not in SEARCH_STOP_TERMS
+    ]
+
 
 def get_doc_from_func(func: typing.Callable):
     """
@@ -72,39 +97,135 @@ def get_doc_from_func(func: typing.Callable):
     return data
 
 
-async def send_help_message(
-    ctx: commands.Context,
-    bot: commands.Bot,
-    original_msg: discord.Message,
-    invoker: discord.Member,
-    qualified_name: typing.Optional[str] = None,
-    page: int = 1,
-):
+class HelpCatalog:
     """
-    Edit original_msg to a help message. If command is supplied it will
-    only show information about that specific command. Otherwise sends
-    the general help embed.
-
-    Args:
-        original_msg: The message to edit
-        invoker: The member who requested the help command
-        page: The page of the embed, 0 by default
+    A precompiled catalog of the documentation of all bot commands, containing the
+    parsed docstring data of every command as well as prebuilt help embeds for
+    admins and non-admins.
     """
 
-    doc_fields = {}
-    embeds = []
+    def __init__(self, bot: commands.Bot):
+        """
+        Parse the docstrings of all commands of the given bot and build their
+        help embeds.
 
-    is_admin = any(
-        role.id in common.GuildConstants.ADMIN_ROLES
-        for role in getattr(invoker, "roles", ())
-    )
+        Args:
+            bot (commands.Bot): The bot whose commands should be cataloged.
+        """
+        self.docs: dict[str, dict[str, str]] = {}
+        self.command_embeds: dict[str, typing.Optional[list[discord.Embed]]] = {}
+        self.overview_embeds: dict[bool, list[discord.Embed]] = {}
+        self.search_index: dict[str, dict[str, float]] = {}
+        self.search_terms: list[str] = []
+        self._search_visibility: dict[str, tuple[bool, bool]] = {}
 
-    if not qualified_name:
-        for cmd in sorted(bot.walk_commands(), key=lambda cmd: cmd.qualified_name):
-            if cmd.hidden or not is_admin and cmd.extras.get("admin_only", False):
-                continue
+        all_commands = sorted(bot.walk_commands(), key=lambda cmd: cmd.qualified_name)
 
+        for cmd in all_commands:
             data = get_doc_from_func(cmd.callback)
+            if data:
+                self.docs[cmd.qualified_name] = data
+                self._index_command(cmd, data)
+
+        self.search_terms = sorted(self.search_index)
+
+        for cmd in all_commands:
+            self.command_embeds[cmd.qualified_name] = self._build_command_embeds(cmd)
+
+        for is_admin in (False, True):
+            self.overview_embeds[is_admin] = self._build_overview_embeds(
+                bot, all_commands, is_admin
+            )
+
+    def _index_command(self, cmd: commands.Command, data: dict[str, str]):
+        """
+        Add the searchable docstring sections of a command to the inverted index.
+        """
+        self._search_visibility[cmd.qualified_name] = (
+            cmd.hidden,
+            cmd.extras.get("admin_only", False),
+        )
+        for field_name, weight in SEARCH_FIELD_WEIGHTS.items():
+            for term in tokenize_search_text(data.get(field_name, "")):
+                postings = self.search_index.setdefault(term, {})
+                postings[cmd.qualified_name] = (
+                    postings.get(cmd.qualified_name, 0.0) + weight
+                )
+
+    def search(
+        self, query: str, is_admin: bool = False, limit: int = 25
+    ) -> list[tuple[str, float]]:
+        """
+        Search the indexed command docs for the given query.
+
+        Args:
+            query (str): The search terms.
+            is_admin (bool): Whether admin-only commands should be included.
+            limit (int): The maximum number of results to return.
+
+        Returns:
+            list[tuple[str, float]]: Pairs of command qualified names and their
+            scores, ranked from best to worst match.
+        """
+        scores: dict[str, float] = {}
+        matched_terms: dict[str, int] = {}
+        command_count = len(self.docs) or 1
+
+        for query_term in set(tokenize_search_text(query)):
+            if query_term in self.search_index:
+                candidate_terms = [(query_term, 1.0)]
+            else:
+                # fall back to prefix matches for partial search terms
+                candidate_terms = []
+                i = bisect.bisect_left(self.search_terms, query_term)
+                while i < len(self.search_terms) and self.search_terms[i].startswith(
+                    query_term
+                ):
+                    candidate_terms.append((self.search_terms[i], 0.5))
+                    i += 1
+
+            matched_commands = set()
+            for term, term_weight in candidate_terms:
+                postings = self.search_index[term]
+                idf = math.log(1 + command_count / len(postings))
+                for qualified_name, field_weight in postings.items():
+                    scores[qualified_name] = (
+                        scores.get(qualified_name, 0.0)
+                        + term_weight * field_weight * idf
+                    )
+                    matched_commands.add(qualified_name)
+
+            for qualified_name in matched_commands:
+                matched_terms[qualified_name] = matched_terms.get(qualified_name, 0) + 1
+
+        results = []
+        for qualified_name, score in scores.items():
+            hidden, admin_only = self._search_visibility[qualified_name]
+            if hidden or not is_admin and admin_only:
+                continue
+            results.append((qualified_name, score))
+
+        # commands matching more of the search terms always rank first
+        results.sort(key=lambda item: (-matched_terms[item[0]], -item[1], item[0]))
+        return results[:limit]
+
+    def _build_overview_embeds(
+        self,
+        bot: commands.Bot,
+        all_commands: list[commands.Command],
+        is_admin: bool,
+    ) -> list[discord.Embed]:
+        doc_fields = {}
+        for cmd in all_commands:
+            if (
+                cmd.hidden
+                or not cmd.enabled
+                or not is_admin
+                and cmd.extras.get("admin_only", False)
+            ):
+                continue
+
+            data = self.docs.get(cmd.qualified_name)
             if not data:
                 continue
 
@@ -116,25 +237,21 @@ async def send_help_message(
                 f"`{data['signature']}`\n" f"{data['description']}\n\n"
             )
 
-        doc_fields_cpy = doc_fields.copy()
-
         for doc_field_name in doc_fields:
             doc_field_list = doc_fields[doc_field_name]
             doc_field_list[1] = f"```\n{doc_field_list[0]}\n```\n\n{doc_field_list[1]}"
             doc_field_list[0] = f"__**{doc_field_name}**__"
 
-        doc_fields = doc_fields_cpy
-
-        embeds.append(
+        embeds = [
             discord.Embed(
                 title="Help",
                 description=common.BOT_HELP_DIALOG_FSTRING.format(
-                    bot.user.mention, common.COMMAND_PREFIX
+                    bot.user.mention if bot.user else "the bot", common.COMMAND_PREFIX
                 ),
                 color=common.DEFAULT_EMBED_COLOR,
             )
-        )
-        for doc_field in list(doc_fields.values()):
+        ]
+        for doc_field in doc_fields.values():
             body = f"{doc_field[0]}\n\n{doc_field[1]}"
             embeds.append(
                 snakecore.utils.embeds.create_embed(
@@ -144,82 +261,173 @@ async def send_help_message(
                 )
             )
 
-    else:
-        cmd = bot.get_command(qualified_name)
-        if (
-            cmd is not None
-            and not cmd.hidden
-            and (is_admin or cmd.extras.get("admin_only", False))
-        ):
-            cmds = [cmd]
-            if isinstance(cmd, commands.Group):
-                cmds.extend(
-                    sorted(
-                        (subcmd for subcmd in cmd.walk_commands()),
-                        key=lambda cmd: cmd.qualified_name,
-                    )
+        return embeds
+
+    def _build_command_embeds(
+        self, cmd: commands.Command
+    ) -> typing.Optional[list[discord.Embed]]:
+        cmds = [cmd]
+        if isinstance(cmd, commands.Group):
+            cmds.extend(
+                sorted(
+                    (subcmd for subcmd in cmd.walk_commands()),
+                    key=lambda cmd: cmd.qualified_name,
                 )
+            )
 
-            for cmd in cmds:
-                doc = get_doc_from_func(cmd.callback)
-                if not doc:
-                    # function found, but does not have help.
-                    return await snakecore.utils.embeds.replace_embed_at(
-                        original_msg,
-                        title="Could not get docs",
-                        description="Command has no documentation",
-                        color=0xFF0000,
-                    )
+        embeds = []
+        for cmd in cmds:
+            doc = self.docs.get(cmd.qualified_name)
+            if not doc:
+                # function found, but does not have help.
+                return None
 
-                body = f"`{doc['signature']}`\n`Category: {doc['type']}`\n\n"
+            body = f"`{doc['signature']}`\n`Category: {doc['type']}`\n\n"
 
-                desc = doc["description"]
+            desc = doc["description"]
 
-                ext_desc = doc.get("extended description")
-                if ext_desc:
-                    desc = f"> *{desc}*\n\n{ext_desc}"
+            ext_desc = doc.get("extended description")
+            if ext_desc:
+                desc = f"> *{desc}*\n\n{ext_desc}"
 
-                desc_list = desc.split(sep="+===+")
+            desc_list = desc.split(sep="+===+")
 
-                body += f"**Description:**\n{desc_list[0]}"
+            body += f"**Description:**\n{desc_list[0]}"
 
-                embed_fields = []
+            embed_fields = []
 
-                example_cmd = doc.get("example command")
-                if example_cmd:
-                    embed_fields.append(
-                        dict(name="Example command(s):", value=example_cmd, inline=True)
-                    )
+            example_cmd = doc.get("example command")
+            if example_cmd:
+                embed_fields.append(
+                    dict(name="Example command(s):", value=example_cmd, inline=True)
+                )
 
-                cmd_qualified_name = cmd.qualified_name
+            cmd_qualified_name = cmd.qualified_name
 
-                if len(desc_list) == 1:
-                    embeds.append(
-                        snakecore.utils.embeds.create_embed(
-                            title=f"Help for `{cmd_qualified_name}`",
-                            description=body,
-                            color=common.DEFAULT_EMBED_COLOR,
-                            fields=embed_fields,
-                        )
+            if len(desc_list) == 1:
+                embeds.append(
+                    snakecore.utils.embeds.create_embed(
+                        title=f"Help for `{cmd_qualified_name}`",
+                        description=body,
+                        color=common.DEFAULT_EMBED_COLOR,
+                        fields=embed_fields,
+                    )
+                )
+            else:
+                embeds.append(
+                    snakecore.utils.embeds.create_embed(
+                        title=f"Help for `{cmd_qualified_name}`",
+                        description=body,
+                        color=common.DEFAULT_EMBED_COLOR,
                     )
-                else:
+                )
+                desc_list_len = len(desc_list)
+                for i in range(1, desc_list_len):
                     embeds.append(
                         snakecore.utils.embeds.create_embed(
                             title=f"Help for `{cmd_qualified_name}`",
-                            description=body,
+                            description=desc_list[i],
                             color=common.DEFAULT_EMBED_COLOR,
+                            fields=embed_fields if i == desc_list_len - 1 else None,
                         )
                     )
-                    desc_list_len = len(desc_list)
-                    for i in range(1, desc_list_len):
-                        embeds.append(
-                            snakecore.utils.embeds.create_embed(
-                                title=f"Help for `{cmd_qualified_name}`",
-                                description=desc_list[i],
-                                color=common.DEFAULT_EMBED_COLOR,
-                                fields=embed_fields if i == desc_list_len - 1 else None,
-                            )
-                        )
+
+        return embeds
+
+
+_help_catalog: typing.Optional[HelpCatalog] = None
+
+
+def build_help_catalog(bot: commands.Bot) -> HelpCatalog:
+    """
+    (Re)build the help catalog for the given bot and store it for later lookups.
+
+    Args:
+        bot (commands.Bot): The bot whose commands should be cataloged.
+
+    Returns:
+        HelpCatalog: The newly built help catalog.
+    """
+    global _help_catalog
+    _help_catalog = HelpCatalog(bot)
+    return _help_catalog
+
+
+def get_help_catalog(bot: commands.Bot) -> HelpCatalog:
+    """
+    Get the current help catalog, building it first if it was invalidated.
+
+    Args:
+        bot (commands.Bot): The bot whose commands should be cataloged.
+
+    Returns:
+        HelpCatalog: The help catalog.
+    """
+    if _help_catalog is None:
+        return build_help_catalog(bot)
+    return _help_catalog
+
+
+def invalidate_help_catalog():
+    """
+    Invalidate the help catalog, causing it to be rebuilt on its next lookup.
+    This should be called whenever commands are added, removed, enabled or
+    disabled.
+    """
+    global _help_catalog
+    _help_catalog = None
+
+
+async def send_help_message(
+    ctx: commands.Context,
+    bot: commands.Bot,
+    original_msg: discord.Message,
+    invoker: discord.Member,
+    qualified_name: typing.Optional[str] = None,
+    page: int = 1,
+):
+    """
+    Edit original_msg to a help message. If command is supplied it will
+    only show information about that specific command. Otherwise sends
+    the general help embed.
+
+    Args:
+        original_msg: The message to edit
+        invoker: The member who requested the help command
+        page: The page of the embed, 0 by default
+    """
+
+    embeds = []
+    catalog = get_help_catalog(bot)
+
+    is_admin = any(
+        role.id in common.GuildConstants.ADMIN_ROLES
+        for role in getattr(invoker, "roles", ())
+    )
+
+    if not qualified_name:
+        embeds.extend(catalog.overview_embeds[is_admin])
+
+    else:
+        cmd = bot.get_command(qualified_name)
+        if (
+            cmd is not None
+            and not cmd.hidden
+            and (is_admin or cmd.extras.get("admin_only", False))
+        ):
+            cmd_embeds = catalog.command_embeds.get(cmd.qualified_name)
+            if cmd_embeds is None:
+                return await snakecore.utils.embeds.replace_embed_at(
+                    original_msg,
+                    title="Could not get docs",
+                    description="Command has no documentation",
+                    color=0xFF0000,
+                )
+
+            embeds.extend(cmd_embeds)
+
+    # cached embeds are shared, so hand out copies that the paginator can modify
+    embeds = [embed.copy() for embed in embeds]
 
     if not embeds:
         return await snakecore.utils.embeds.replace_embed_at(
@@ -229,7 +437,73 @@ async def send_help_message(
             color=0xFF0000,
         )
 
-    footer_text = f"Refresh this by replying with `{common.COMMAND_PREFIX}refresh`.\n___\ncmd: help"
+    await _send_paginated_help_embeds(ctx, original_msg, invoker, embeds, page=page)
+
+
+async def send_help_search_message(
+    ctx: commands.Context,
+    bot: commands.Bot,
+    original_msg: discord.Message,
+    invoker: discord.Member,
+    query: str,
+    page: int = 1,
+):
+    """
+    Edit original_msg to show the commands whose documentation best matches the
+    given search query.
+
+    Args:
+        original_msg: The message to edit
+        invoker: The member who requested the help command
+        query: The search terms
+        page: The page of the embed, 1 by default
+    """
+
+    catalog = get_help_catalog(bot)
+
+    is_admin = any(
+        role.id in common.GuildConstants.ADMIN_ROLES
+        for role in getattr(invoker, "roles", ())
+    )
+
+    results = catalog.search(query, is_admin=is_admin)
+    if not results:
+        return await snakecore.utils.embeds.replace_embed_at(
+            original_msg,
+            title="No results",
+            description=f"No commands matched the search terms `{query}`",
+            color=0xFF0000,
+        )
+
+    embeds = []
+    for i in range(0, len(results), 5):
+        body = ""
+        for qualified_name, _ in results[i : i + 5]:
+            doc = catalog.docs[qualified_name]
+            body += f"`{doc['signature']}`\n{doc['description']}\n\n"
+
+        embeds.append(
+            snakecore.utils.embeds.create_embed(
+                title=f"Help search results for `{query}`",
+                description=body,
+                color=common.DEFAULT_EMBED_COLOR,
+            )
+        )
+
+    await _send_paginated_help_embeds(
+        ctx, original_msg, invoker, embeds, page=page, command_name="help search"
+    )
+
+
+async def _send_paginated_help_embeds(
+    ctx: commands.Context,
+    original_msg: discord.Message,
+    invoker: discord.Member,
+    embeds: list[discord.Embed],
+    page: int = 1,
+    command_name: str = "help",
+):
+    footer_text = f"Refresh this by replying with `{common.COMMAND_PREFIX}refresh`.\n___\ncmd: {command_name}"
 
     raw_command_input: str = getattr(ctx, "raw_command_input", "")
     # attribute injected by snakecore's custom parser
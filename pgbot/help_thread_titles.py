@@ -0,0 +1,78 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines the classifier of help thread titles, which finds the types
+of caution that a title deserves.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from typing import Optional
+
+from pgbot import common
+
+
+@functools.lru_cache(maxsize=None)
+def get_title_patterns() -> tuple[tuple[str, re.Pattern[str]], ...]:
+    """Get the caution types with scanning enabled and their patterns, in the
+    order of `common.GuildConstants.INVALID_HELP_THREAD_TITLE_REGEX_PATTERNS`.
+    """
+    return tuple(
+        (caution_type, pattern)
+        for caution_type, pattern in (
+            common.GuildConstants.INVALID_HELP_THREAD_TITLE_REGEX_PATTERNS.items()
+        )
+        if caution_type in common.GuildConstants.INVALID_HELP_THREAD_TITLE_TYPES
+        and common.GuildConstants.INVALID_HELP_THREAD_TITLE_SCANNING_ENABLED[
+            caution_type
+        ]
+    )
+
+
+def normalize_title(name: str, owner_id: Optional[int] = None) -> str:
+    """Remove the owner id suffix from a help thread name, and collapse its
+    whitespace.
+    """
+    if owner_id is not None:
+        name = name.replace(f" | {owner_id}", "")
+    return " ".join(name.split())
+
+
+def classify_title(title: str) -> tuple[str, ...]:
+    """Get the types of caution that a normalized help thread title deserves.
+    Only caution types with scanning enabled are checked.
+
+    The patterns are searched one by one, since combining them into a single
+    alternation turned out to be slower with `re`: the anchored patterns can no
+    longer stop at the start of the title, and every pattern is tried at every
+    position. See `pgbot.benchmarks.benchmark_help_thread_titles`.
+    """
+    return tuple(
+        caution_type
+        for caution_type, pattern in get_title_patterns()
+        if pattern.search(title) is not None
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def get_title_cautions(
+    thread_id: int, name: str, owner_id: Optional[int] = None
+) -> tuple[str, ...]:
+    """Like `classify_title`, but for the name of a help thread, which is
+    normalized first. Results are cached per thread and name, so that checking
+    an unchanged name again is free.
+
+    Args:
+        thread_id (int): The id of the thread.
+        name (str): The name of the thread.
+        owner_id (Optional[int], optional): The id of the owner of the thread.
+          Defaults to None.
+
+    Returns:
+        tuple[str, ...]: The caution types.
+    """
+    return classify_title(normalize_title(name, owner_id))
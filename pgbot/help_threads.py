@@ -0,0 +1,644 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines an in-memory record of the state of every help forum thread.
+It is kept up to date from gateway events, so that the periodic help thread
+jobs can inspect threads without making any HTTP requests. The inactivity alert
+and archive timeout of every thread are kept in a deadline scheduler, which is
+updated whenever a thread changes, and fires exactly when they are due.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Literal, Optional
+
+import discord
+
+from pgbot import common
+from pgbot.utils.concurrency import RateLimitedExecutor
+from pgbot.utils.scheduling import DeadlineScheduler
+
+# only the states of this many of the most recently archived threads of every
+# help forum channel are kept, so that archived threads are alerted about like
+# when they were fetched with `ForumChannel.archived_threads(limit=20)`
+ARCHIVED_THREAD_STATE_LIMIT = 20
+
+# help threads are alerted about after being inactive for this long, in seconds
+INACTIVE_HELP_THREAD_ALERT_DELAY = 3600 * 23 + 1800  # 23h30m
+
+# help threads whose starter message was deleted are deleted too, unless they
+# contain at least this many messages sent by members
+HELP_THREAD_DELETION_MESSAGE_THRESHOLD = 30
+
+# deadlines whose action could not be completed are retried after this long,
+# in seconds
+HELP_THREAD_DEADLINE_RETRY_DELAY = 600
+
+HelpThreadDeadlineKind = Literal["alert", "archive"]
+HelpThreadDeadlineKey = tuple[int, HelpThreadDeadlineKind]
+
+# runs the API calls of help thread jobs, in parallel across threads
+help_forum_executor = RateLimitedExecutor(concurrency=8, rate=10.0, burst=10)
+
+
+class HelpThreadState:
+    """The tracked state of a help forum thread."""
+
+    __slots__ = (
+        "thread_id",
+        "parent_id",
+        "owner_id",
+        "name",
+        "created_ts",
+        "last_active_ts",
+        "last_message_id",
+        "last_author_id",
+        "last_message_is_system",
+        "solved",
+        "archived",
+        "locked",
+        "pinned",
+        "auto_archive_duration",
+        "archive_ts",
+        "starter_message_exists",
+        "member_message_count",
+        "member_message_count_exact",
+        "member_message_seed_before",
+        "member_message_seed_delta",
+    )
+
+    def __init__(self, thread: discord.Thread):
+        self.thread_id = thread.id
+        self.parent_id = thread.parent_id
+        self.owner_id = thread.owner_id
+        self.name = thread.name
+        self.created_ts = (
+            thread.created_at or discord.utils.snowflake_time(thread.id)
+        ).timestamp()
+        self.last_active_ts = self.created_ts
+        self.last_message_id: Optional[int] = None
+        self.last_author_id: Optional[int] = None
+        self.last_message_is_system = False
+        self.solved = False
+        self.archived = False
+        self.locked = False
+        self.pinned = False
+        self.auto_archive_duration = 0  # in minutes
+        self.archive_ts = 0.0  # when the archived state last changed
+        # None if unknown
+        self.starter_message_exists: Optional[bool] = None
+        # a lower bound of the number of member messages, which is exact if
+        # `member_message_count_exact` is set. None if unknown
+        self.member_message_count: Optional[int] = None
+        self.member_message_count_exact = False
+        # while the thread history is being read to count member messages, the
+        # id up to which it is read, and the change to the count from messages
+        # sent or deleted since the read started
+        self.member_message_seed_before: Optional[int] = None
+        self.member_message_seed_delta = 0
+        self.update(thread)
+
+    def update(self, thread: discord.Thread):
+        """Update this state from the attributes of a thread object. This does not
+        make any HTTP requests.
+        """
+        self.name = thread.name
+        self.owner_id = thread.owner_id
+        self.solved = any(
+            tag.name.lower().startswith("solved") for tag in thread.applied_tags
+        )
+        self.archived = thread.archived
+        self.locked = thread.locked
+        self.pinned = thread.flags.pinned
+        self.auto_archive_duration = thread.auto_archive_duration
+        self.archive_ts = thread.archive_timestamp.timestamp()
+
+        if thread.starter_message is not None:
+            self.starter_message_exists = True
+
+        last_message = thread.last_message
+        if last_message is not None:
+            self.update_last_message(last_message)
+        elif (
+            thread.last_message_id is not None
+            and thread.last_message_id != self.last_message_id
+        ):
+            # message ids encode their creation time, so the message itself
+            # doesn't need to be fetched
+            last_active_ts = discord.utils.snowflake_time(
+                thread.last_message_id
+            ).timestamp()
+            if last_active_ts > self.last_active_ts:
+                self.last_active_ts = last_active_ts
+                self.last_message_id = thread.last_message_id
+                self.last_author_id = None
+                self.last_message_is_system = False
+
+    def update_last_message(self, message: discord.Message):
+        """Record a message sent in the thread, if it is newer than the last one."""
+        last_active_ts = message.created_at.timestamp()
+        if last_active_ts < self.last_active_ts:
+            return
+
+        self.last_active_ts = last_active_ts
+        self.last_message_id = message.id
+        self.last_author_id = message.author.id
+        self.last_message_is_system = message.is_system()
+        if message.id == self.thread_id:
+            self.starter_message_exists = True
+
+
+def is_member_message(message: discord.Message) -> bool:
+    """Check whether a message in a help thread was sent by a member, and is not
+    the starter message of the thread.
+    """
+    return (
+        not message.author.bot
+        and message.type == discord.MessageType.default
+        and message.id != message.channel.id
+    )
+
+
+_help_thread_states: dict[int, HelpThreadState] = {}
+
+
+def is_help_thread(channel: object) -> bool:
+    """Check whether a channel is a thread of a help forum channel."""
+    return (
+        isinstance(channel, discord.Thread)
+        and channel.parent_id in common.GuildConstants.HELP_FORUM_CHANNEL_IDS.values()
+    )
+
+
+def get_help_thread_state(thread_id: int) -> Optional[HelpThreadState]:
+    """Get the tracked state of a help thread, if it is known."""
+    return _help_thread_states.get(thread_id)
+
+
+def get_help_thread_states() -> list[HelpThreadState]:
+    """Get the tracked states of all known help threads."""
+    return list(_help_thread_states.values())
+
+
+def track_thread(thread: discord.Thread) -> Optional[HelpThreadState]:
+    """Start tracking a help thread, or update its tracked state.
+
+    Args:
+        thread (discord.Thread): The thread.
+
+    Returns:
+        Optional[HelpThreadState]: The state, or None if the thread is not a help
+        thread, or is archived but not among the `ARCHIVED_THREAD_STATE_LIMIT`
+        most recently archived threads of its forum channel.
+    """
+    if not is_help_thread(thread):
+        return None
+
+    state = _help_thread_states.get(thread.id)
+    was_archived = state is not None and state.archived
+    if state is None:
+        state = _help_thread_states[thread.id] = HelpThreadState(thread)
+    else:
+        state.update(thread)
+
+    if state.archived and not was_archived:
+        forget_old_archived_threads(state.parent_id)
+        if thread.id not in _help_thread_states:
+            return None
+
+    schedule_help_thread_deadlines(state)
+    return state
+
+
+def track_new_thread(thread: discord.Thread) -> Optional[HelpThreadState]:
+    """Start tracking a help thread that was just created. Since it cannot
+    contain any replies yet, its member messages are counted from zero.
+    """
+    state = track_thread(thread)
+    if state is not None and state.member_message_count is None:
+        state.member_message_count = 0
+        state.member_message_count_exact = True
+    return state
+
+
+def track_message(message: discord.Message):
+    """Record a message sent in a help thread. This should be called for all
+    messages, including those of bots.
+    """
+    if is_help_thread(message.channel):
+        state = track_thread(message.channel)  # type: ignore
+        if state is not None:
+            state.update_last_message(message)
+            if is_member_message(message):
+                if state.member_message_count is not None:
+                    state.member_message_count += 1
+                if (
+                    state.member_message_seed_before is not None
+                    and message.id >= state.member_message_seed_before
+                ):
+                    state.member_message_seed_delta += 1
+            schedule_help_thread_deadlines(state)
+
+
+def track_message_delete(
+    channel_id: int, message_id: int, cached_message: Optional[discord.Message]
+):
+    """Record the deletion of a message, in case it was sent in a help thread.
+
+    Args:
+        channel_id (int): The id of the channel of the message.
+        message_id (int): The id of the message.
+        cached_message (Optional[discord.Message]): The message, if it was
+          cached. Otherwise, it is assumed to have been sent by a member, and
+          the member message count of the thread becomes a lower bound.
+    """
+    state = _help_thread_states.get(channel_id)
+    if state is None:
+        return
+
+    if message_id == channel_id:
+        state.starter_message_exists = False
+        return
+
+    if cached_message is not None and not is_member_message(cached_message):
+        return
+
+    if state.member_message_count is not None:
+        state.member_message_count = max(state.member_message_count - 1, 0)
+        if cached_message is None:
+            state.member_message_count_exact = False
+
+    if state.member_message_seed_before is not None:
+        # the history read may or may not have counted the message already
+        state.member_message_seed_delta -= 1
+
+
+async def fetch_member_message_count(thread: discord.Thread) -> int:
+    """Get the number of messages in a help thread that were sent by members,
+    counting at most up to `HELP_THREAD_DELETION_MESSAGE_THRESHOLD`, since more
+    are never needed. The thread history is only read when the tracked count is
+    unknown, or is a lower bound below the threshold. Otherwise the count is
+    kept up to date from gateway events, including those received while the
+    history is read.
+
+    Args:
+        thread (discord.Thread): The thread.
+
+    Returns:
+        int: The number of messages, which is only a lower bound if it is at
+        least `HELP_THREAD_DELETION_MESSAGE_THRESHOLD`.
+    """
+    state = track_thread(thread)
+    if state is not None and state.member_message_count is not None:
+        if (
+            state.member_message_count_exact
+            or state.member_message_count >= HELP_THREAD_DELETION_MESSAGE_THRESHOLD
+        ):
+            return state.member_message_count
+
+    # messages sent from now on are counted by `track_message` instead
+    seed_before = discord.utils.time_snowflake(discord.utils.utcnow())
+    if state is not None and state.member_message_seed_before is None:
+        state.member_message_seed_before = seed_before
+        state.member_message_seed_delta = 0
+
+    member_message_count = 0
+    exact = True
+    try:
+        async for thread_message in thread.history(
+            limit=None, before=discord.Object(seed_before)
+        ):
+            if is_member_message(thread_message):
+                member_message_count += 1
+                if member_message_count >= HELP_THREAD_DELETION_MESSAGE_THRESHOLD:
+                    exact = False
+                    break
+    except BaseException:
+        if state is not None and state.member_message_seed_before == seed_before:
+            state.member_message_seed_before = None
+        raise
+
+    if state is not None and state.member_message_seed_before == seed_before:
+        state.member_message_seed_before = None
+        if state.member_message_seed_delta < 0:
+            exact = False  # deleted messages might not have been counted
+
+        member_message_count = max(
+            member_message_count + state.member_message_seed_delta, 0
+        )
+        state.member_message_count = member_message_count
+        state.member_message_count_exact = exact
+
+    return member_message_count
+
+
+async def help_thread_deletion_checks(thread: discord.Thread):
+    """Schedule a help thread whose starter message was deleted for deletion,
+    unless it contains enough messages sent by members.
+    """
+    try:
+        if (
+            await fetch_member_message_count(thread)
+            < HELP_THREAD_DELETION_MESSAGE_THRESHOLD
+        ):
+            await thread.send(
+                embed=discord.Embed(
+                    title="Post scheduled for deletion",
+                    description=(
+                        "Someone deleted the starter message of this post.\n\n"
+                        f"Since it contains less than {HELP_THREAD_DELETION_MESSAGE_THRESHOLD} "
+                        "messages sent by server members, it will be deleted "
+                        f"**<t:{int(time.time()+300)}:R>**."
+                    ),
+                    color=0x551111,
+                )
+            )
+            await asyncio.sleep(300)
+            await thread.delete()
+    except discord.HTTPException:
+        pass
+
+
+def untrack_thread(thread_id: int):
+    """Stop tracking a deleted help thread."""
+    _help_thread_states.pop(thread_id, None)
+    help_thread_scheduler.cancel((thread_id, "alert"))
+    help_thread_scheduler.cancel((thread_id, "archive"))
+
+
+def get_help_forum_channels() -> list[discord.ForumChannel]:
+    """Get all help forum channels that are in the cache."""
+    return [
+        channel
+        for fid in common.GuildConstants.HELP_FORUM_CHANNEL_IDS.values()
+        if isinstance((channel := common.bot.get_channel(fid)), discord.ForumChannel)
+    ]
+
+
+def forget_old_archived_threads(parent_id: int):
+    """Stop tracking the archived threads of a help forum channel that are not
+    among the `ARCHIVED_THREAD_STATE_LIMIT` most recently archived ones.
+    """
+    archived_states = sorted(
+        (
+            state
+            for state in _help_thread_states.values()
+            if state.archived and state.parent_id == parent_id
+        ),
+        key=lambda state: state.archive_ts,
+        reverse=True,
+    )
+    for state in archived_states[ARCHIVED_THREAD_STATE_LIMIT:]:
+        untrack_thread(state.thread_id)
+
+
+def sync_cached_help_threads():
+    """Update the tracked states from all help threads in the cache. This does
+    not make any HTTP requests.
+    """
+    for forum_channel in get_help_forum_channels():
+        for thread in forum_channel.threads:
+            track_thread(thread)
+
+
+def reschedule_help_thread_deadlines():
+    """Recompute the deadlines of all tracked help threads, after updating them
+    from the cache. This catches changes that were not seen as events.
+    """
+    sync_cached_help_threads()
+    for state in _help_thread_states.values():
+        schedule_help_thread_deadlines(state)
+
+
+async def load_help_thread_states(
+    archived_limit: int = ARCHIVED_THREAD_STATE_LIMIT,
+):
+    """Start tracking all active help threads, as well as the most recently
+    archived ones, which are not kept in the cache.
+
+    Args:
+        archived_limit (int, optional): The number of archived threads to fetch
+          per help forum channel. Defaults to `ARCHIVED_THREAD_STATE_LIMIT`.
+    """
+    for fid in common.GuildConstants.HELP_FORUM_CHANNEL_IDS.values():
+        try:
+            forum_channel = common.bot.get_channel(fid) or (
+                await common.bot.fetch_channel(fid)
+            )
+            if not isinstance(forum_channel, discord.ForumChannel):
+                continue
+
+            for thread in forum_channel.threads:
+                track_thread(thread)
+
+            async for thread in forum_channel.archived_threads(limit=archived_limit):
+                track_thread(thread)
+        except discord.HTTPException:
+            pass
+
+
+def schedule_help_thread_deadlines(
+    state: HelpThreadState, retry_kind: Optional[HelpThreadDeadlineKind] = None
+):
+    """(Re)schedule the inactivity alert and archive timeout of a help thread,
+    based on its tracked state. Deadlines that no longer apply are cancelled.
+
+    Args:
+        state (HelpThreadState): The state of the thread.
+        retry_kind (Optional[HelpThreadDeadlineKind], optional): The kind of
+          deadline that was just handled. If it would be due immediately, it is
+          retried after `HELP_THREAD_DEADLINE_RETRY_DELAY` instead. Defaults to
+          None.
+    """
+    now_ts = time.time()
+    deadlines: dict[HelpThreadDeadlineKind, Optional[float]] = {
+        "alert": None,
+        "archive": None,
+    }
+
+    if not (state.locked or state.pinned or state.solved):
+        data = common.inactive_help_thread_data.get(state.thread_id)
+        alert_message_id = data.get("alert_message_id") if data else None
+        if (
+            alert_message_id
+            and discord.utils.snowflake_time(alert_message_id).timestamp()
+            < state.last_active_ts  # someone messaged into the channel
+            and not state.last_message_is_system
+        ):
+            deadlines["alert"] = now_ts  # the alert is outdated, remove it
+        elif data is None or data["last_active_ts"] < state.last_active_ts:
+            deadlines["alert"] = state.last_active_ts + INACTIVE_HELP_THREAD_ALERT_DELAY
+
+    if not (state.archived or state.locked or state.pinned) and (
+        state.auto_archive_duration
+    ):
+        deadlines["archive"] = state.last_active_ts + state.auto_archive_duration * 60
+
+    for kind, when in deadlines.items():
+        key = (state.thread_id, kind)
+        if when is None:
+            help_thread_scheduler.cancel(key)
+            continue
+
+        if kind == retry_kind:
+            when = max(when, now_ts + HELP_THREAD_DEADLINE_RETRY_DELAY)
+
+        if help_thread_scheduler.get_deadline(key) != when:
+            help_thread_scheduler.schedule(key, when)
+
+
+async def alert_inactive_help_thread(thread_id: int):
+    """Send an inactivity alert into a help thread if it has been inactive for
+    `INACTIVE_HELP_THREAD_ALERT_DELAY`, or remove its alert once someone has
+    messaged into it again.
+
+    Args:
+        thread_id (int): The id of the thread.
+    """
+    state = _help_thread_states.get(thread_id)
+    if state is None or state.locked or state.pinned or state.solved:
+        return
+
+    # archived threads are not cached, but can still be messaged by their id
+    help_thread = common.bot.get_channel(
+        thread_id
+    ) or common.bot.get_partial_messageable(
+        thread_id, type=discord.ChannelType.public_thread
+    )
+    last_active_ts = state.last_active_ts
+    try:
+        if (time.time() - last_active_ts) > INACTIVE_HELP_THREAD_ALERT_DELAY:
+            if (
+                thread_id not in common.inactive_help_thread_data
+                or common.inactive_help_thread_data[thread_id]["last_active_ts"]
+                < last_active_ts
+            ):
+                alert_message = await help_thread.send(  # type: ignore
+                    f"help-post-inactive(<@{state.owner_id}>, **{state.name}**)",
+                    embed=discord.Embed(
+                        title="Your help post has gone inactive... 💤",
+                        description=f"Your help post was last active **<t:{int(last_active_ts)}:R>** ."
+                        "\nHas your issue been solved? If so, mark it as **Solved** by "
+                        "doing one of these:\n\n"
+                        "  **• React on your starter message with ✅**.\n"
+                        "  **• Right-click on your post (click and hold on mobile), "
+                        "go to 'Edit Tags', select the `✅ Solved` tag and save your changes.**\n\n"
+                        "**Mark all messages you find helpful here with a ✅ reaction please** "
+                        "<:pg_robot:837389387024957440>\n\n"
+                        "*If your issue has't been solved, you may "
+                        "either wait for help or close this post.*",
+                        color=0x888888,
+                    ),
+                )
+                state.update_last_message(alert_message)
+                common.inactive_help_thread_data[thread_id] = {
+                    "thread_id": thread_id,
+                    "last_active_ts": alert_message.created_at.timestamp(),
+                    "alert_message_id": alert_message.id,
+                }
+        elif (
+            thread_id in common.inactive_help_thread_data
+            and (
+                alert_message_id := common.inactive_help_thread_data[thread_id].get(
+                    "alert_message_id", None
+                )
+            )
+            and discord.utils.snowflake_time(alert_message_id).timestamp()
+            < last_active_ts  # someone messaged into the channel
+            and not state.last_message_is_system
+        ):
+            try:
+                await help_thread.get_partial_message(  # type: ignore
+                    alert_message_id
+                ).delete()
+            except discord.NotFound:
+                pass
+            finally:
+                del common.inactive_help_thread_data[thread_id]["alert_message_id"]
+                common.inactive_help_thread_data.mark_dirty(thread_id)
+
+    except discord.HTTPException:
+        pass
+    finally:
+        if thread_id in _help_thread_states:
+            schedule_help_thread_deadlines(state, retry_kind="alert")
+
+
+async def archive_inactive_help_thread(thread_id: int):
+    """Close a help thread once it has exceeded its inactivity timeout. Solved
+    threads are also given a slowmode.
+
+    Args:
+        thread_id (int): The id of the thread.
+    """
+    help_thread = common.bot.get_channel(thread_id)
+    if not isinstance(help_thread, discord.Thread) or not help_thread.created_at:
+        return
+
+    state = track_thread(help_thread)
+    if state is None:
+        return
+
+    try:
+        if not (help_thread.archived or help_thread.locked or help_thread.flags.pinned):
+            if (
+                time.time() - state.last_active_ts
+            ) / 60.0 > help_thread.auto_archive_duration:
+                thread_edits = {}
+                thread_edits["archived"] = True
+
+                if (
+                    state.solved
+                    and help_thread.parent is not None
+                    and help_thread.slowmode_delay
+                    == help_thread.parent.default_thread_slowmode_delay
+                ):
+                    # solved and no overridden slowmode
+                    thread_edits["slowmode_delay"] = 60  # seconds
+
+                if not (
+                    help_thread.name.endswith(
+                        owner_id_suffix := f" | {help_thread.owner_id}"
+                    )
+                    or str(help_thread.owner_id) in help_thread.name
+                ):  # wait for a few event loop iterations, before doing a second,
+                    # check, to be sure that a bot edit hasn't already occured
+                    thread_edits["archived"] = False
+                    thread_edits["name"] = (
+                        help_thread.name
+                        if len(help_thread.name) < 72
+                        else help_thread.name[:72] + "..."
+                    ) + owner_id_suffix
+
+                await help_thread.edit(
+                    reason="This help thread has been closed "
+                    "after exceeding its inactivity timeout.",
+                    **thread_edits,
+                )
+                state.update(help_thread)
+    except discord.HTTPException:
+        pass
+    finally:
+        if thread_id in _help_thread_states:
+            schedule_help_thread_deadlines(state, retry_kind="archive")
+
+
+_DEADLINE_HANDLERS = {
+    "alert": alert_inactive_help_thread,
+    "archive": archive_inactive_help_thread,
+}
+
+
+async def handle_due_help_threads(due: list[tuple[HelpThreadDeadlineKey, None]]):
+    """Handle help thread deadlines that are due, in `help_forum_executor`."""
+    for (thread_id, kind), _ in due:
+        help_forum_executor.submit(thread_id, _DEADLINE_HANDLERS[kind], thread_id)
+
+
+help_thread_scheduler: DeadlineScheduler[
+    HelpThreadDeadlineKey, None
+] = DeadlineScheduler(handle_due_help_threads)
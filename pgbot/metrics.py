@@ -0,0 +1,312 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines a small in-process metrics registry, for counting events and
+recording durations inside the bot.
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import json
+import math
+import os
+import time
+from typing import Any, Callable, Coroutine, Optional, TypeVar, Union
+
+_T = TypeVar("_T")
+
+# bucket upper bounds in seconds, from 1ms to 10min
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+    600.0,
+)
+
+
+class Counter:
+    """
+    A monotonically increasing counter.
+    """
+
+    __slots__ = ("name", "description", "value")
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        """Increment the counter by the given amount."""
+        self.value += amount
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"type": "counter", "value": self.value}
+
+
+class Gauge:
+    """
+    A value that can go up and down, such as the size of a cache.
+    """
+
+    __slots__ = ("name", "description", "value")
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self.value = 0
+
+    def set(self, value: Union[int, float]):
+        """Set the gauge to the given value."""
+        self.value = value
+
+    def inc(self, amount: Union[int, float] = 1):
+        """Increment the gauge by the given amount."""
+        self.value += amount
+
+    def dec(self, amount: Union[int, float] = 1):
+        """Decrement the gauge by the given amount."""
+        self.value -= amount
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"type": "gauge", "value": self.value}
+
+
+class Histogram:
+    """
+    A histogram of observed values with fixed buckets, which keeps the count,
+    sum, minimum and maximum of all values.
+    """
+
+    __slots__ = (
+        "name",
+        "description",
+        "unit",
+        "buckets",
+        "bucket_counts",
+        "count",
+        "sum",
+        "min",
+        "max",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        unit: str = "s",
+    ):
+        self.name = name
+        self.description = description
+        self.unit = unit  # "s" for durations, or "" for plain counts
+        self.buckets = tuple(sorted(buckets))
+        # the last bucket counts values greater than all bucket bounds
+        self.bucket_counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def observe(self, value: float):
+        """Record a value."""
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile of the recorded values, as the upper bound of the
+        bucket that contains it.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            Optional[float]: The estimate, or None if no values were recorded.
+        """
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        total = 0
+        for i, bucket_count in enumerate(self.bucket_counts):
+            total += bucket_count
+            if total >= rank:
+                if i < len(self.buckets):
+                    return min(self.buckets[i], self.max)
+                break
+
+        return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "type": "histogram",
+            "unit": self.unit,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+_metrics: dict[str, Union[Counter, Gauge, Histogram]] = {}
+
+
+def _get_metric(cls: type, name: str, *args, **kwargs):
+    metric = _metrics.get(name)
+    if metric is None:
+        metric = _metrics[name] = cls(name, *args, **kwargs)
+    elif not isinstance(metric, cls):
+        raise TypeError(
+            f"metric '{name}' is a {type(metric).__name__}, not a {cls.__name__}"
+        )
+    return metric
+
+
+def counter(name: str, description: str = "") -> Counter:
+    """Get the counter with the given name, creating it if it does not exist.
+
+    Args:
+        name (str): The name of the counter.
+        description (str, optional): A description used when creating the
+          counter. Defaults to "".
+
+    Returns:
+        Counter: The counter.
+    """
+    return _get_metric(Counter, name, description)
+
+
+def gauge(name: str, description: str = "") -> Gauge:
+    """Get the gauge with the given name, creating it if it does not exist.
+
+    Args:
+        name (str): The name of the gauge.
+        description (str, optional): A description used when creating the gauge.
+          Defaults to "".
+
+    Returns:
+        Gauge: The gauge.
+    """
+    return _get_metric(Gauge, name, description)
+
+
+def histogram(
+    name: str,
+    description: str = "",
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    unit: str = "s",
+) -> Histogram:
+    """Get the histogram with the given name, creating it if it does not exist.
+
+    Args:
+        name (str): The name of the histogram.
+        description (str, optional): A description used when creating the
+          histogram. Defaults to "".
+        buckets (tuple[float, ...], optional): The bucket upper bounds used when
+          creating the histogram. Defaults to `DEFAULT_BUCKETS`.
+        unit (str, optional): The unit of the values used when creating the
+          histogram, such as "s" for durations or "B" for sizes, or "" for plain
+          counts. Defaults to "s".
+
+    Returns:
+        Histogram: The histogram.
+    """
+    return _get_metric(Histogram, name, description, buckets, unit)
+
+
+def snapshot(prefix: str = "") -> dict[str, dict[str, Any]]:
+    """Get the current values of all metrics.
+
+    Args:
+        prefix (str, optional): Only include metrics whose names start with this.
+          Defaults to "".
+
+    Returns:
+        dict[str, dict[str, Any]]: A mapping of metric names to their values.
+    """
+    return {
+        name: metric.snapshot()
+        for name, metric in sorted(_metrics.items())
+        if name.startswith(prefix)
+    }
+
+
+def instrumented(
+    name: str,
+) -> Callable[
+    [Callable[..., Coroutine[Any, Any, _T]]], Callable[..., Coroutine[Any, Any, _T]]
+]:
+    """Decorate a coroutine function to record its calls in the metrics
+    `{name}.calls`, `{name}.errors` (calls that raised), `{name}.duration` and
+    `{name}.in_flight` (calls currently running). This only costs a few
+    attribute updates per call.
+
+    Args:
+        name (str): The prefix of the metric names.
+
+    Returns:
+        Callable: The decorator.
+    """
+    calls = counter(f"{name}.calls", "Number of calls")
+    errors = counter(f"{name}.errors", "Number of calls that raised an exception")
+    duration = histogram(f"{name}.duration", "Duration of calls in seconds")
+    in_flight = gauge(f"{name}.in_flight", "Number of calls currently running")
+
+    def decorator(
+        func: Callable[..., Coroutine[Any, Any, _T]]
+    ) -> Callable[..., Coroutine[Any, Any, _T]]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> _T:
+            calls.inc()
+            in_flight.inc()
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except BaseException:
+                errors.inc()
+                raise
+            finally:
+                duration.observe(time.perf_counter() - start)
+                in_flight.dec()
+
+        return wrapper
+
+    return decorator
+
+
+def dump(path: str, values: dict[str, dict[str, Any]]):
+    """Write a snapshot of metrics to a JSON file, along with the time it was
+    written at. The file is replaced atomically, so that readers never see a
+    partial dump. This does blocking IO, so it should be run in a thread, but
+    the snapshot should be taken beforehand, in the event loop.
+
+    Args:
+        path (str): The path of the file.
+        values (dict[str, dict[str, Any]]): The snapshot, as returned by
+          `snapshot`.
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"timestamp": time.time(), "metrics": values}, f, indent=2)
+    os.replace(temp_path, path)
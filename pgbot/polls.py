@@ -0,0 +1,193 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines a registry of ongoing polls, so that reactions can be matched
+to polls without fetching the reacted message, and of the voters of every poll.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional, TypedDict
+
+import discord
+
+from pgbot.storage import StorageTable, read_table, update_table
+from pgbot.utils import parse_text_to_mapping
+
+POLLS_TABLE = "polls"
+
+# whether the polls started before the registry existed were registered
+POLL_SCAN_TABLE = "poll_scan"
+
+# the number of recent messages of every channel that are searched for polls
+# started before the registry existed
+POLL_SCAN_HISTORY_LIMIT = 100
+
+
+class PollData(TypedDict):
+    channel_id: int
+    author_id: int
+    voting_mode: str  # "single" or "multiple"
+
+
+def parse_poll_message(message: discord.Message) -> Optional[PollData]:
+    """Get the configuration of an ongoing poll from the footer of its embed.
+
+    Args:
+        message (discord.Message): The poll message.
+
+    Returns:
+        Optional[PollData]: The poll configuration, or None if the message is not
+        an ongoing poll.
+    """
+    if not message.embeds or not (footer_text := message.embeds[0].footer.text):
+        return None
+
+    split_footer = footer_text.split("___\n")  # separator used by poll embeds
+    if len(split_footer) == 1:
+        return None
+
+    try:
+        poll_config_map = parse_text_to_mapping(
+            split_footer[1], delimiter=":", separator=" | "
+        )
+    except (SyntaxError, ValueError):
+        return None
+
+    if not (
+        poll_config_map.get("by", "").isnumeric() and "voting-mode" in poll_config_map
+    ):
+        return None
+
+    return {
+        "channel_id": message.channel.id,
+        "author_id": int(poll_config_map["by"]),
+        "voting_mode": poll_config_map["voting-mode"],
+    }
+
+
+async def get_poll(message_id: int) -> Optional[PollData]:
+    """Get a registered poll by the id of its message."""
+    return (await read_table(POLLS_TABLE, dict)).get(message_id)
+
+
+async def register_poll(message_id: int, poll_data: PollData):
+    """Register an ongoing poll.
+
+    Args:
+        message_id (int): The id of the poll message.
+        poll_data (PollData): The poll configuration.
+    """
+    await update_table(POLLS_TABLE, {message_id: poll_data})
+
+
+async def unregister_polls(message_ids: Iterable[int]):
+    """Unregister polls that were closed or deleted. Ids of messages that are not
+    registered polls are ignored.
+    """
+    registered_polls = await read_table(POLLS_TABLE, dict)
+    deleted = []
+    for message_id in message_ids:
+        _poll_votes.pop(message_id, None)
+        if message_id in registered_polls:
+            deleted.append(message_id)
+
+    if deleted:
+        await update_table(POLLS_TABLE, {}, deleted)
+
+
+async def unregister_poll(message_id: int):
+    """Unregister a poll that was closed or deleted."""
+    await unregister_polls((message_id,))
+
+
+async def scan_unregistered_polls(
+    channels: Iterable[discord.TextChannel], author_id: int
+):
+    """Register the ongoing polls that were started before polls were
+    registered, by searching the last `POLL_SCAN_HISTORY_LIMIT` messages of every
+    channel for them. This is only done once, since all polls started since then
+    are registered. Older polls can still be closed, but votes on them are not
+    tracked.
+
+    Args:
+        channels (Iterable[discord.TextChannel]): The channels to search.
+        author_id (int): The id of the bot, which sent all polls.
+    """
+    async with StorageTable(POLL_SCAN_TABLE, bool) as storage_obj:
+        if storage_obj.obj:
+            return
+
+        for channel in channels:
+            try:
+                async for message in channel.history(limit=POLL_SCAN_HISTORY_LIMIT):
+                    if message.author.id == author_id and (
+                        poll_data := parse_poll_message(message)
+                    ):
+                        await register_poll(message.id, poll_data)
+            except discord.HTTPException:
+                pass
+
+        storage_obj.obj = True
+
+
+# message id -> emoji string -> ids of the members that reacted with it. These
+# are only kept in memory, and loaded from the poll message when first needed.
+PollVotes = dict[str, set[int]]
+_poll_votes: dict[int, PollVotes] = {}
+
+
+async def forget_unregistered_poll_votes():
+    """Forget the voters of polls that are not registered anymore, after the
+    poll registry was changed directly.
+    """
+    registered_polls = await read_table(POLLS_TABLE, dict)
+    for message_id in tuple(_poll_votes):
+        if message_id not in registered_polls:
+            del _poll_votes[message_id]
+
+
+def get_poll_votes(message_id: int) -> Optional[PollVotes]:
+    """Get the voters of every option of a poll, if they were loaded."""
+    return _poll_votes.get(message_id)
+
+
+def start_poll_votes(message_id: int):
+    """Start tracking the voters of a new poll, which has none yet."""
+    _poll_votes[message_id] = {}
+
+
+async def load_poll_votes(message: discord.Message) -> PollVotes:
+    """Load the voters of every option of a poll from the reactions of its
+    message, which must be up to date. This costs one HTTP request per option.
+
+    Args:
+        message (discord.Message): The poll message.
+
+    Returns:
+        PollVotes: The voters of every option.
+    """
+    poll_votes: PollVotes = {}
+    for reaction in message.reactions:
+        poll_votes[str(reaction.emoji)] = {
+            user.id async for user in reaction.users() if not user.bot
+        }
+
+    _poll_votes[message.id] = poll_votes
+    return poll_votes
+
+
+def add_vote(message_id: int, emoji: str, user_id: int):
+    """Record a vote on a poll, if its voters are loaded."""
+    if (poll_votes := _poll_votes.get(message_id)) is not None:
+        poll_votes.setdefault(emoji, set()).add(user_id)
+
+
+def remove_vote(message_id: int, emoji: str, user_id: int):
+    """Record the removal of a vote on a poll, if its voters are loaded."""
+    if (poll_votes := _poll_votes.get(message_id)) is not None and (
+        voters := poll_votes.get(emoji)
+    ):
+        voters.discard(user_id)
@@ -0,0 +1,248 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines the scheduling and delivery of reminders. All stored reminders
+are kept in a deadline scheduler, which wakes up exactly when the next reminder
+is due. Due reminders are then sent by a bounded pool of concurrent deliveries.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import random
+import sys
+import time
+from typing import Optional
+
+import discord
+
+from pgbot import common, metrics
+from pgbot.storage import StorageTable, read_table
+from pgbot.utils.scheduling import DeadlineScheduler
+
+# reminders are stored as {member_id: {datetime: (message, channel_id, message_id)}}
+ReminderKey = tuple[int, datetime.datetime]
+Reminder = tuple[str, int, int]
+
+# at most this many reminders are delivered at the same time
+REMINDER_DELIVERY_CONCURRENCY = 8
+
+# delivery attempts that failed with a transient HTTP error are retried with an
+# exponential backoff, until this many attempts were made
+REMINDER_DELIVERY_MAX_ATTEMPTS = 5
+REMINDER_RETRY_BASE_DELAY = 5.0  # seconds
+REMINDER_RETRY_MAX_DELAY = 300.0  # seconds
+
+_delivery_semaphore: Optional[asyncio.Semaphore] = None
+# channel id -> (lock, number of deliveries holding or waiting for it). Locks are
+# removed once no delivery uses them anymore.
+_channel_locks: dict[int, tuple[asyncio.Lock, int]] = {}
+_delivery_attempts: dict[ReminderKey, int] = {}
+
+delivery_latency = metrics.histogram(
+    "reminders.delivery_latency",
+    "Time between the due time of a reminder and it being sent, in seconds",
+)
+delivered_count = metrics.counter("reminders.delivered")
+retried_count = metrics.counter("reminders.retried")
+failed_count = metrics.counter("reminders.failed")
+
+
+def _is_transient_error(exc: discord.HTTPException) -> bool:
+    return exc.status == 429 or exc.status >= 500
+
+
+async def deliver_reminder(mem_id: int, msg: str, chan_id: int, msg_id: int):
+    """
+    Send a reminder to a member, as a reply to the message that set it.
+
+    Raises:
+        discord.HTTPException: The reminder could not be sent because of a
+          transient error (rate limit or Discord server error), and should be
+          retried.
+    """
+    content = f"__**Reminder for you:**__\n>>> {msg}"
+
+    channel = None
+    if common.guild is not None:
+        channel = common.guild.get_channel(chan_id)
+    if not isinstance(channel, discord.TextChannel):
+        # Channel does not exist in the guild, DM the user
+        try:
+            user = await common.bot.fetch_user(mem_id)
+            if user.dm_channel is None:
+                await user.create_dm()
+
+            await user.dm_channel.send(content=content)
+        except discord.HTTPException as e:
+            if _is_transient_error(e):
+                raise
+        return
+
+    allowed_mentions = discord.AllowedMentions.none()
+    allowed_mentions.replied_user = True
+    try:
+        message = await channel.fetch_message(msg_id)
+        await message.reply(content=content, allowed_mentions=allowed_mentions)
+    except discord.HTTPException as e:
+        if _is_transient_error(e):
+            raise
+
+        # The message probably got deleted, try to resend in channel
+        allowed_mentions.users = [discord.Object(mem_id)]
+        content = f"__**Reminder for <@!{mem_id}>:**__\n>>> {msg}"
+        try:
+            await channel.send(
+                content=content,
+                allowed_mentions=allowed_mentions,
+            )
+        except discord.HTTPException as e:
+            if _is_transient_error(e):
+                raise
+
+
+def _release_channel_lock(chan_id: int):
+    channel_lock, users = _channel_locks[chan_id]
+    if users <= 1:
+        del _channel_locks[chan_id]
+    else:
+        _channel_locks[chan_id] = (channel_lock, users - 1)
+
+
+async def _deliver_in_pool(key: ReminderKey, reminder: Reminder) -> bool:
+    """
+    Deliver a reminder within the delivery pool. Reminders for the same channel
+    are delivered one at a time, in the order they came due.
+
+    Returns:
+        bool: Whether the reminder is done with, either because it was sent or
+        because it failed permanently. Reminders that will be retried return
+        False.
+    """
+    global _delivery_semaphore
+    if _delivery_semaphore is None:
+        _delivery_semaphore = asyncio.Semaphore(REMINDER_DELIVERY_CONCURRENCY)
+
+    mem_id, on = key
+    chan_id = reminder[1]
+    channel_lock, users = _channel_locks.get(chan_id, (None, 0))
+    if channel_lock is None:
+        channel_lock = asyncio.Lock()
+    _channel_locks[chan_id] = (channel_lock, users + 1)
+
+    # take the channel lock first, so that reminders waiting on a busy channel
+    # don't occupy delivery slots
+    try:
+        async with channel_lock, _delivery_semaphore:
+            await deliver_reminder(mem_id, *reminder)
+    except discord.HTTPException:
+        attempts = _delivery_attempts.get(key, 0) + 1
+        if attempts >= REMINDER_DELIVERY_MAX_ATTEMPTS:
+            _delivery_attempts.pop(key, None)
+            failed_count.inc()
+            return True
+
+        if on not in (await read_table("reminders")).get(mem_id, ()):
+            # the reminder was removed in the meantime
+            _delivery_attempts.pop(key, None)
+            return True
+
+        _delivery_attempts[key] = attempts
+        delay = min(
+            REMINDER_RETRY_BASE_DELAY * 2 ** (attempts - 1),
+            REMINDER_RETRY_MAX_DELAY,
+        )
+        reminder_scheduler.schedule(
+            key, time.time() + delay * random.uniform(1.0, 1.5), reminder
+        )
+        retried_count.inc()
+        return False
+    finally:
+        _release_channel_lock(chan_id)
+
+    _delivery_attempts.pop(key, None)
+    delivery_latency.observe(max(time.time() - on.timestamp(), 0.0))
+    delivered_count.inc()
+    return True
+
+
+async def _remove_stored_reminder(mem_id: int, on: datetime.datetime):
+    async with StorageTable("reminders") as storage_obj:
+        storage_data = storage_obj.obj
+        if on not in storage_data.get(mem_id, ()):
+            return
+
+        del storage_data[mem_id][on]
+        if not storage_data[mem_id]:
+            del storage_data[mem_id]
+        storage_obj.obj = storage_data
+
+
+async def _deliver_and_remove(key: ReminderKey, reminder: Reminder):
+    try:
+        is_done = await _deliver_in_pool(key, reminder)
+    except Exception as e:
+        # unexpected error, don't retry to avoid sending duplicates
+        print(f"Failed to deliver reminder: {e!r}", file=sys.stderr)
+        is_done = True
+
+    # removed right away rather than after the whole batch, so that a restart
+    # never sends it again
+    if is_done:
+        await _remove_stored_reminder(*key)
+
+
+async def _deliver_due_reminders(due_reminders: list[tuple[ReminderKey, Reminder]]):
+    results = await asyncio.gather(
+        *(_deliver_and_remove(key, reminder) for key, reminder in due_reminders),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            print(f"Failed to remove delivered reminder: {result!r}", file=sys.stderr)
+
+
+async def handle_due_reminders(due_reminders: list[tuple[ReminderKey, Reminder]]):
+    """
+    Deliver all reminders that are due in the background, and remove each of them
+    from storage as soon as it was sent.
+    """
+    common.hold_task(asyncio.create_task(_deliver_due_reminders(due_reminders)))
+
+
+reminder_scheduler: DeadlineScheduler[ReminderKey, Reminder] = DeadlineScheduler(
+    handle_due_reminders
+)
+
+
+def schedule_reminder(mem_id: int, on: datetime.datetime, reminder: Reminder):
+    """
+    Schedule a reminder for delivery. This does not store the reminder.
+    """
+    reminder_scheduler.schedule((mem_id, on), on.timestamp(), reminder)
+
+
+def unschedule_reminder(mem_id: int, on: datetime.datetime):
+    """
+    Cancel the delivery of a reminder. This does not remove the reminder from
+    storage.
+    """
+    reminder_scheduler.cancel((mem_id, on))
+    _delivery_attempts.pop((mem_id, on), None)
+
+
+async def load_reminders():
+    """
+    (Re)build the reminder schedule from the reminders in storage.
+    """
+    storage_data: dict[int, dict[datetime.datetime, Reminder]] = await read_table(
+        "reminders"
+    )
+    reminder_scheduler.clear()
+    _delivery_attempts.clear()
+    for mem_id, reminder_dict in storage_data.items():
+        for on, reminder in reminder_dict.items():
+            schedule_reminder(mem_id, on, reminder)
@@ -8,8 +8,8 @@ It gets called every 5 seconds or so.
 """
 
 import asyncio
-import datetime
-import itertools
+import copy
+import io
 import os
 import sys
 import time
@@ -18,78 +18,123 @@ import discord
 from discord.ext import tasks
 import snakecore
 
-from pgbot import common
-from pgbot.utils import (
-    fetch_last_thread_activity_dt,
-    fetch_last_thread_message,
-    help_thread_deletion_checks,
+from pgbot import common, help_threads, metrics
+from pgbot.storage import update_table
+
+
+help_thread_data_flush_latency = metrics.histogram(
+    "storage.help_thread_data.flush_latency",
+    "Time taken to persist the changes to the help thread data, in seconds",
+)
+help_thread_data_flush_size = metrics.histogram(
+    "storage.help_thread_data.flush_size",
+    "Number of bytes written per flush of the help thread data, if the storage "
+    "backend reports it",
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    unit="B",
+)
+help_thread_reconcile_duration = metrics.histogram(
+    "help_threads.reconcile_duration",
+    "Time taken to recompute the deadlines of all help threads, in seconds",
+)
+help_thread_starter_check_duration = metrics.histogram(
+    "help_threads.starter_check_duration",
+    "Time taken to check all help threads for deleted starter messages, in seconds",
 )
 
 
-async def handle_reminders(reminder_obj: snakecore.storage.DiscordStorage):
+async def flush_help_thread_data():
     """
-    Handle reminder routines
+    Persist the entries of the help thread data that changed since the last
+    flush.
     """
-    new_reminders = {}
-    for mem_id, reminder_dict in reminder_obj.obj.items():
-        for dt, (msg, chan_id, msg_id) in reminder_dict.items():
-            if datetime.datetime.now(datetime.timezone.utc) >= dt:
-                content = f"__**Reminder for you:**__\n>>> {msg}"
-
-                channel = None
-                if common.guild is not None:
-                    channel = common.guild.get_channel(chan_id)
-                if not isinstance(channel, discord.TextChannel):
-                    # Channel does not exist in the guild, DM the user
-                    try:
-                        user = await common.bot.fetch_user(mem_id)
-                        if user.dm_channel is None:
-                            await user.create_dm()
-
-                        await user.dm_channel.send(content=content)
-                    except discord.HTTPException:
-                        pass
-                    continue
-
-                allowed_mentions = discord.AllowedMentions.none()
-                allowed_mentions.replied_user = True
-                try:
-                    message = await channel.fetch_message(msg_id)
-                    await message.reply(
-                        content=content, allowed_mentions=allowed_mentions
-                    )
-                except discord.HTTPException:
-                    # The message probably got deleted, try to resend in channel
-                    allowed_mentions.users = [discord.Object(mem_id)]
-                    content = f"__**Reminder for <@!{mem_id}>:**__\n>>> {msg}"
-                    try:
-                        await channel.send(
-                            content=content,
-                            allowed_mentions=allowed_mentions,
-                        )
-                    except discord.HTTPException:
-                        pass
+    for table_name, data in (
+        ("inactive_help_thread_data", common.inactive_help_thread_data),
+        ("bad_help_thread_data", common.bad_help_thread_data),
+    ):
+        dirty_keys = data.take_dirty_keys()
+        if not dirty_keys:
+            continue
+
+        start = time.perf_counter()
+        changed = {}
+        deleted = []
+        for key in dirty_keys:
+            if key in data:
+                changed[key] = copy.deepcopy(data[key])
             else:
-                if mem_id not in new_reminders:
-                    new_reminders[mem_id] = {}
+                deleted.append(key)
 
-                new_reminders[mem_id][dt] = (msg, chan_id, msg_id)
+        try:
+            written = await update_table(table_name, changed, deleted)
+        except BaseException:
+            data.dirty_keys.update(dirty_keys)  # try again on the next flush
+            raise
 
-    reminder_obj.obj = new_reminders
+        help_thread_data_flush_latency.observe(time.perf_counter() - start)
+        if written is not None:
+            help_thread_data_flush_size.observe(written)
+
+
+@tasks.loop(seconds=30, reconnect=True)
+async def help_thread_data_flusher():
+    """
+    Periodically persist changes to the help thread data, so that bursts of
+    changes are written together.
+    """
+    await flush_help_thread_data()
+
+
+@tasks.loop(seconds=common.METRICS_DUMP_INTERVAL, reconnect=True)
+async def dump_metrics():
+    """
+    Periodically write the metrics of the bot to a local file, for inspection
+    without going through Discord.
+    """
+    await asyncio.to_thread(metrics.dump, common.METRICS_DUMP_PATH, metrics.snapshot())
+
+
+# the console is flushed more often while output is flowing, and less often
+# while it is idle
+CONSOLE_MIN_INTERVAL = 2
+CONSOLE_MAX_INTERVAL = 30
+# output that would take more messages than this is sent as a file attachment
+CONSOLE_MAX_MESSAGES = 3
+
+console_dropped_chars = metrics.counter(
+    "console.dropped_chars",
+    "Number of console output characters dropped because the buffer was full",
+)
+console_sent_chars = metrics.counter(
+    "console.sent_chars", "Number of console output characters sent to Discord"
+)
+
+
+def _adapt_console_interval(output_size: int):
+    interval = handle_console.seconds
+    if output_size:
+        interval = max(interval / 2, CONSOLE_MIN_INTERVAL)
+    else:
+        interval = min(interval * 2, CONSOLE_MAX_INTERVAL)
+
+    if interval != handle_console.seconds:
+        handle_console.change_interval(seconds=interval)
 
 
 @tasks.loop(seconds=5, reconnect=True)
 async def handle_console():
     """
     Function for sending the console output to the bot-console channel.
+    Output is sent in at most `CONSOLE_MAX_MESSAGES` messages, or as a single
+    file attachment if it is longer than that.
     """
     if common.stdout is None:
         return
 
-    contents = common.stdout.getvalue()
-    # reset StringIO object for reuse
-    common.stdout.truncate(0)
-    common.stdout.seek(0)
+    contents, dropped = common.stdout.drain()
+    _adapt_console_interval(len(contents))
+    if dropped:
+        console_dropped_chars.inc(dropped)
 
     # hide path data
     contents = contents.replace(os.getcwd(), "PgBot")
@@ -100,13 +145,31 @@ async def handle_console():
         # just return if we cannot sent it on discord
         return
 
+    if dropped:
+        contents = f"[{dropped} characters of output were dropped]\n{contents}"
+
     # the actual message limit is 2000. But since the message is sent with
     # code ticks, we need room for those, so 1980
-    for content in snakecore.utils.split_long_message(contents, 1980):
-        content = content.strip()
-        if not content:
-            continue
+    chunks = [
+        content
+        for content in map(
+            str.strip, snakecore.utils.split_long_message(contents, 1980)
+        )
+        if content
+    ]
+    if not chunks:
+        return
 
+    console_sent_chars.inc(len(contents))
+    if len(chunks) > CONSOLE_MAX_MESSAGES:
+        with io.BytesIO(contents.encode()) as fobj:
+            await common.console_channel.send(
+                content=f"Console output ({len(contents)} characters)",
+                file=discord.File(fobj, filename="console.txt"),
+            )
+        return
+
+    for content in chunks:
         await common.console_channel.send(
             content=snakecore.utils.code_block(content, code_type="ansi")
         )
@@ -118,9 +181,6 @@ async def routine():
     Function that gets called routinely. This function inturn, calles other
     routine functions to handle stuff
     """
-    async with snakecore.storage.DiscordStorage("reminders") as storage_obj:
-        await handle_reminders(storage_obj)
-
     await common.bot.change_presence(
         activity=discord.Activity(
             type=discord.ActivityType.watching,
@@ -136,176 +196,84 @@ async def routine():
     )
 
 
-@tasks.loop(hours=1, reconnect=True)
-async def inactive_help_thread_alert():
-    for forum_channel in [
-        common.bot.get_channel(fid) or (await common.bot.fetch_channel(fid))
-        for fid in common.GuildConstants.HELP_FORUM_CHANNEL_IDS.values()
-    ]:
-        if not isinstance(forum_channel, discord.ForumChannel):
-            return
-
-        now_ts = time.time()
-        for help_thread in itertools.chain(
-            forum_channel.threads,
-            [thr async for thr in forum_channel.archived_threads(limit=20)],
-        ):
-            try:
-                if not help_thread.created_at:
-                    continue
-                last_active_ts = help_thread.created_at.timestamp()
-
-                if not (help_thread.locked or help_thread.flags.pinned) and not any(
-                    tag.name.lower().startswith("solved")
-                    for tag in help_thread.applied_tags
-                ):
-                    last_active_ts = (
-                        await fetch_last_thread_activity_dt(help_thread)
-                    ).timestamp()
-
-                    if (now_ts - last_active_ts) > (3600 * 23 + 1800):  # 23h30m
-                        if (
-                            help_thread.id not in common.inactive_help_thread_data
-                            or common.inactive_help_thread_data[help_thread.id][
-                                "last_active_ts"
-                            ]
-                            < last_active_ts
-                        ):
-                            alert_message = await help_thread.send(
-                                f"help-post-inactive(<@{help_thread.owner_id}>, **{help_thread.name}**)",
-                                embed=discord.Embed(
-                                    title="Your help post has gone inactive... 💤",
-                                    description=f"Your help post was last active **<t:{int(last_active_ts)}:R>** ."
-                                    "\nHas your issue been solved? If so, mark it as **Solved** by "
-                                    "doing one of these:\n\n"
-                                    "  **• React on your starter message with ✅**.\n"
-                                    "  **• Right-click on your post (click and hold on mobile), "
-                                    "go to 'Edit Tags', select the `✅ Solved` tag and save your changes.**\n\n"
-                                    "**Mark all messages you find helpful here with a ✅ reaction please** "
-                                    "<:pg_robot:837389387024957440>\n\n"
-                                    "*If your issue has't been solved, you may "
-                                    "either wait for help or close this post.*",
-                                    color=0x888888,
-                                ),
-                            )
-                            common.inactive_help_thread_data[help_thread.id] = {
-                                "thread_id": help_thread.id,
-                                "last_active_ts": alert_message.created_at.timestamp(),
-                                "alert_message_id": alert_message.id,
-                            }
-                    elif (
-                        help_thread.id in common.inactive_help_thread_data
-                        and (
-                            alert_message_id := common.inactive_help_thread_data[
-                                help_thread.id
-                            ].get("alert_message_id", None)
-                        )
-                    ) and (
-                        (
-                            partial_alert_message := help_thread.get_partial_message(
-                                alert_message_id
-                            )
-                        ).created_at.timestamp()
-                        < last_active_ts  # someone messaged into the channel
-                    ):
-                        try:
-                            last_message = await fetch_last_thread_message(help_thread)
-                            if last_message and not last_message.is_system():
-                                try:
-                                    await partial_alert_message.delete()
-                                except discord.NotFound:
-                                    pass
-                                finally:
-                                    del common.inactive_help_thread_data[
-                                        help_thread.id
-                                    ]["alert_message_id"]
-                        except discord.NotFound:
-                            pass
-
-            except discord.HTTPException:
-                pass
+pending_members_gauge = metrics.gauge(
+    "members.pending", "Number of joined members waited for to complete screening"
+)
+pending_members_expired = metrics.counter(
+    "members.pending_expired",
+    "Number of joined members that did not complete screening in time",
+)
+
+
+@tasks.loop(minutes=5, reconnect=True)
+async def expire_pending_member_joins():
+    """
+    Stop waiting for joined members that did not complete the join screening in
+    time. This is the only task involved in greeting members, no matter how many
+    of them join.
+    """
+    now = time.monotonic()
+    while common.pending_member_joins:
+        member_id, expires_at = next(iter(common.pending_member_joins.items()))
+        if expires_at > now:
+            break
+
+        del common.pending_member_joins[member_id]
+        pending_members_expired.inc()
+
+    pending_members_gauge.set(len(common.pending_member_joins))
 
 
 @tasks.loop(hours=1, reconnect=True)
-async def delete_help_threads_without_starter_message():
-    for forum_channel in [
-        common.bot.get_channel(fid) or (await common.bot.fetch_channel(fid))
-        for fid in common.GuildConstants.HELP_FORUM_CHANNEL_IDS.values()
-    ]:
-        for help_thread in itertools.chain(
-            forum_channel.threads,
-            [thr async for thr in forum_channel.archived_threads(limit=20)],
-        ):
+async def reconcile_help_thread_deadlines():
+    """
+    Inactivity alerts and archive timeouts of help threads are fired by
+    `help_threads.help_thread_scheduler`. This periodically recomputes their
+    deadlines, in case a change to a thread was missed.
+    """
+    start = time.perf_counter()
+    help_threads.reschedule_help_thread_deadlines()
+    help_thread_reconcile_duration.observe(time.perf_counter() - start)
+
+
+async def _check_help_thread_starter_message(state: help_threads.HelpThreadState):
+    help_thread = common.bot.get_channel(state.thread_id)
+    try:
+        if state.starter_message_exists is None:
+            # only checked once per thread, later deletions are tracked
+            if not isinstance(help_thread, discord.Thread):
+                help_thread = await common.bot.fetch_channel(state.thread_id)
             try:
-                starter_message = (
-                    help_thread.starter_message
-                    or await help_thread.fetch_message(help_thread.id)
-                )
+                await help_thread.fetch_message(help_thread.id)  # type: ignore
             except discord.NotFound:
-                pass
+                state.starter_message_exists = False
             else:
-                continue  # starter message still exists, skip
-            common.hold_task(
-                asyncio.create_task(help_thread_deletion_checks(help_thread))
-            )
+                state.starter_message_exists = True
+
+        if state.starter_message_exists:
+            return  # starter message still exists, skip
+
+        if not isinstance(help_thread, discord.Thread):
+            help_thread = await common.bot.fetch_channel(state.thread_id)
+    except discord.NotFound:
+        help_threads.untrack_thread(state.thread_id)
+        return
+    except discord.HTTPException:
+        return
+
+    common.hold_task(
+        asyncio.create_task(help_threads.help_thread_deletion_checks(help_thread))  # type: ignore
+    )
 
 
 @tasks.loop(hours=1, reconnect=True)
-async def force_help_thread_archive_after_timeout():
-    for forum_channel in [
-        common.bot.get_channel(fid) or (await common.bot.fetch_channel(fid))
-        for fid in common.GuildConstants.HELP_FORUM_CHANNEL_IDS.values()
-    ]:
-        now_ts = time.time()
-        for help_thread in forum_channel.threads:
-            try:
-                if not help_thread.created_at:
-                    continue
-
-                if not (
-                    help_thread.archived
-                    or help_thread.locked
-                    or help_thread.flags.pinned
-                ):
-                    last_active_ts = (
-                        await fetch_last_thread_activity_dt(help_thread)
-                    ).timestamp()
-                    if (
-                        now_ts - last_active_ts
-                    ) / 60.0 > help_thread.auto_archive_duration:
-
-                        thread_edits = {}
-                        thread_edits["archived"] = True
-
-                        if (
-                            any(
-                                tag.name.lower().startswith("solved")
-                                for tag in help_thread.applied_tags
-                            )
-                            and help_thread.slowmode_delay
-                            == forum_channel.default_thread_slowmode_delay
-                        ):
-                            # solved and no overridden slowmode
-                            thread_edits["slowmode_delay"] = 60  # seconds
-
-                        if not (
-                            help_thread.name.endswith(
-                                owner_id_suffix := f" | {help_thread.owner_id}"
-                            )
-                            or str(help_thread.owner_id) in help_thread.name
-                        ):  # wait for a few event loop iterations, before doing a second,
-                            # check, to be sure that a bot edit hasn't already occured
-                            thread_edits["archived"] = False
-                            thread_edits["name"] = (
-                                help_thread.name
-                                if len(help_thread.name) < 72
-                                else help_thread.name[:72] + "..."
-                            ) + owner_id_suffix
-
-                        await help_thread.edit(
-                            reason="This help thread has been closed "
-                            "after exceeding its inactivity timeout.",
-                            **thread_edits,
-                        )
-            except discord.HTTPException:
-                pass
+async def delete_help_threads_without_starter_message():
+    start = time.perf_counter()
+    help_threads.sync_cached_help_threads()
+    await help_threads.help_forum_executor.map(
+        [
+            (state.thread_id, _check_help_thread_starter_message, (state,))
+            for state in help_threads.get_help_thread_states()
+        ]
+    )
+    help_thread_starter_check_duration.observe(time.perf_counter() - start)
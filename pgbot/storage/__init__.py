@@ -0,0 +1,12 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This module defines the storage layer of the bot, which caches storage tables
+in front of a pluggable storage backend.
+"""
+
+from .backends import *
+from .tables import *
+from .members import *
@@ -0,0 +1,387 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines the backends that storage tables can be persisted with.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import pickle
+import sqlite3
+import threading
+from typing import Any, Callable, Iterable, Optional, TypeVar
+
+import snakecore
+
+from pgbot import common
+from . import serialization
+
+_T = TypeVar("_T")
+
+
+class StorageBackend:
+    """
+    Base class for storage backends. A storage backend persists named tables,
+    which are arbitrary Python objects. Backends do not lock tables, that is
+    done by `StorageTable`.
+    """
+
+    name: str = ""
+
+    async def init(self):
+        """Prepare the backend for use."""
+
+    async def quit(self):
+        """Release the resources held by the backend."""
+
+    async def load(self, table_name: str, dtype: type = dict) -> Any:
+        """Load the contents of a table.
+
+        Args:
+            table_name (str): The name of the table.
+            dtype (type, optional): The type of the table contents. If the table
+              does not exist, a new instance of this type is returned. Defaults
+              to dict.
+
+        Returns:
+            Any: The table contents.
+        """
+        raise NotImplementedError()
+
+    async def store(self, table_name: str, obj: Any) -> Optional[int]:
+        """Store the contents of a table, creating the table if needed.
+
+        Args:
+            table_name (str): The name of the table.
+            obj (Any): The table contents.
+
+        Returns:
+            Optional[int]: The serialized size of the table in bytes, if known.
+        """
+        raise NotImplementedError()
+
+    async def update(
+        self, table_name: str, changed: dict[Any, Any], deleted: Iterable[Any] = ()
+    ) -> Optional[int]:
+        """Apply changes to the entries of a dictionary table, creating the table
+        if needed. By default, this loads, merges and stores the whole table.
+
+        Args:
+            table_name (str): The name of the table.
+            changed (dict[Any, Any]): The entries to add or replace.
+            deleted (Iterable[Any], optional): The keys of the entries to remove.
+              Defaults to ().
+
+        Returns:
+            Optional[int]: The number of bytes written, if known.
+        """
+        obj = await self.load(table_name, dict)
+        obj.update(changed)
+        for key in deleted:
+            obj.pop(key, None)
+        return await self.store(table_name, obj)
+
+    async def delete(self, table_name: str) -> bool:
+        """Delete a table.
+
+        Args:
+            table_name (str): The name of the table.
+
+        Returns:
+            bool: Whether the table existed.
+        """
+        raise NotImplementedError()
+
+    async def table_names(self) -> list[str]:
+        """Get the names of all tables in this backend."""
+        raise NotImplementedError()
+
+
+class DiscordStorageBackend(StorageBackend):
+    """
+    A storage backend that keeps tables in a Discord channel, using
+    `snakecore.storage.DiscordStorage`. Its lifetime is managed by
+    `snakecore.storage.init_discord_storage` and
+    `snakecore.storage.quit_discord_storage`.
+
+    snakecore stores every table as a whole, so `update` still rewrites the
+    whole table, even when only a few of its entries changed.
+    """
+
+    name = "discord"
+
+    async def load(self, table_name: str, dtype: type = dict) -> Any:
+        if table_name not in snakecore.storage.DiscordStorage._storage_records:
+            return dtype()
+
+        async with snakecore.storage.DiscordStorage(table_name, dtype) as storage_obj:
+            return storage_obj.obj
+
+    async def store(self, table_name: str, obj: Any) -> Optional[int]:
+        async with snakecore.storage.DiscordStorage(
+            table_name, type(obj)
+        ) as storage_obj:
+            storage_obj.obj = obj
+
+        return None  # snakecore does not expose the size of its payloads
+
+    async def delete(self, table_name: str) -> bool:
+        if table_name not in snakecore.storage.DiscordStorage._storage_records:
+            return False
+
+        async with snakecore.storage.DiscordStorage(table_name) as storage_obj:
+            try:
+                del storage_obj.obj
+            except AttributeError:
+                return False
+        return True
+
+    async def table_names(self) -> list[str]:
+        return list(snakecore.storage.DiscordStorage._storage_records.keys())
+
+
+def encode_table(obj: Any) -> bytes:
+    """Encode the contents of a table with the compact binary encoding of
+    `pgbot.storage.serialization`, or with pickle for objects which that
+    encoding does not support.
+    """
+    try:
+        return serialization.dumps(obj)
+    except serialization.SerializationError:
+        return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode_table(data: bytes) -> Any:
+    """Decode the contents of a table encoded by `encode_table`. Older tables
+    stored with pickle are still supported.
+    """
+    if serialization.is_serialized(data):
+        return serialization.loads(data)
+    return pickle.loads(data)
+
+
+class SQLiteStorageBackend(StorageBackend):
+    """
+    A storage backend that keeps tables in a local SQLite database in WAL mode.
+    Dictionary tables are stored with one row per entry, so that `update` only
+    writes the changed entries, while other tables are stored as one row. Keys
+    and values are encoded with `encode_table`. Database calls are run in a
+    worker thread, so that they do not block the event loop.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        # sqlite connections may only be used by one thread at a time
+        self._connection_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        # tables that are not dictionaries, and dictionary tables stored before
+        # entries had their own rows
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS storage_tables "
+            "(name TEXT PRIMARY KEY, data BLOB NOT NULL)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS storage_entries "
+            "(table_name TEXT NOT NULL, key BLOB NOT NULL, data BLOB NOT NULL, "
+            "PRIMARY KEY (table_name, key))"
+        )
+        connection.commit()
+        return connection
+
+    def _transaction(self, func: Callable[[sqlite3.Connection], _T]) -> _T:
+        with self._connection_lock:
+            if self._connection is None:
+                self._connection = self._connect()
+
+            with self._connection:  # commits, or rolls back on error
+                return func(self._connection)
+
+    @staticmethod
+    def _load(connection: sqlite3.Connection, table_name: str) -> Optional[Any]:
+        row = connection.execute(
+            "SELECT data FROM storage_tables WHERE name = ?", (table_name,)
+        ).fetchone()
+        if row is not None:
+            return decode_table(row[0])
+
+        rows = connection.execute(
+            "SELECT key, data FROM storage_entries WHERE table_name = ?",
+            (table_name,),
+        ).fetchall()
+        if not rows:
+            return None
+        return {decode_table(key): decode_table(data) for key, data in rows}
+
+    @staticmethod
+    def _delete(connection: sqlite3.Connection, table_name: str) -> int:
+        return (
+            connection.execute(
+                "DELETE FROM storage_tables WHERE name = ?", (table_name,)
+            ).rowcount
+            + connection.execute(
+                "DELETE FROM storage_entries WHERE table_name = ?", (table_name,)
+            ).rowcount
+        )
+
+    @staticmethod
+    def _write_entries(
+        connection: sqlite3.Connection, table_name: str, entries: dict[Any, Any]
+    ) -> int:
+        rows = [
+            (table_name, encode_table(key), encode_table(value))
+            for key, value in entries.items()
+        ]
+        connection.executemany(
+            "INSERT INTO storage_entries (table_name, key, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(table_name, key) DO UPDATE SET data = excluded.data",
+            rows,
+        )
+        return sum(len(key) + len(data) for _, key, data in rows)
+
+    def _store(self, connection: sqlite3.Connection, table_name: str, obj: Any) -> int:
+        self._delete(connection, table_name)
+        if isinstance(obj, dict):
+            return self._write_entries(connection, table_name, obj)
+
+        data = encode_table(obj)
+        connection.execute(
+            "INSERT INTO storage_tables (name, data) VALUES (?, ?)", (table_name, data)
+        )
+        return len(data)
+
+    def _update(
+        self,
+        connection: sqlite3.Connection,
+        table_name: str,
+        changed: dict[Any, Any],
+        deleted: tuple[Any, ...],
+    ) -> int:
+        row = connection.execute(
+            "SELECT data FROM storage_tables WHERE name = ?", (table_name,)
+        ).fetchone()
+        if row is not None:
+            # stored as one row, so give every entry its own row once
+            obj = decode_table(row[0])
+            obj.update(changed)
+            for key in deleted:
+                obj.pop(key, None)
+            return self._store(connection, table_name, obj)
+
+        connection.executemany(
+            "DELETE FROM storage_entries WHERE table_name = ? AND key = ?",
+            [(table_name, encode_table(key)) for key in deleted],
+        )
+        return self._write_entries(connection, table_name, changed)
+
+    async def init(self):
+        await asyncio.to_thread(self._transaction, lambda connection: None)
+
+    async def quit(self):
+        def close():
+            with self._connection_lock:
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+
+        await asyncio.to_thread(close)
+
+    async def load(self, table_name: str, dtype: type = dict) -> Any:
+        obj = await asyncio.to_thread(
+            self._transaction, lambda connection: self._load(connection, table_name)
+        )
+        return dtype() if obj is None else obj
+
+    async def store(self, table_name: str, obj: Any) -> Optional[int]:
+        return await asyncio.to_thread(
+            self._transaction,
+            lambda connection: self._store(connection, table_name, obj),
+        )
+
+    async def update(
+        self, table_name: str, changed: dict[Any, Any], deleted: Iterable[Any] = ()
+    ) -> Optional[int]:
+        deleted = tuple(deleted)
+        return await asyncio.to_thread(
+            self._transaction,
+            lambda connection: self._update(connection, table_name, changed, deleted),
+        )
+
+    async def delete(self, table_name: str) -> bool:
+        return (
+            await asyncio.to_thread(
+                self._transaction,
+                lambda connection: self._delete(connection, table_name),
+            )
+            > 0
+        )
+
+    async def table_names(self) -> list[str]:
+        rows = await asyncio.to_thread(
+            self._transaction,
+            lambda connection: connection.execute(
+                "SELECT name FROM storage_tables UNION "
+                "SELECT DISTINCT table_name FROM storage_entries ORDER BY name"
+            ).fetchall(),
+        )
+        return [row[0] for row in rows]
+
+
+STORAGE_BACKEND_TYPES: dict[str, type[StorageBackend]] = {
+    DiscordStorageBackend.name: DiscordStorageBackend,
+    SQLiteStorageBackend.name: SQLiteStorageBackend,
+}
+
+_storage_backend: Optional[StorageBackend] = None
+
+
+def create_storage_backend(name: str) -> StorageBackend:
+    """Create a new storage backend of the given type, configured from
+    `pgbot.common`.
+
+    Args:
+        name (str): The backend type, one of `STORAGE_BACKEND_TYPES`.
+
+    Returns:
+        StorageBackend: The backend.
+    """
+    if name not in STORAGE_BACKEND_TYPES:
+        raise ValueError(
+            f"invalid storage backend '{name}', must be one of "
+            + ", ".join(f"'{type_name}'" for type_name in STORAGE_BACKEND_TYPES)
+        )
+
+    if name == SQLiteStorageBackend.name:
+        return SQLiteStorageBackend(common.SQLITE_STORAGE_PATH)
+
+    return STORAGE_BACKEND_TYPES[name]()
+
+
+def get_storage_backend() -> StorageBackend:
+    """Get the storage backend used by the bot, which is selected with the
+    `PGBOT_STORAGE_BACKEND` environment variable.
+    """
+    global _storage_backend
+    if _storage_backend is None:
+        _storage_backend = create_storage_backend(common.STORAGE_BACKEND)
+
+    return _storage_backend
+
+
+async def init_storage_backend():
+    """Initialize the storage backend used by the bot."""
+    await get_storage_backend().init()
+
+
+async def quit_storage_backend():
+    """Shut down the storage backend used by the bot."""
+    await get_storage_backend().quit()
@@ -0,0 +1,129 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines a reverse index from member ids to the storage tables that
+reference them, which is kept up to date as the tables are written to.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Collection, Iterable
+
+from .tables import StorageTable, add_table_write_listener, read_table
+
+# tables that reference members, with the types of their contents. Lists hold
+# member ids, and dictionaries are keyed by member ids.
+MEMBER_TABLES: dict[str, type] = {
+    "stream": list,
+    "reminders": dict,
+    "clock": dict,
+}
+
+_table_members: dict[str, set[int]] = {}  # only holds tables that are indexed
+_member_tables: dict[int, set[str]] = {}
+
+
+def _index_table(table_name: str, obj: Any):
+    old_member_ids = _table_members.pop(table_name, set())
+    if obj is None:  # contents unknown, reindex on the next lookup
+        new_member_ids = set()
+    else:
+        new_member_ids = set(obj)  # list items or dictionary keys
+        _table_members[table_name] = new_member_ids
+
+    for member_id in old_member_ids - new_member_ids:
+        member_tables = _member_tables[member_id]
+        member_tables.discard(table_name)
+        if not member_tables:
+            del _member_tables[member_id]
+
+    for member_id in new_member_ids - old_member_ids:
+        _member_tables.setdefault(member_id, set()).add(table_name)
+
+
+for _table_name in MEMBER_TABLES:
+    add_table_write_listener(
+        _table_name, lambda obj, table_name=_table_name: _index_table(table_name, obj)
+    )
+
+
+def reindex_member_table(table_name: str):
+    """Index a storage table again from its contents the next time members are
+    looked up. Tables that do not reference members are ignored.
+    """
+    if table_name in MEMBER_TABLES:
+        _index_table(table_name, None)
+
+
+async def _ensure_indexed():
+    for table_name, dtype in MEMBER_TABLES.items():
+        if table_name not in _table_members:
+            _index_table(table_name, await read_table(table_name, dtype))
+
+
+async def get_member_tables(member_id: int) -> set[str]:
+    """Get the names of all storage tables that reference a member.
+
+    Args:
+        member_id (int): The id of the member.
+
+    Returns:
+        set[str]: The table names.
+    """
+    await _ensure_indexed()
+    return set(_member_tables.get(member_id, ()))
+
+
+async def get_stored_member_ids() -> set[int]:
+    """Get the ids of all members that are referenced in storage tables."""
+    await _ensure_indexed()
+    return set(_member_tables)
+
+
+async def purge_members(member_ids: Iterable[int]) -> dict[str, dict[int, Any]]:
+    """Remove all references to the given members from storage tables. Every
+    affected table is written only once, no matter how many members are purged.
+
+    Args:
+        member_ids (Iterable[int]): The ids of the members.
+
+    Returns:
+        dict[str, dict[int, Any]]: A mapping of the names of affected tables to
+        the removed data of each member. For list tables, the removed data is
+        the member id.
+    """
+    await _ensure_indexed()
+
+    purged_ids_by_table: dict[str, list[int]] = {}
+    for member_id in member_ids:
+        for table_name in _member_tables.get(member_id, ()):
+            purged_ids_by_table.setdefault(table_name, []).append(member_id)
+
+    removed: dict[str, dict[int, Any]] = {}
+    for table_name, purged_ids in purged_ids_by_table.items():
+        removed[table_name] = await _purge_from_table(table_name, purged_ids)
+
+    return removed
+
+
+async def _purge_from_table(
+    table_name: str, member_ids: Collection[int]
+) -> dict[int, Any]:
+    removed = {}
+    async with StorageTable(table_name, MEMBER_TABLES[table_name]) as storage_obj:
+        data = storage_obj.obj
+        if isinstance(data, dict):
+            for member_id in member_ids:
+                if member_id in data:
+                    removed[member_id] = data.pop(member_id)
+        else:
+            member_id_set = set(member_ids)
+            removed = {member_id: member_id for member_id in member_id_set & set(data)}
+            data = [member_id for member_id in data if member_id not in member_id_set]
+
+        if removed:
+            storage_obj.obj = data
+
+    return removed
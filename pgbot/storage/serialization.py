@@ -0,0 +1,493 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines a compact, versioned binary encoding for storage tables.
+
+Payloads start with a 4 byte header (`PGB` followed by the format version),
+followed by a single value in the MessagePack format. The Python types that
+MessagePack cannot represent are encoded with these extension types:
+
+- 1: `datetime.datetime`, as a big-endian int64 of microseconds since the UNIX
+  epoch (wall time for naive datetimes) and an int32 UTC offset in seconds, or
+  `NAIVE_DATETIME_OFFSET` for naive datetimes
+- 2: `tuple`, 3: `set`, 4: `frozenset`, as an embedded array
+- 5: integers outside of the int64/uint64 range, as big-endian two's complement
+"""
+
+from __future__ import annotations
+
+import datetime
+import io
+import struct
+from typing import Any, BinaryIO, Callable, Iterator, Union
+
+MAGIC = b"PGB"
+FORMAT_VERSION = 1
+HEADER = MAGIC + bytes((FORMAT_VERSION,))
+
+EXT_DATETIME = 1
+EXT_TUPLE = 2
+EXT_SET = 3
+EXT_FROZENSET = 4
+EXT_BIGINT = 5
+
+NAIVE_DATETIME_OFFSET = -(2**31)
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_NAIVE_EPOCH = datetime.datetime(1970, 1, 1)
+
+_pack_b = struct.Struct(">b").pack
+_pack_h = struct.Struct(">h").pack
+_pack_H = struct.Struct(">H").pack
+_pack_i = struct.Struct(">i").pack
+_pack_I = struct.Struct(">I").pack
+_pack_q = struct.Struct(">q").pack
+_pack_Q = struct.Struct(">Q").pack
+_pack_d = struct.Struct(">d").pack
+_datetime_struct = struct.Struct(">qi")
+
+
+class SerializationError(ValueError):
+    """
+    Raised when a value cannot be encoded or a payload cannot be decoded.
+    """
+
+
+def is_serialized(data: bytes) -> bool:
+    """Check whether the given bytes start with the header of this encoding,
+    of any version.
+    """
+    return data[: len(MAGIC)] == MAGIC
+
+
+# Encoding
+
+
+def _encode_length(out: bytearray, length: int, fix_base: int, fix_max: int, codes):
+    if length <= fix_max:
+        out.append(fix_base | length)
+    elif codes[0] is not None and length <= 0xFF:
+        out.append(codes[0])
+        out.append(length)
+    elif length <= 0xFFFF:
+        out.append(codes[1])
+        out += _pack_H(length)
+    elif length <= 0xFFFFFFFF:
+        out.append(codes[2])
+        out += _pack_I(length)
+    else:
+        raise SerializationError("value is too large to be serialized")
+
+
+def _encode_int(out: bytearray, value: int):
+    if 0 <= value:
+        if value <= 0x7F:
+            out.append(value)
+        elif value <= 0xFF:
+            out.append(0xCC)
+            out.append(value)
+        elif value <= 0xFFFF:
+            out.append(0xCD)
+            out += _pack_H(value)
+        elif value <= 0xFFFFFFFF:
+            out.append(0xCE)
+            out += _pack_I(value)
+        elif value <= 0xFFFFFFFFFFFFFFFF:
+            out.append(0xCF)
+            out += _pack_Q(value)
+        else:
+            _encode_bigint(out, value)
+    elif value >= -32:
+        out.append(value & 0xFF)
+    elif value >= -0x80:
+        out.append(0xD0)
+        out += _pack_b(value)
+    elif value >= -0x8000:
+        out.append(0xD1)
+        out += _pack_h(value)
+    elif value >= -0x80000000:
+        out.append(0xD2)
+        out += _pack_i(value)
+    elif value >= -0x8000000000000000:
+        out.append(0xD3)
+        out += _pack_q(value)
+    else:
+        _encode_bigint(out, value)
+
+
+def _encode_bigint(out: bytearray, value: int):
+    _encode_ext(
+        out,
+        EXT_BIGINT,
+        value.to_bytes(value.bit_length() // 8 + 1, "big", signed=True),
+    )
+
+
+def _encode_ext(out: bytearray, ext_type: int, payload: bytes):
+    length = len(payload)
+    fixext_codes = {1: 0xD4, 2: 0xD5, 4: 0xD6, 8: 0xD7, 16: 0xD8}
+    if length in fixext_codes:
+        out.append(fixext_codes[length])
+    elif length <= 0xFF:
+        out.append(0xC7)
+        out.append(length)
+    elif length <= 0xFFFF:
+        out.append(0xC8)
+        out += _pack_H(length)
+    elif length <= 0xFFFFFFFF:
+        out.append(0xC9)
+        out += _pack_I(length)
+    else:
+        raise SerializationError("value is too large to be serialized")
+
+    out.append(ext_type)
+    out += payload
+
+
+def _encode_str(out: bytearray, value: str):
+    data = value.encode("utf-8")
+    _encode_length(out, len(data), 0xA0, 31, (0xD9, 0xDA, 0xDB))
+    out += data
+
+
+def _encode_bytes(out: bytearray, value: Union[bytes, bytearray]):
+    _encode_length(out, len(value), 0, -1, (0xC4, 0xC5, 0xC6))
+    out += value
+
+
+def _encode_float(out: bytearray, value: float):
+    out.append(0xCB)
+    out += _pack_d(value)
+
+
+def _encode_array(out: bytearray, value: Union[list, tuple, set, frozenset]):
+    _encode_length(out, len(value), 0x90, 15, (None, 0xDC, 0xDD))
+    for item in value:
+        _encode_value(out, item)
+
+
+def _encode_dict(out: bytearray, value: dict):
+    _encode_length(out, len(value), 0x80, 15, (None, 0xDE, 0xDF))
+    for key, item in value.items():
+        _encode_value(out, key)
+        _encode_value(out, item)
+
+
+def _encode_datetime(out: bytearray, value: datetime.datetime):
+    offset = value.utcoffset()
+    if offset is None:
+        delta = value - _NAIVE_EPOCH
+        offset_seconds = NAIVE_DATETIME_OFFSET
+    else:
+        delta = value - _EPOCH
+        offset_seconds = int(offset.total_seconds())
+
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    _encode_ext(out, EXT_DATETIME, _datetime_struct.pack(micros, offset_seconds))
+
+
+def _container_ext_encoder(ext_type: int) -> Callable[[bytearray, Any], None]:
+    def encode(out: bytearray, value: Any):
+        payload = bytearray()
+        _encode_array(payload, value)
+        _encode_ext(out, ext_type, payload)
+
+    return encode
+
+
+def _encode_none(out: bytearray, value: None):
+    out.append(0xC0)
+
+
+def _encode_bool(out: bytearray, value: bool):
+    out.append(0xC3 if value else 0xC2)
+
+
+_encoders: dict[type, Callable[[bytearray, Any], None]] = {
+    type(None): _encode_none,
+    bool: _encode_bool,
+    int: _encode_int,
+    float: _encode_float,
+    str: _encode_str,
+    bytes: _encode_bytes,
+    bytearray: _encode_bytes,
+    list: _encode_array,
+    dict: _encode_dict,
+    datetime.datetime: _encode_datetime,
+    tuple: _container_ext_encoder(EXT_TUPLE),
+    set: _container_ext_encoder(EXT_SET),
+    frozenset: _container_ext_encoder(EXT_FROZENSET),
+}
+
+
+def _encode_value(out: bytearray, value: Any):
+    encoder = _encoders.get(type(value))
+    if encoder is None:
+        raise SerializationError(
+            f"objects of type '{type(value).__name__}' cannot be serialized"
+        )
+    encoder(out, value)
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode an object, including the header.
+
+    Args:
+        obj (Any): The object. It may only consist of None, bools, ints, floats,
+          strings, bytes, datetimes, lists, tuples, sets, frozensets and dicts.
+          Subclasses of these types are not supported.
+
+    Raises:
+        SerializationError: The object cannot be encoded.
+
+    Returns:
+        bytes: The payload.
+    """
+    out = bytearray(HEADER)
+    _encode_value(out, obj)
+    return bytes(out)
+
+
+# Decoding
+
+
+_unpack_b = struct.Struct(">b").unpack_from
+_unpack_h = struct.Struct(">h").unpack_from
+_unpack_H = struct.Struct(">H").unpack_from
+_unpack_i = struct.Struct(">i").unpack_from
+_unpack_I = struct.Struct(">I").unpack_from
+_unpack_q = struct.Struct(">q").unpack_from
+_unpack_Q = struct.Struct(">Q").unpack_from
+_unpack_f = struct.Struct(">f").unpack_from
+_unpack_d = struct.Struct(">d").unpack_from
+_unpack_datetime = _datetime_struct.unpack_from
+
+
+class StreamDecoder:
+    """A decoder which reads values from a binary stream in chunks, to decode
+    payloads without having to hold all of their bytes in memory.
+    """
+
+    def __init__(self, stream: BinaryIO, chunk_size: int = 65536):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self._buf = b""
+        self._pos = 0
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> StreamDecoder:
+        """Create a decoder that reads from the given bytes without copying them."""
+        decoder = cls(io.BytesIO())
+        decoder._buf = data
+        return decoder
+
+    def _advance(self, size: int) -> int:
+        # make 'size' bytes available in the buffer, and return their offset
+        pos = self._pos
+        end = pos + size
+        if end > len(self._buf):
+            chunks = [self._buf[pos:]]
+            available = len(chunks[0])
+            while available < size:
+                chunk = self.stream.read(max(size - available, self.chunk_size))
+                if not chunk:
+                    raise SerializationError("unexpected end of payload")
+                chunks.append(chunk)
+                available += len(chunk)
+
+            self._buf = b"".join(chunks)
+            pos = 0
+            end = size
+
+        self._pos = end
+        return pos
+
+    def _read_byte(self) -> int:
+        pos = self._advance(1)
+        return self._buf[pos]
+
+    def _unpack(self, unpack_from: Callable[[bytes, int], tuple], size: int) -> Any:
+        pos = self._advance(size)
+        return unpack_from(self._buf, pos)[0]
+
+    def _read(self, size: int) -> bytes:
+        pos = self._advance(size)
+        return self._buf[pos : pos + size]
+
+    def read_header(self):
+        """Read and validate the payload header."""
+        header = self._read(len(HEADER))
+        if header[: len(MAGIC)] != MAGIC:
+            raise SerializationError("payload does not start with a valid header")
+        if header[len(MAGIC)] > FORMAT_VERSION:
+            raise SerializationError(
+                f"unsupported payload format version {header[len(MAGIC)]}"
+            )
+
+    def read_container_header(self) -> tuple[str, int]:
+        """Read the header of the next value, which must be a map or an array.
+
+        Returns:
+            tuple[str, int]: "map" or "array", and the number of items.
+        """
+        code = self._read_byte()
+        if 0x80 <= code <= 0x8F:
+            return "map", code & 0x0F
+        elif 0x90 <= code <= 0x9F:
+            return "array", code & 0x0F
+        elif code == 0xDE:
+            return "map", self._unpack(_unpack_H, 2)
+        elif code == 0xDF:
+            return "map", self._unpack(_unpack_I, 4)
+        elif code == 0xDC:
+            return "array", self._unpack(_unpack_H, 2)
+        elif code == 0xDD:
+            return "array", self._unpack(_unpack_I, 4)
+
+        raise SerializationError(f"expected a map or an array, got code {code:#x}")
+
+    def read_value(self) -> Any:
+        """Read the next value."""
+        code = self._read_byte()
+
+        # the most common types come first
+        if code <= 0x7F:
+            return code
+        elif 0xA0 <= code <= 0xBF:
+            return self._read(code & 0x1F).decode("utf-8")
+        elif code == 0xCF:
+            return self._unpack(_unpack_Q, 8)
+        elif 0xD4 <= code <= 0xD8:
+            return self._read_ext(1 << (code - 0xD4))
+        elif code == 0xC7:
+            return self._read_ext(self._read_byte())
+        elif 0x80 <= code <= 0x8F:
+            return self._read_map(code & 0x0F)
+        elif 0x90 <= code <= 0x9F:
+            return [self.read_value() for _ in range(code & 0x0F)]
+        elif code >= 0xE0:
+            return code - 0x100
+        elif code == 0xC0:
+            return None
+        elif code == 0xC2:
+            return False
+        elif code == 0xC3:
+            return True
+        elif code == 0xCC:
+            return self._read_byte()
+        elif code == 0xCD:
+            return self._unpack(_unpack_H, 2)
+        elif code == 0xCE:
+            return self._unpack(_unpack_I, 4)
+        elif code == 0xD0:
+            return self._unpack(_unpack_b, 1)
+        elif code == 0xD1:
+            return self._unpack(_unpack_h, 2)
+        elif code == 0xD2:
+            return self._unpack(_unpack_i, 4)
+        elif code == 0xD3:
+            return self._unpack(_unpack_q, 8)
+        elif code == 0xCA:
+            return self._unpack(_unpack_f, 4)
+        elif code == 0xCB:
+            return self._unpack(_unpack_d, 8)
+        elif code == 0xD9:
+            return self._read(self._read_byte()).decode("utf-8")
+        elif code == 0xDA:
+            return self._read(self._unpack(_unpack_H, 2)).decode("utf-8")
+        elif code == 0xDB:
+            return self._read(self._unpack(_unpack_I, 4)).decode("utf-8")
+        elif code == 0xC4:
+            return self._read(self._read_byte())
+        elif code == 0xC5:
+            return self._read(self._unpack(_unpack_H, 2))
+        elif code == 0xC6:
+            return self._read(self._unpack(_unpack_I, 4))
+        elif code == 0xDC:
+            length = self._unpack(_unpack_H, 2)
+            return [self.read_value() for _ in range(length)]
+        elif code == 0xDD:
+            length = self._unpack(_unpack_I, 4)
+            return [self.read_value() for _ in range(length)]
+        elif code == 0xDE:
+            return self._read_map(self._unpack(_unpack_H, 2))
+        elif code == 0xDF:
+            return self._read_map(self._unpack(_unpack_I, 4))
+        elif code == 0xC8:
+            return self._read_ext(self._unpack(_unpack_H, 2))
+        elif code == 0xC9:
+            return self._read_ext(self._unpack(_unpack_I, 4))
+
+        raise SerializationError(f"invalid type code {code:#x}")
+
+    def _read_map(self, length: int) -> dict:
+        read_value = self.read_value
+        result = {}
+        for _ in range(length):
+            key = read_value()
+            result[key] = read_value()
+        return result
+
+    def _read_ext(self, length: int) -> Any:
+        ext_type = self._read_byte()
+
+        if ext_type == EXT_DATETIME:
+            pos = self._advance(length)
+            micros, offset_seconds = _unpack_datetime(self._buf, pos)
+            delta = datetime.timedelta(microseconds=micros)
+            if offset_seconds == NAIVE_DATETIME_OFFSET:
+                return _NAIVE_EPOCH + delta
+            elif not offset_seconds:
+                return _EPOCH + delta
+
+            return (_EPOCH + delta).astimezone(
+                datetime.timezone(datetime.timedelta(seconds=offset_seconds))
+            )
+        # containers embed an array, which can be read in place
+        elif ext_type == EXT_TUPLE:
+            return tuple(self.read_value())
+        elif ext_type == EXT_SET:
+            return set(self.read_value())
+        elif ext_type == EXT_FROZENSET:
+            return frozenset(self.read_value())
+        elif ext_type == EXT_BIGINT:
+            return int.from_bytes(self._read(length), "big", signed=True)
+
+        raise SerializationError(f"invalid extension type {ext_type}")
+
+    def iter_items(self) -> Iterator[Any]:
+        """Decode the next value item by item, which must be a map or an array.
+        For maps, this yields key-value tuples.
+        """
+        kind, length = self.read_container_header()
+        for _ in range(length):
+            if kind == "map":
+                key = self.read_value()
+                yield key, self.read_value()
+            else:
+                yield self.read_value()
+
+
+def loads(data: bytes) -> Any:
+    """Decode a payload created by `dumps()`.
+
+    Raises:
+        SerializationError: The payload is invalid.
+    """
+    decoder = StreamDecoder.from_bytes(data)
+    decoder.read_header()
+    return decoder.read_value()
+
+
+def iter_table_items(stream: BinaryIO) -> Iterator[Any]:
+    """Decode a payload of a dictionary or list table one item at a time, from a
+    binary stream. For dictionaries, this yields key-value tuples.
+
+    Raises:
+        SerializationError: The payload is invalid.
+    """
+    decoder = StreamDecoder(stream)
+    decoder.read_header()
+    yield from decoder.iter_items()
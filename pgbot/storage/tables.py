@@ -0,0 +1,389 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines a write-through, in-process cache for storage tables.
+Reads are served from memory once a table has been loaded, while changes are
+written to both the cache and the storage backend.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import copy
+import time
+from typing import Any, Callable, Generic, Iterable, Optional, TypeVar
+
+from pgbot import metrics
+from .backends import encode_table, get_storage_backend
+
+_T = TypeVar("_T")
+
+
+class _TableCacheEntry:
+    """
+    The cached state of a single storage table.
+    """
+
+    __slots__ = (
+        "obj",
+        "loaded",
+        "version",
+        "hits",
+        "misses",
+        "writes",
+        "stores",
+        "size",
+        "lock_wait",
+        "lock_hold",
+    )
+
+    def __init__(self, name: str):
+        self.obj: Any = None
+        self.loaded: bool = False
+        self.version: int = 0  # incremented on every change to the table
+        self.hits: int = 0
+        self.misses: int = 0  # every miss loads the table from the backend
+        self.writes: int = 0
+        self.stores: int = 0  # writes that reached the backend
+        self.size: Optional[int] = None  # serialized size of the last store
+        self.lock_wait = metrics.histogram(
+            f"storage.{name}.lock_wait",
+            f"Time spent waiting for the lock of the table '{name}', in seconds",
+        )
+        self.lock_hold = metrics.histogram(
+            f"storage.{name}.lock_hold",
+            f"Time the lock of the table '{name}' was held, in seconds",
+        )
+
+
+_table_cache: dict[str, _TableCacheEntry] = {}
+_table_locks: dict[str, asyncio.Lock] = {}
+_table_write_listeners: dict[str, list[Callable[[Any], Any]]] = {}
+
+
+def _get_cache_entry(name: str) -> _TableCacheEntry:
+    entry = _table_cache.get(name)
+    if entry is None:
+        entry = _table_cache[name] = _TableCacheEntry(name)
+    return entry
+
+
+def add_table_write_listener(name: str, callback: Callable[[Any], Any]):
+    """Register a callback to be called whenever a storage table changes. It is
+    called with the new table contents, or with None when the contents are not
+    known anymore, e.g. after the table was invalidated or deleted.
+
+    Args:
+        name (str): The name of the table.
+        callback (Callable[[Any], Any]): The callback. It must not modify the
+          contents.
+    """
+    _table_write_listeners.setdefault(name, []).append(callback)
+
+
+def _notify_table_write(name: str, obj: Any):
+    for callback in _table_write_listeners.get(name, ()):
+        callback(obj)
+
+
+def _get_table_lock(name: str) -> asyncio.Lock:
+    lock = _table_locks.get(name)
+    if lock is None:
+        lock = _table_locks[name] = asyncio.Lock()
+    return lock
+
+
+async def _acquire_table_lock(name: str) -> float:
+    # acquire the lock of a table, and return the time at which it was acquired
+    lock = _get_table_lock(name)
+    start = time.perf_counter()
+    await lock.acquire()
+    acquired_at = time.perf_counter()
+    _get_cache_entry(name).lock_wait.observe(acquired_at - start)
+    return acquired_at
+
+
+def _release_table_lock(name: str, acquired_at: float):
+    _get_cache_entry(name).lock_hold.observe(time.perf_counter() - acquired_at)
+    _get_table_lock(name).release()
+
+
+@contextlib.asynccontextmanager
+async def _locked_table(name: str):
+    acquired_at = await _acquire_table_lock(name)
+    try:
+        yield
+    finally:
+        _release_table_lock(name, acquired_at)
+
+
+def _record_store(name: str, size: Optional[int] = None):
+    entry = _get_cache_entry(name)
+    entry.stores += 1
+    if size is not None:
+        entry.size = size
+
+
+async def read_table(name: str, dtype: type = dict) -> Any:
+    """Get the contents of a storage table. After the first read, the contents
+    are served from memory without touching the storage backend.
+
+    The returned object is shared with the cache and must not be modified. Use
+    `StorageTable` to make changes to a table.
+
+    Args:
+        name (str): The name of the table.
+        dtype (type, optional): The type of the table contents, used for missing
+          tables. Defaults to dict.
+
+    Returns:
+        Any: The table contents.
+    """
+    entry = _get_cache_entry(name)
+    if entry.loaded:
+        entry.hits += 1
+        return entry.obj
+
+    async with _locked_table(name):
+        if entry.loaded:  # loaded while waiting for the lock
+            entry.hits += 1
+            return entry.obj
+
+        entry.misses += 1
+        version = entry.version
+        obj = await get_storage_backend().load(name, dtype)
+
+        if entry.version == version:  # don't cache over a concurrent invalidation
+            entry.obj = obj
+            entry.loaded = True
+
+    return obj
+
+
+async def update_table(
+    name: str, changed: dict[Any, Any], deleted: Iterable[Any] = ()
+) -> Optional[int]:
+    """Apply changes to the entries of a dictionary table. Storage backends that
+    support it only write the changed and deleted entries, see
+    `StorageBackend.update`.
+
+    Args:
+        name (str): The name of the table.
+        changed (dict[Any, Any]): The entries to add or replace. These must not
+          be modified afterwards.
+        deleted (Iterable[Any], optional): The keys of the entries to remove.
+          Defaults to ().
+
+    Returns:
+        Optional[int]: The number of bytes written by the backend, if known.
+    """
+    deleted = tuple(deleted)
+    async with _locked_table(name):
+        try:
+            written = await get_storage_backend().update(name, changed, deleted)
+        except BaseException:
+            # the backend might have applied some of the changes
+            invalidate_table(name)
+            raise
+        _record_store(name)  # the size of the whole table is not known
+
+        entry = _get_cache_entry(name)
+        if entry.loaded:
+            # replace instead of mutating, as readers may still hold the old object
+            obj = {**entry.obj, **changed}
+            for key in deleted:
+                obj.pop(key, None)
+            entry.obj = obj
+        entry.version += 1
+        entry.writes += 1
+        _notify_table_write(name, entry.obj if entry.loaded else None)
+
+    return written
+
+
+def invalidate_table(name: Optional[str] = None):
+    """Drop the cached contents of a storage table, forcing the next read to go
+    to the storage backend. This must be called after a table was modified
+    without going through `StorageTable`.
+
+    Args:
+        name (Optional[str], optional): The name of the table. If omitted, all
+          tables are invalidated. Defaults to None.
+    """
+    for table_name in tuple(_table_cache) if name is None else (name,):
+        entry = _get_cache_entry(table_name)
+        entry.obj = None
+        entry.loaded = False
+        entry.version += 1
+        _notify_table_write(table_name, None)
+
+
+def get_table_version(name: str) -> int:
+    """Get the version counter of a storage table, which is incremented on every
+    change or invalidation of the table.
+
+    Args:
+        name (str): The name of the table.
+
+    Returns:
+        int: The version.
+    """
+    return _get_cache_entry(name).version
+
+
+def get_table_stats() -> dict[str, dict[str, Any]]:
+    """Get the cache and access statistics of all storage tables that were
+    accessed so far.
+
+    Returns:
+        dict[str, dict[str, Any]]: A mapping of table names to their number of
+        cache hits, misses (which are loads from the backend), writes and stores
+        to the backend, their current version, their serialized size in bytes as
+        of the last store (or None, if the backend does not report it), and
+        snapshots of their lock wait and lock
+        hold time histograms.
+    """
+    return {
+        name: {
+            "hits": entry.hits,
+            "misses": entry.misses,
+            "writes": entry.writes,
+            "stores": entry.stores,
+            "version": entry.version,
+            "size": entry.size,
+            "lock_wait": entry.lock_wait.snapshot(),
+            "lock_hold": entry.lock_hold.snapshot(),
+        }
+        for name, entry in _table_cache.items()
+    }
+
+
+async def estimate_table_size(name: str) -> Optional[int]:
+    """Estimate the serialized size of a cached storage table, by encoding its
+    contents with `encode_table`. This encodes the whole table, so it should only
+    be used for diagnostics.
+
+    Args:
+        name (str): The name of the table.
+
+    Returns:
+        Optional[int]: The size in bytes, or None if the table is not cached.
+    """
+    entry = _table_cache.get(name)
+    if entry is None or not entry.loaded:
+        return None
+
+    # cached contents are replaced on every change, never mutated
+    return len(await asyncio.to_thread(encode_table, entry.obj))
+
+
+class StorageTable(Generic[_T]):
+    """An async context manager for making changes to a storage table, to be used
+    like `snakecore.storage.DiscordStorage`. The table stays locked while the
+    context manager is open. Its contents are read from the cache where possible,
+    and values assigned to `obj` are written to the cache immediately, and to the
+    storage backend when the context manager exits. If that write fails, the
+    cached contents are dropped, so that they are loaded from the backend again.
+    """
+
+    def __init__(self, name: str, dtype: type[_T] = dict):
+        self.name = name
+        self.dtype = dtype
+        self._lock: Optional[asyncio.Lock] = None
+        self._acquired_at = 0.0
+        self._pending_write = False
+        self._pending_delete = False
+        self._obj_copy: Optional[_T] = None  # handed out within the current block
+        self._has_obj_copy = False
+
+    async def __aenter__(self):
+        acquired_at = await _acquire_table_lock(self.name)
+        try:
+            entry = _get_cache_entry(self.name)
+            if not entry.loaded:
+                entry.misses += 1
+                entry.obj = await get_storage_backend().load(self.name, self.dtype)
+                entry.loaded = True
+            else:
+                entry.hits += 1
+        except BaseException:
+            _release_table_lock(self.name, acquired_at)
+            raise
+
+        self._lock = _get_table_lock(self.name)
+        self._acquired_at = acquired_at
+        return self
+
+    async def __aexit__(self, *args):
+        self._get_lock()
+        self._lock = None
+        try:
+            # like DiscordStorage, keep changes made before an error was raised
+            if self._pending_delete:
+                await get_storage_backend().delete(self.name)
+            elif self._pending_write:
+                _record_store(
+                    self.name,
+                    await get_storage_backend().store(
+                        self.name, _get_cache_entry(self.name).obj
+                    ),
+                )
+        except BaseException:
+            # the cache already has the changes, which the backend might not, so
+            # the table is loaded from the backend again the next time
+            invalidate_table(self.name)
+            raise
+        finally:
+            self._pending_write = self._pending_delete = False
+            self._obj_copy = None
+            self._has_obj_copy = False
+            _release_table_lock(self.name, self._acquired_at)
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            raise RuntimeError(
+                f"storage table '{self.name}' must be accessed within an "
+                "'async with' block"
+            )
+        return self._lock
+
+    @property
+    def obj(self) -> _T:
+        self._get_lock()
+        entry = _get_cache_entry(self.name)
+        if not entry.loaded:  # deleted within this block
+            return self.dtype()
+
+        # hand out a copy, so that changes only reach the cache when assigned back.
+        # It is made once per block, so that reading obj again is free.
+        if not self._has_obj_copy:
+            self._obj_copy = copy.deepcopy(entry.obj)
+            self._has_obj_copy = True
+        return self._obj_copy  # type: ignore
+
+    @obj.setter
+    def obj(self, value: _T):
+        self._get_lock()
+        entry = _get_cache_entry(self.name)
+        entry.obj = value
+        entry.loaded = True
+        entry.version += 1
+        entry.writes += 1
+        self._pending_write = True
+        _notify_table_write(self.name, value)
+        self._pending_delete = False
+        # the value is now shared with the cache, so copy it again when read
+        self._obj_copy = None
+        self._has_obj_copy = False
+
+    @obj.deleter
+    def obj(self):
+        self._get_lock()
+        invalidate_table(self.name)
+        self._pending_delete = True
+        self._pending_write = False
+        self._obj_copy = None
+        self._has_obj_copy = False
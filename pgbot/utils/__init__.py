@@ -1,2 +1,2 @@
-from . import embed_utils
+from . import batching, concurrency, embed_utils, scheduling
 from .utils import *
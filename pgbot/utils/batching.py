@@ -0,0 +1,224 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines a batcher for embeds that are sent to a channel in the
+background, several per message.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import traceback
+from typing import Callable, Optional
+
+import discord
+
+from pgbot import common, metrics
+
+# limits of a single Discord message
+MAX_MESSAGE_EMBEDS = 10
+MAX_MESSAGE_EMBED_CHARS = 6000
+
+# an embed, and optionally the file name and text contents of an attachment
+EmbedBatchItem = tuple[discord.Embed, Optional[tuple[str, str]]]
+
+
+class EmbedBatcher:
+    """A queue of embeds that a background task sends to a channel, batching as
+    many as fit into one message. A batch is sent once it is full, or once its
+    first embed has waited for `flush_interval` seconds.
+
+    Queueing never waits: once `max_queue_size` embeds are waiting, new ones are
+    dropped and counted, and the number of dropped embeds is mentioned in the
+    next message that is sent. Waiting embeds are lost on shutdown, unless
+    `flush` is called.
+    """
+
+    def __init__(
+        self,
+        get_channel: Callable[[], discord.abc.Messageable],
+        name: str,
+        flush_interval: float = 2.0,
+        max_queue_size: int = 500,
+    ):
+        """Create a new embed batcher.
+
+        Args:
+            get_channel (Callable[[], discord.abc.Messageable]): A function that
+              returns the channel to send to.
+            name (str): The name of the batcher, used as the prefix of its
+              metrics.
+            flush_interval (float, optional): The longest time an embed waits for
+              a batch to fill up, in seconds. Defaults to 2.0.
+            max_queue_size (int, optional): The maximum number of waiting embeds.
+              Defaults to 500.
+        """
+        self._get_channel = get_channel
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue[EmbedBatchItem]] = None
+        self._batch: list[EmbedBatchItem] = []  # being collected or sent
+        self._carried_item: Optional[EmbedBatchItem] = None  # didn't fit a batch
+        self._dropped_since_send = 0
+        self._task: Optional[asyncio.Task] = None
+
+        self._sent_count = metrics.counter(f"{name}.sent", "Number of embeds sent")
+        self._dropped_count = metrics.counter(
+            f"{name}.dropped", "Number of embeds dropped because the queue was full"
+        )
+        self._failed_count = metrics.counter(
+            f"{name}.failed", "Number of embeds whose message could not be sent"
+        )
+        self._batch_size = metrics.histogram(
+            f"{name}.batch_size",
+            "Number of embeds per message",
+            buckets=(1, 2, 5, MAX_MESSAGE_EMBEDS),
+            unit="",
+        )
+
+    def _get_queue(self) -> asyncio.Queue[EmbedBatchItem]:
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queue_size)
+        return self._queue
+
+    def put(
+        self, embed: discord.Embed, attachment: Optional[tuple[str, str]] = None
+    ) -> bool:
+        """Queue an embed to be sent, without waiting.
+
+        Args:
+            embed (discord.Embed): The embed.
+            attachment (Optional[tuple[str, str]], optional): The file name and
+              text contents of a file to attach to the message of the embed.
+              Defaults to None.
+
+        Returns:
+            bool: Whether the embed was queued, or dropped because the queue is
+            full.
+        """
+        try:
+            self._get_queue().put_nowait((embed, attachment))
+        except asyncio.QueueFull:
+            self._dropped_count.inc()
+            self._dropped_since_send += 1
+            return False
+        return True
+
+    def start(self):
+        """Start the background task of this batcher, if it is not running."""
+        if self._task is not None and not self._task.done():
+            return
+
+        self._task = asyncio.create_task(self._run())
+        common.hold_task(self._task)
+
+    def stop(self):
+        """Stop the background task of this batcher."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def flush(self):
+        """Stop the background task of this batcher, and send all waiting embeds
+        right away. This should be called before the bot disconnects.
+        """
+        self.stop()
+        items = self._batch
+        if self._carried_item is not None:
+            items.append(self._carried_item)
+        while self._queue is not None and not self._queue.empty():
+            items.append(self._queue.get_nowait())
+
+        self._batch = []
+        self._carried_item = None
+
+        batch: list[EmbedBatchItem] = []
+        embed_chars = 0
+        for item in items:
+            if batch and (
+                len(batch) == MAX_MESSAGE_EMBEDS
+                or embed_chars + len(item[0]) > MAX_MESSAGE_EMBED_CHARS
+            ):
+                await self._send_batch(batch)
+                batch = []
+                embed_chars = 0
+
+            batch.append(item)
+            embed_chars += len(item[0])
+
+        if batch:
+            await self._send_batch(batch)
+
+    async def _next_item(self, timeout: Optional[float] = None) -> EmbedBatchItem:
+        if self._carried_item is not None:
+            item, self._carried_item = self._carried_item, None
+            return item
+
+        return await asyncio.wait_for(self._get_queue().get(), timeout)
+
+    async def _collect_batch(self) -> list[EmbedBatchItem]:
+        loop = asyncio.get_running_loop()
+        # kept on the batcher, so that `flush` can still send it
+        batch = self._batch
+        batch.append(await self._next_item())
+        embed_chars = len(batch[0][0])
+        flush_at = loop.time() + self.flush_interval
+        while len(batch) < MAX_MESSAGE_EMBEDS:
+            timeout = flush_at - loop.time()
+            if timeout <= 0:
+                break
+
+            try:
+                item = await self._next_item(timeout)
+            except asyncio.TimeoutError:
+                break
+
+            if embed_chars + len(item[0]) > MAX_MESSAGE_EMBED_CHARS:
+                self._carried_item = item  # starts the next batch
+                break
+
+            batch.append(item)
+            embed_chars += len(item[0])
+
+        return batch
+
+    async def _send_batch(self, batch: list[EmbedBatchItem]):
+        content = None
+        if self._dropped_since_send:
+            content = (
+                f"{self._dropped_since_send} entries were dropped because too "
+                "many were queued"
+            )
+            self._dropped_since_send = 0
+
+        files = [
+            discord.File(io.BytesIO(attachment[1].encode()), filename=attachment[0])
+            for _, attachment in batch
+            if attachment is not None
+        ]
+        try:
+            await self._get_channel().send(
+                content=content,
+                embeds=[embed for embed, _ in batch],
+                files=files or discord.utils.MISSING,
+            )
+        except discord.HTTPException:
+            self._failed_count.inc(len(batch))
+            return
+
+        self._sent_count.inc(len(batch))
+        self._batch_size.observe(len(batch))
+
+    async def _run(self):
+        while True:
+            batch = await self._collect_batch()
+            try:
+                await self._send_batch(batch)
+            except Exception:
+                # keep the batcher alive, but report the error on the console
+                traceback.print_exc()
+            finally:
+                self._batch = []
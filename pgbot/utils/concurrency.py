@@ -0,0 +1,164 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines an executor for running many Discord API calls concurrently,
+without running into rate limits.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Callable, Coroutine, Optional, TypeVar
+
+from pgbot import common
+
+_T = TypeVar("_T")
+
+
+class RateLimitedExecutor:
+    """An executor for coroutines that make Discord API calls. Jobs are run
+    concurrently up to a global limit, but jobs for the same channel run one
+    after another, since Discord rate limits most routes per channel. Jobs are
+    also started no faster than a token bucket allows, to stay well below the
+    global rate limit of the bot.
+
+    The asyncio primitives used are created lazily, so that instances can be
+    created at import time.
+    """
+
+    def __init__(self, concurrency: int = 8, rate: float = 10.0, burst: int = 10):
+        """Create a new executor.
+
+        Args:
+            concurrency (int, optional): The maximum number of jobs running at
+              the same time. Defaults to 8.
+            rate (float, optional): The number of jobs that can be started per
+              second, on average. Defaults to 10.0.
+            burst (int, optional): The number of jobs that can be started at
+              once after a period of inactivity. Defaults to 10.
+        """
+        if concurrency <= 0 or rate <= 0 or burst <= 0:
+            raise ValueError(
+                "arguments 'concurrency', 'rate' and 'burst' must be positive"
+            )
+
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket_lock: Optional[asyncio.Lock] = None
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        # channel id -> (lock, number of jobs holding or waiting for it)
+        self._channel_locks: dict[int, tuple[asyncio.Lock, int]] = {}
+
+    async def _take_token(self):
+        if self._bucket_lock is None:
+            self._bucket_lock = asyncio.Lock()
+
+        async with self._bucket_lock:  # hand out tokens in order
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._tokens + (now - self._last_refill) * self.rate, self.burst
+                )
+                self._last_refill = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+    def _get_channel_lock(self, channel_id: int) -> asyncio.Lock:
+        lock, users = self._channel_locks.get(channel_id, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._channel_locks[channel_id] = (lock, users + 1)
+        return lock
+
+    def _release_channel_lock(self, channel_id: int):
+        lock, users = self._channel_locks[channel_id]
+        if users <= 1:
+            del self._channel_locks[channel_id]
+        else:
+            self._channel_locks[channel_id] = (lock, users - 1)
+
+    async def run(
+        self,
+        channel_id: Optional[int],
+        func: Callable[..., Coroutine[Any, Any, _T]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> _T:
+        """Run a coroutine function once the limits of this executor allow it.
+
+        Args:
+            channel_id (Optional[int]): The id of the channel that the job makes
+              API calls for, if any.
+            func (Callable[..., Coroutine[Any, Any, _T]]): The coroutine function.
+            *args (Any): The positional arguments to call it with.
+            **kwargs (Any): The keyword arguments to call it with.
+
+        Returns:
+            _T: The return value of the call.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        if channel_id is None:
+            async with self._semaphore:
+                await self._take_token()
+                return await func(*args, **kwargs)
+
+        # the channel lock is taken first, so that queued jobs for a busy
+        # channel don't hold slots that jobs for other channels could use
+        channel_lock = self._get_channel_lock(channel_id)
+        try:
+            async with channel_lock:
+                async with self._semaphore:
+                    await self._take_token()
+                    return await func(*args, **kwargs)
+        finally:
+            self._release_channel_lock(channel_id)
+
+    def submit(
+        self,
+        channel_id: Optional[int],
+        func: Callable[..., Coroutine[Any, Any, _T]],
+        *args: Any,
+        **kwargs: Any,
+    ) -> asyncio.Task[_T]:
+        """Like `run`, but run the job in a background task, which is returned.
+        A reference to the task is held until it is done.
+        """
+        task = asyncio.create_task(self.run(channel_id, func, *args, **kwargs))
+        common.hold_task(task)
+        return task
+
+    async def map(
+        self,
+        jobs: list[tuple[Optional[int], Callable[..., Coroutine[Any, Any, _T]], tuple]],
+    ) -> list[_T | BaseException]:
+        """Run many jobs with `run`, and wait for all of them to finish.
+
+        Args:
+            jobs (list[tuple[Optional[int], Callable[..., Coroutine[Any, Any, _T]], tuple]]):
+              The channel id, coroutine function and positional arguments of
+              every job.
+
+        Returns:
+            list[_T | BaseException]: The return value of every job, or the
+            exception it raised, in order.
+        """
+        return await asyncio.gather(
+            *(self.run(channel_id, func, *args) for channel_id, func, args in jobs),
+            return_exceptions=True,
+        )
+
+    @property
+    def pending_channels(self) -> int:
+        """The number of channels with running or waiting jobs."""
+        return len(self._channel_locks)
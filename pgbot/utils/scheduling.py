@@ -0,0 +1,170 @@
+"""
+This file is a part of the source code for the PygameCommunityBot.
+This project has been licensed under the MIT license.
+Copyright (c) 2020-present pygame-community
+
+This file defines a deadline scheduler, which runs a callback for items as soon
+as their deadlines have passed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+import traceback
+from typing import Any, Callable, Coroutine, Generic, Hashable, Optional, TypeVar
+
+from pgbot import common
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+
+
+class DeadlineScheduler(Generic[_K, _V]):
+    """A scheduler for keyed items with deadlines, given as UNIX timestamps. It is
+    backed by a min-heap, so that (re)scheduling and cancelling items costs
+    O(log n), and its background task sleeps exactly until the earliest deadline
+    instead of polling.
+
+    Cancelled and rescheduled items are removed from the heap lazily, and the heap
+    is compacted once most of its entries have gone stale.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[list[tuple[_K, _V]]], Coroutine[Any, Any, Any]],
+    ):
+        """Create a new deadline scheduler.
+
+        Args:
+            callback (Callable[[list[tuple[_K, _V]]], Coroutine[Any, Any, Any]]):
+              A coroutine function to call with a list of all key-value pairs
+              whose deadlines have passed. Those items are unscheduled before
+              the call.
+        """
+        self._callback = callback
+        self._heap: list[tuple[float, int, _K]] = []
+        self._entries: dict[_K, tuple[float, int, _V]] = {}
+        self._counter = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: _K) -> bool:
+        return key in self._entries
+
+    def get_deadline(self, key: _K) -> Optional[float]:
+        """Get the deadline of a scheduled item, if it is scheduled."""
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def schedule(self, key: _K, when: float, value: _V = None):  # type: ignore
+        """Schedule an item, replacing any item previously scheduled under the
+        same key.
+
+        Args:
+            key (_K): The key of the item.
+            when (float): The deadline of the item, as a UNIX timestamp.
+            value (_V, optional): The item value to pass to the callback.
+        """
+        seq = next(self._counter)
+        self._entries[key] = (when, seq, value)
+        heapq.heappush(self._heap, (when, seq, key))
+
+        if self._heap[0][1] == seq and self._wakeup is not None:
+            self._wakeup.set()  # new earliest deadline, recompute sleep time
+
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._compact()
+
+    def cancel(self, key: _K) -> bool:
+        """Unschedule an item.
+
+        Args:
+            key (_K): The key of the item.
+
+        Returns:
+            bool: Whether the item was scheduled.
+        """
+        return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        """Unschedule all items."""
+        self._entries.clear()
+        self._heap.clear()
+
+    def _compact(self):
+        self._heap = [(when, seq, key) for key, (when, seq, _) in self._entries.items()]
+        heapq.heapify(self._heap)
+
+    def _is_stale(self, heap_item: tuple[float, int, _K]) -> bool:
+        entry = self._entries.get(heap_item[2])
+        return entry is None or entry[1] != heap_item[1]
+
+    def next_deadline(self) -> Optional[float]:
+        """Get the earliest deadline of all scheduled items, if any exist."""
+        while self._heap and self._is_stale(self._heap[0]):
+            heapq.heappop(self._heap)
+
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> list[tuple[_K, _V]]:
+        """Unschedule and return all items whose deadlines have passed.
+
+        Args:
+            now (Optional[float], optional): The current UNIX timestamp. Defaults
+              to `time.time()`.
+
+        Returns:
+            list[tuple[_K, _V]]: The keys and values of the items, ordered by
+            deadline.
+        """
+        now = time.time() if now is None else now
+        due = []
+        while (deadline := self.next_deadline()) is not None and deadline <= now:
+            _, _, key = heapq.heappop(self._heap)
+            due.append((key, self._entries.pop(key)[2]))
+
+        return due
+
+    def start(self):
+        """Start the background task of this scheduler, if it is not running."""
+        if self._task is not None and not self._task.done():
+            return
+
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        common.hold_task(self._task)
+
+    def stop(self):
+        """Stop the background task of this scheduler."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        assert self._wakeup is not None
+        while True:
+            self._wakeup.clear()
+            deadline = self.next_deadline()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(),
+                    None if deadline is None else max(deadline - time.time(), 0.0),
+                )
+            except asyncio.TimeoutError:
+                pass
+
+            due = self.pop_due()
+            if not due:
+                continue
+
+            try:
+                await self._callback(due)
+            except Exception:
+                # keep the scheduler alive, but report the error on the console
+                traceback.print_exc()
@@ -9,9 +9,10 @@ This file defines some important utility functions.
 from __future__ import annotations
 from ast import literal_eval
 import asyncio
+import collections
 import datetime
 import io
-import time
+import threading
 from typing import Any, Callable, Coroutine, Optional, Sequence, Union
 
 
@@ -21,6 +22,7 @@ import pygame
 import snakecore
 
 from pgbot import common
+from pgbot.storage import read_table
 
 
 def get_primary_guild_perms(mem: Union[discord.Member, discord.User]):
@@ -52,8 +54,7 @@ async def get_channel_feature(
     Get the channel feature. Returns True if the feature name is disabled on
     that channel, False otherwise. Also handles category channel
     """
-    async with snakecore.storage.DiscordStorage("feature") as storage_obj:
-        storage_dict: dict[int, bool] = storage_obj.obj
+    storage_dict: dict[int, bool] = await read_table("feature")
 
     if channel.id in storage_dict:
         return storage_dict[channel.id]
@@ -164,37 +165,6 @@ async def fetch_last_thread_message(
     return last_message
 
 
-async def help_thread_deletion_checks(thread: discord.Thread):
-    member_msg_count = 0
-    try:
-        async for thread_message in thread.history(limit=max(thread.message_count, 60)):
-            if (
-                not thread_message.author.bot
-                and thread_message.type == discord.MessageType.default
-            ):
-                member_msg_count += 1
-                if member_msg_count > 29:
-                    break
-
-        if member_msg_count < 30:
-            await thread.send(
-                embed=discord.Embed(
-                    title="Post scheduled for deletion",
-                    description=(
-                        "Someone deleted the starter message of this post.\n\n"
-                        "Since it contains less than 30 messages sent by "
-                        "server members, it will be deleted "
-                        f"**<t:{int(time.time()+300)}:R>**."
-                    ),
-                    color=0x551111,
-                )
-            )
-            await asyncio.sleep(300)
-            await thread.delete()
-    except discord.HTTPException:
-        pass
-
-
 def split_wc_scores(scores: dict[int, int]):
     """
     Split wc scoreboard into different categories
@@ -418,3 +388,149 @@ class RedirectTextIOWrapper(io.TextIOWrapper):
         if self._close_streams:
             for stream in self._streams:
                 stream.close()
+
+
+class RingBufferTextIO(io.TextIOBase):
+    """A writable text stream that keeps at most `capacity` characters. When
+    more text is written, the oldest text is dropped, and the number of dropped
+    characters is counted. Writing is thread-safe.
+    """
+
+    def __init__(self, capacity: int):
+        """Create a new ring buffer text stream.
+
+        Args:
+            capacity (int): The maximum number of characters to keep.
+        """
+        super().__init__()
+        if capacity <= 0:
+            raise ValueError("argument 'capacity' must be a positive integer")
+
+        self.capacity = capacity
+        self._chunks: collections.deque[str] = collections.deque()
+        self._size = 0
+        self._dropped = 0
+        self.total_dropped = 0
+        self._lock = threading.Lock()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, __s: str, /) -> int:
+        if not __s:
+            return 0
+
+        with self._lock:
+            if len(__s) >= self.capacity:
+                # only the tail of the text fits, drop everything else
+                dropped = self._size + len(__s) - self.capacity
+                self._chunks.clear()
+                self._chunks.append(__s[-self.capacity :])
+                self._size = self.capacity
+            else:
+                self._chunks.append(__s)
+                self._size += len(__s)
+                dropped = 0
+                while self._size > self.capacity:
+                    excess = self._size - self.capacity
+                    oldest = self._chunks[0]
+                    if len(oldest) <= excess:
+                        self._chunks.popleft()
+                        self._size -= len(oldest)
+                        dropped += len(oldest)
+                    else:
+                        self._chunks[0] = oldest[excess:]
+                        self._size -= excess
+                        dropped += excess
+
+            self._dropped += dropped
+            self.total_dropped += dropped
+
+        return len(__s)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def getvalue(self) -> str:
+        """Get the buffered text, without removing it."""
+        with self._lock:
+            return "".join(self._chunks)
+
+    def drain(self) -> tuple[str, int]:
+        """Remove and return the buffered text.
+
+        Returns:
+            tuple[str, int]: The text, and the number of characters that were
+            dropped since the last drain.
+        """
+        with self._lock:
+            contents = "".join(self._chunks)
+            dropped = self._dropped
+            self._chunks.clear()
+            self._size = 0
+            self._dropped = 0
+
+        return contents, dropped
+
+
+class MessageCache:
+    """A bounded cache of messages, which evicts the least recently used
+    messages once it is full. Messages in it are not updated by gateway events,
+    so it should only be used for data that does not change.
+    """
+
+    def __init__(self, max_size: int = 256):
+        """Create a new message cache.
+
+        Args:
+            max_size (int, optional): The maximum number of messages. Defaults to
+              256.
+        """
+        self.max_size = max_size
+        self._messages: collections.OrderedDict[
+            int, discord.Message
+        ] = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._messages
+
+    def get(self, message_id: int) -> Optional[discord.Message]:
+        """Get a cached message, if it exists."""
+        message = self._messages.get(message_id)
+        if message is not None:
+            self._messages.move_to_end(message_id)
+        return message
+
+    def add(self, message: discord.Message):
+        """Add a message to the cache, evicting the least recently used message if
+        the cache is full.
+        """
+        self._messages[message.id] = message
+        self._messages.move_to_end(message.id)
+        while len(self._messages) > self.max_size:
+            self._messages.popitem(last=False)
+
+    def discard(self, message_id: int):
+        """Remove a message from the cache, if it is cached."""
+        self._messages.pop(message_id, None)
+
+    async def fetch(
+        self, channel: discord.abc.Messageable, message_id: int
+    ) -> discord.Message:
+        """Get a message from the cache, or fetch it and add it to the cache.
+
+        Args:
+            channel (discord.abc.Messageable): The channel of the message.
+            message_id (int): The id of the message.
+
+        Returns:
+            discord.Message: The message.
+        """
+        message = self.get(message_id)
+        if message is None:
+            message = await channel.fetch_message(message_id)
+            self.add(message)
+        return message